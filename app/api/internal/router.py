@@ -0,0 +1,23 @@
+from typing import Dict
+from fastapi import APIRouter
+from core.database import engine, async_engine
+from core.pool import pool_status
+from core.replicas import replicas
+
+router = APIRouter()
+
+
+@router.get("/pool")
+async def get_pool_stats() -> Dict:
+    """Get connection pool statistics endpoint
+
+    Returns:
+        Dict: statistics of the sync and async engine pools and of the replicas
+    """
+    return {
+        "sync": pool_status(engine.pool),
+        "async": pool_status(async_engine.pool),
+        "replicas": [{"name": replica.name, "healthy": replica.healthy,
+                      "replayLsn": replica.replay_lsn, **pool_status(replica.engine.pool)}
+                     for replica in replicas.replicas],
+    }
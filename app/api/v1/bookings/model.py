@@ -0,0 +1,70 @@
+import datetime
+from typing import List, Optional
+from sqlalchemy import Column, Date, Integer, String, Time
+from sqlalchemy.dialects.postgresql import TSRANGE
+from core.database import Base
+from pydantic import BaseModel
+from ..bulk import RowResult
+
+BOOKING_CONFLICT = {
+    "ex_Bookings_classroom": "The classroom is booked at this time",
+    "ex_Bookings_course": "The course has a lesson or an exam at this time",
+}
+
+
+class BookingDB(Base):
+    """The DB model for the time a lesson or an exam takes a classroom and a course.
+
+    The table is maintained by triggers on Schedules and Exams
+    (db/queries/create_bookings.sql); its exclusion constraints reject
+    double bookings of both. It is also the read model of the timetable:
+    the course, teacher, classroom and building columns are copied in by
+    triggers (db/queries/create_timetable.sql).
+    """
+    __tablename__ = "Bookings"
+
+    kind = Column(String(8), primary_key=True)
+    sourceId = Column(Integer, primary_key=True)
+    classroomId = Column(Integer)
+    courseId = Column(Integer)
+    slot = Column(TSRANGE, nullable=False)
+    date = Column(Date)
+    time = Column(Time)
+    courseName = Column(String(100))
+    teacherId = Column(Integer)
+    classroomNumber = Column(Integer)
+    buildingId = Column(Integer)
+
+
+class BookingConflict(BaseModel):
+    """The Pydantic model for a double booking found in a timetable.
+
+    The row conflicts either with another row of the timetable (otherRow)
+    or with a stored schedule or exam (otherKind and otherId).
+    """
+    row: int
+    reason: str
+    otherRow: Optional[int] = None
+    otherKind: Optional[str] = None
+    otherId: Optional[int] = None
+
+
+class TimetableReport(BaseModel):
+    """The Pydantic model for the result of a timetable validation."""
+    rows: int
+    invalid: List[RowResult]
+    conflicts: List[BookingConflict]
+
+
+class TimetableEntry(BaseModel):
+    """The Pydantic model for a lesson or an exam in the timetable."""
+    kind: str
+    sourceId: int
+    date: datetime.date
+    time: datetime.time
+    courseId: Optional[int]
+    courseName: Optional[str]
+    teacherId: Optional[int]
+    classroomId: Optional[int]
+    classroomNumber: Optional[int]
+    buildingId: Optional[int]
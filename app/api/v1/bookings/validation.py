@@ -0,0 +1,106 @@
+import datetime
+from collections import deque
+from typing import Any, AsyncIterator, Deque, List, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import Date, Integer, Time, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from .model import BookingConflict, TimetableReport
+from ..bulk import RowResult, validation_message
+
+# Same length as booking_slot() in create_bookings.sql
+SLOT_LENGTH = datetime.timedelta(minutes=90)
+REASONS = ("classroom", "course")
+
+# Every row is looked up in the GiST indexes of the exclusion constraints,
+# so the check costs O(log n) per row however long the history is.
+_STORED_CONFLICTS = text("""
+    WITH i AS (
+        SELECT * FROM unnest(:rows, :days, :times, :classroom_ids, :course_ids)
+            AS i(n, day, start, "classroomId", "courseId")
+    )
+    SELECT i.n, 'classroom', b.kind, b."sourceId"
+    FROM i JOIN "Bookings" b
+      ON int4range(b."classroomId", b."classroomId", '[]') && int4range(i."classroomId", i."classroomId", '[]')
+     AND b.slot && "booking_slot"(i.day, i.start)
+     AND b."classroomId" IS NOT NULL
+    UNION ALL
+    SELECT i.n, 'course', b.kind, b."sourceId"
+    FROM i JOIN "Bookings" b
+      ON int4range(b."courseId", b."courseId", '[]') && int4range(i."courseId", i."courseId", '[]')
+     AND b.slot && "booking_slot"(i.day, i.start)
+     AND b."courseId" IS NOT NULL
+""").bindparams(
+    bindparam("rows", type_=ARRAY(Integer)),
+    bindparam("days", type_=ARRAY(Date)),
+    bindparam("times", type_=ARRAY(Time)),
+    bindparam("classroom_ids", type_=ARRAY(Integer)),
+    bindparam("course_ids", type_=ARRAY(Integer)),
+)
+
+
+def internal_conflicts(entries: List[Tuple[int, Any]], reason: str) -> List[BookingConflict]:
+    """Find the rows of a timetable that book a classroom or a course twice.
+
+    Sorted by key and start, a row can only overlap the rows before it that
+    started less than a slot earlier, so one sweep finds all pairs.
+
+    Args:
+        entries (List[Tuple[int, Any]]): (row number, row) pairs of valid rows
+        reason (str): "classroom" or "course", the key that must not overlap
+
+    Returns:
+        List[BookingConflict]: every overlapping pair, reported on the later row
+    """
+    key = f"{reason}Id"
+    timed = sorted((getattr(row, key), datetime.datetime.combine(row.date, row.time), number)
+                   for number, row in entries)
+    conflicts = []
+    window: Deque[Tuple[Any, datetime.datetime, int]] = deque()
+    for value, start, number in timed:
+        while window and (window[0][0] != value or window[0][1] + SLOT_LENGTH <= start):
+            window.popleft()
+        conflicts.extend(BookingConflict.construct(row=number, reason=reason, otherRow=other)
+                         for _, _, other in window)
+        window.append((value, start, number))
+    return conflicts
+
+
+async def validate_timetable(db: AsyncSession, rows: AsyncIterator[Any],
+                             model: Type[BaseModel]) -> TimetableReport:
+    """Check a timetable for double bookings without saving it.
+
+    Rows are checked against each other and against the stored schedules
+    and exams, and all conflicts are reported at once.
+
+    Args:
+        db (AsyncSession): DB session
+        rows (AsyncIterator[Any]): rows from read_rows()
+        model (Type[BaseModel]): row model with date, time, classroomId and courseId
+
+    Returns:
+        TimetableReport: invalid rows and conflicts, ordered by row
+    """
+    invalid: List[RowResult] = []
+    entries: List[Tuple[int, Any]] = []
+    count = 0
+    async for row in rows:
+        count += 1
+        try:
+            entries.append((count, model.parse_obj(row)))
+        except ValidationError as error:
+            invalid.append(RowResult.construct(row=count, error=validation_message(error)))
+
+    conflicts = [conflict for reason in REASONS for conflict in internal_conflicts(entries, reason)]
+    if entries:
+        stored = await db.execute(_STORED_CONFLICTS, {
+            "rows": [number for number, _ in entries],
+            "days": [row.date for _, row in entries],
+            "times": [row.time for _, row in entries],
+            "classroom_ids": [row.classroomId for _, row in entries],
+            "course_ids": [row.courseId for _, row in entries],
+        })
+        conflicts.extend(BookingConflict.construct(row=number, reason=reason, otherKind=kind, otherId=id)
+                         for number, reason, kind, id in stored)
+    conflicts.sort(key=lambda conflict: (conflict.row, REASONS.index(conflict.reason)))
+    return TimetableReport.construct(rows=count, invalid=invalid, conflicts=conflicts)
@@ -0,0 +1,211 @@
+import csv
+import json
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Iterator, List, Optional, Tuple, Type
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel, ValidationError
+
+CSV_TYPES = ("text/csv",)
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+JSON_TYPES = ("application/json",)
+# Longest CSV record, in lines: an unclosed quote would buffer the rest of the body
+CSV_MAX_RECORD_LINES = 1000
+
+
+class RowResult(BaseModel):
+    """The Pydantic model for the result of one row of a bulk request."""
+    row: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+def request_body_schema(model: Type[BaseModel]) -> dict:
+    """Build an OpenAPI requestBody for an endpoint reading rows with read_rows().
+
+    Args:
+        model (Type[BaseModel]): Pydantic model of a row
+
+    Returns:
+        dict: value for the openapi_extra "requestBody" key
+    """
+    text_body = {"schema": {"type": "string"}}
+    return {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {"type": "array", "items": model.schema()}},
+            "text/csv": text_body,
+            "application/x-ndjson": text_body,
+        },
+    }
+
+
+class _NeedMore(Exception):
+    """The CSV lines received so far end inside a record."""
+
+
+class _CsvLines:
+    """Line iterator of a csv.reader fed from a streamed body.
+
+    csv.reader decides where a record ends. When the lines run out before
+    the body does, the lines of the unfinished record are put back and
+    read again once more lines have arrived.
+    """
+
+    def __init__(self) -> None:
+        self.pending: Deque[str] = deque()
+        # lines of the record being parsed
+        self.record: List[str] = []
+        # the buffered lines end inside a quoted field
+        self.open = False
+        self.eof = False
+        self.reader = csv.reader(self)
+
+    def __iter__(self) -> "_CsvLines":
+        return self
+
+    def __next__(self) -> str:
+        if not self.pending:
+            if self.eof:
+                raise StopIteration
+            raise _NeedMore
+        line = self.pending.popleft()
+        self.record.append(line)
+        return line
+
+    def push(self, line: str) -> None:
+        self.pending.append(line + "\n")
+        if len(self.pending) > CSV_MAX_RECORD_LINES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"A CSV record spans more than {CSV_MAX_RECORD_LINES} lines.")
+
+    def records(self) -> Iterator[List[str]]:
+        """Parse the complete records among the lines pushed so far."""
+        while True:
+            try:
+                values = next(self.reader)
+            except _NeedMore:
+                self.open = bool(self.record)
+                self.pending.extendleft(reversed(self.record))
+                self.record = []
+                return
+            except StopIteration:
+                return
+            except csv.Error as error:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                    detail=f"Malformed CSV: {error}.") from error
+            self.record = []
+            self.open = False
+            # blank lines
+            if values:
+                yield values
+
+
+async def _iter_lines(request: Request) -> AsyncIterator[str]:
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode().rstrip("\r")
+    if buffer:
+        yield buffer.decode().rstrip("\r")
+
+
+async def read_rows(request: Request) -> AsyncIterator[Any]:
+    """Read rows of a JSON array, NDJSON or CSV request body.
+
+    NDJSON and CSV bodies are parsed while they are streamed; quoted CSV
+    fields may span lines (CRLF inside them is read as LF). A line that
+    isn't valid JSON is yielded as a string, so it fails row validation
+    instead of the whole request.
+
+    Args:
+        request (Request): request object
+
+    Raises:
+        HTTPException: 400 for a malformed body, 415 for other content types
+
+    Yields:
+        Any: a row, normally a dict
+    """
+    content_type = request.headers.get("content-type", JSON_TYPES[0]).split(";")[0].strip()
+
+    if content_type in CSV_TYPES:
+        lines = _CsvLines()
+        header = None
+        async for line in _iter_lines(request):
+            lines.push(line)
+            # a record can only end inside a quoted field on a line with a quote
+            if lines.open and '"' not in line:
+                continue
+            for values in lines.records():
+                if header is None:
+                    header = values
+                    continue
+                yield dict(zip(header, values))
+        lines.eof = True
+        for values in lines.records():
+            if header is None:
+                header = values
+                continue
+            yield dict(zip(header, values))
+
+    elif content_type in NDJSON_TYPES:
+        async for line in _iter_lines(request):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield line
+
+    elif content_type in JSON_TYPES:
+        try:
+            rows = json.loads(await request.body())
+        except ValueError:
+            rows = None
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail="Expected a JSON array.")
+        for row in rows:
+            yield row
+
+    else:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            detail=f"Unsupported content type {content_type}.")
+
+
+async def batches(rows: AsyncIterator[Any], size: int) -> AsyncIterator[List[Tuple[int, Any]]]:
+    """Group rows into numbered batches.
+
+    Args:
+        rows (AsyncIterator[Any]): rows
+        size (int): batch size
+
+    Yields:
+        List[Tuple[int, Any]]: (row number starting from 1, row) pairs
+    """
+    batch = []
+    number = 0
+    async for row in rows:
+        number += 1
+        batch.append((number, row))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def validation_message(error: ValidationError) -> str:
+    """Make a one-line message out of a pydantic validation error.
+
+    Args:
+        error (ValidationError): validation error
+
+    Returns:
+        str: message
+    """
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in item['loc'])}: {item['msg']}"
+        for item in error.errors())
@@ -0,0 +1,69 @@
+from typing import Iterable, Optional, Set
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.cache import Cache
+from .groups.model import GroupDB
+
+
+def student_key(student_id: int) -> str:
+    return f"students:{student_id}"
+
+
+def course_key(course_id: int) -> str:
+    return f"courses:{course_id}"
+
+
+def roster_key(course_id: int) -> str:
+    return f"courses:{course_id}:roster"
+
+
+def course_statistics_key(course_id: Optional[int]) -> str:
+    """Key of the statistics of a course, or of all courses for None."""
+    return "courses:statistics" if course_id is None else f"courses:{course_id}:statistics"
+
+
+def teachers_key(faculty_id: Optional[int], cursor: Optional[str], limit: int) -> str:
+    return f"teachers:{faculty_id}:{cursor}:{limit}"
+
+
+async def courses_of_groups(db: AsyncSession, group_ids: Iterable[Optional[int]]) -> Set[int]:
+    """Get the courses the groups study.
+
+    Args:
+        db (AsyncSession): DB session
+        group_ids (Iterable[Optional[int]]): group IDs
+
+    Returns:
+        Set[int]: course IDs
+    """
+    group_ids = {group_id for group_id in group_ids if group_id is not None}
+    if not group_ids:
+        return set()
+    result = await db.scalars(
+        select(GroupDB.courseId).where(GroupDB.id.in_(group_ids)).distinct())
+    return {course_id for course_id in result if course_id is not None}
+
+
+async def invalidate_students(cache: Cache, student_ids: Iterable[int] = (),
+                              course_ids: Iterable[int] = ()) -> None:
+    """Evict cached students and the rosters of the courses they are on.
+
+    Args:
+        cache (Cache): cache backend
+        student_ids (Iterable[int], optional): changed students
+        course_ids (Iterable[int], optional): courses whose rosters changed
+    """
+    keys = [student_key(student_id) for student_id in student_ids]
+    keys.extend(roster_key(course_id) for course_id in course_ids)
+    await cache.delete(*keys)
+
+
+async def invalidate_grades(cache: Cache, course_ids: Iterable[int]) -> None:
+    """Evict the statistics of the courses whose grades changed.
+
+    Args:
+        cache (Cache): cache backend
+        course_ids (Iterable[int]): courses of the changed grades
+    """
+    keys = [course_statistics_key(course_id) for course_id in course_ids]
+    await cache.delete(*keys, course_statistics_key(None))
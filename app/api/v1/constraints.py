@@ -0,0 +1,47 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def violated_constraint(error: IntegrityError) -> Optional[str]:
+    """Get the name of the constraint an INSERT or UPDATE violated.
+
+    Args:
+        error (IntegrityError): error raised by SQLAlchemy
+
+    Returns:
+        Optional[str]: constraint name, None if the driver doesn't report it
+    """
+    diag = getattr(error.orig, "diag", None)  # psycopg2
+    if diag is not None:
+        return diag.constraint_name
+    return getattr(error.orig.__cause__, "constraint_name", None)  # asyncpg
+
+
+@asynccontextmanager
+async def constraint_errors(db: AsyncSession, conflicts: Dict[str, str],
+                            detail: str) -> AsyncIterator[None]:
+    """Turn constraint violations of a write into HTTP errors.
+
+    The DB enforces uniqueness, so writes don't check for duplicates first:
+    a violation of one of the unique constraints in conflicts is a 409, any
+    other (foreign keys, NOT NULL) is a 400. The transaction is rolled back.
+
+    Args:
+        db (AsyncSession): DB session
+        conflicts (Dict[str, str]): error details by unique constraint name
+        detail (str): error detail of other violations
+
+    Raises:
+        HTTPException: 409 or 400
+    """
+    try:
+        yield
+    except IntegrityError as error:
+        await db.rollback()
+        conflict = conflicts.get(violated_constraint(error))
+        if conflict is not None:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=conflict) from error
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail) from error
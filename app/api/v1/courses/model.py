@@ -1,26 +1,49 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from core.database import Base
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 
 class CourseDB(Base):
     """The DB model for a course."""
     __tablename__ = "Courses"
+    __table_args__ = (
+        UniqueConstraint("name", "teacherId", name="uq_Courses_name_teacherId"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100))
     teacherId = Column(Integer, ForeignKey("Teachers.id"))
+    credits = Column(Integer, nullable=False, server_default="1")
 
     grades = relationship("GradeDB", backref="course", cascade="all,delete")
     groups = relationship("GroupDB", backref="course", cascade="all,delete")
 
 
+class CourseRosterDB(Base):
+    """The DB model for a student on a course.
+
+    The table is maintained by triggers on Students and Groups
+    (db/queries/create_course_rosters.sql) and is only read by the API.
+    The student ID is mapped as id, so the columns match the Student model.
+    """
+    __tablename__ = "CourseRosters"
+
+    courseId = Column(Integer, primary_key=True)
+    id = Column("studentId", Integer, primary_key=True)
+    firstName = Column(String(100))
+    lastName = Column(String(100))
+    email = Column(String(100))
+    groupId = Column(Integer, nullable=False)
+
+
 class Course(BaseModel):
     """The Pydantic model for a course."""
     id: int
     name: str
     teacherId: int
+    credits: int
 
     class Config:
         orm_mode = True
@@ -30,3 +53,36 @@ class CourseCreate(BaseModel):
     """The Pydantic model for creating a course."""
     name: str
     teacherId: int
+    credits: int = 1
+
+
+class HistogramBucket(BaseModel):
+    """The Pydantic model for the number of grades in [low, high)."""
+    low: int
+    high: int
+    count: int
+
+
+class StudentRank(BaseModel):
+    """The Pydantic model for the place of a student on a course."""
+    studentId: int
+    grade: int
+    rank: int
+
+
+class CourseStatistics(BaseModel):
+    """The Pydantic model for the grade statistics of a course."""
+    courseId: int
+    count: int
+    mean: Optional[float]
+    median: Optional[float]
+    std: Optional[float]
+    min: Optional[int]
+    max: Optional[int]
+    percentiles: Dict[str, float]
+    histogram: List[HistogramBucket]
+
+
+class CourseStatisticsDetail(CourseStatistics):
+    """The Pydantic model for the grade statistics of a course with the student ranking."""
+    ranking: List[StudentRank]
@@ -1,77 +1,205 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
-from core.database import get_db
-from .model import CourseDB, Course, CourseCreate
-from ..students.model import StudentDB, Student
-from ..groups.model import GroupDB
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.cache import Cache, get_cache
+from core.database import get_async_db
+from core.replicas import fresh_for_cache, get_read_db
+from .model import CourseDB, CourseRosterDB, Course, CourseCreate, CourseStatistics, CourseStatisticsDetail
+from .statistics import all_course_statistics, course_statistics, empty_statistics
+from ..students.model import Student
+from ..cache import course_key, course_statistics_key, roster_key
+from ..constraints import constraint_errors
+from ..etag import ETagRoute
+from ..pagination import DEFAULT_LIMIT, NEXT_CURSOR_HEADER, PageParams, fetch_page, fetch_rows_page
+from ..rows import insert_returning, model_columns
+
+COURSE_CONFLICT = {"uq_Courses_name_teacherId": "Course with this name and teacher id already exists"}
+
+router = APIRouter(route_class=ETagRoute)
+
+
+@router.get("/", response_model=List[Course])
+async def get_courses(response: Response,
+                      teacherId: Optional[int] = None,
+                      page: PageParams = Depends(),
+                      db: AsyncSession = Depends(get_async_db)) -> List[Course]:
+    """Get courses list endpoint
+
+    The list is ordered by ID. If there are more courses, the X-Next-Cursor
+    response header holds the cursor of the next page.
+
+    Args:
+        response (Response): response object
+        teacherId (Optional[int], optional): Teacher ID filter. Defaults to None.
+        page (PageParams, optional): cursor and limit (defaults to 500) of the page.
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+
+    Returns:
+        List[Course]: List of course objects
+    """
+    stmt = select(CourseDB)
+    if teacherId is not None:
+        stmt = stmt.where(CourseDB.teacherId == teacherId)
+    return await fetch_page(db, stmt, CourseDB.id, page, response)
 
-router = APIRouter()
+
+@router.get("/statistics", response_model=List[CourseStatistics], response_class=ORJSONResponse)
+async def get_all_course_statistics(db: AsyncSession = Depends(get_read_db),
+                                    cache: Cache = Depends(get_cache)) -> ORJSONResponse:
+    """Get grade statistics of all courses endpoint
+
+    Courses without grades are left out. The result is cached until the
+    next grade write.
+
+    Args:
+        db (AsyncSession, optional): DB session, a replica if one is fit. Defaults to Depends(get_read_db).
+        cache (Cache, optional): response cache. Defaults to Depends(get_cache).
+
+    Returns:
+        ORJSONResponse: statistics of every course with grades, ordered by course ID
+    """
+    key = course_statistics_key(None)
+    statistics = await cache.get(key)
+    if statistics is None:
+        statistics = await all_course_statistics(db)
+        if fresh_for_cache(db):
+            await cache.set(key, statistics)
+    return ORJSONResponse(statistics)
 
 
 @router.get("/{course_id}", response_model=Course)
-def get_course_by_id(course_id: int, db: Session = Depends(get_db)) -> Course:
+async def get_course_by_id(course_id: int, db: AsyncSession = Depends(get_read_db),
+                           cache: Cache = Depends(get_cache)) -> Course:
     """Get course by ID endpoint
 
     Args:
         course_id (int): Course ID
-        db (Session, optional): DB session. Defaults to Depends(get_db).
+        db (AsyncSession, optional): DB session, a replica if one is fit. Defaults to Depends(get_read_db).
+        cache (Cache, optional): response cache. Defaults to Depends(get_cache).
 
     Returns:
         Course: Course object
     """
-    course = db.get(CourseDB, course_id)
+    key = course_key(course_id)
+    cached = await cache.get(key)
+    if cached is not None:
+        return cached
+
+    course = await db.get(CourseDB, course_id)
     if course is None:
         raise HTTPException(status_code=404, detail="Course not found")
-    return course
+    data = Course.from_orm(course).dict()
+    if fresh_for_cache(db):
+        await cache.set(key, data)
+    return data
 
 
 @router.post("/", response_model=Course)
-def create_course(course: CourseCreate, db: Session = Depends(get_db)) -> Course:
+async def create_course(course: CourseCreate, db: AsyncSession = Depends(get_async_db)) -> Course:
     """Create a new course
 
     Args:
         course (CourseCreate): New course object
-        db (Session, optional): DB session. Defaults to Depends(get_db).
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
 
     Returns:
         Course: Created course object
     """
-    try:
-        existing_course = db.query(CourseDB).filter(
-            CourseDB.name == course.name, CourseDB.teacherId == course.teacherId).first()
-        if existing_course:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
-                                detail="Course with this name and teacher id already exists")
-
-        new_course = CourseDB(**course.dict())
-        db.add(new_course)
-        db.commit()
-        db.refresh(new_course)
-        return new_course
-    except IntegrityError:
-        raise HTTPException(status_code=400, detail="Invalid payload.")
-
-
-@router.get("/{course_id}/students", response_model=List[Student])
-def get_students_on_course(course_id: int, db: Session = Depends(get_db)) -> List[Student]:
+    async with constraint_errors(db, COURSE_CONFLICT, "Invalid payload."):
+        new_course = await insert_returning(db, CourseDB, Course, course.dict())
+        await db.commit()
+    return new_course
+
+
+@router.get("/{course_id}/statistics", response_model=CourseStatisticsDetail,
+            response_class=ORJSONResponse)
+async def get_course_statistics(course_id: int, db: AsyncSession = Depends(get_read_db),
+                                cache: Cache = Depends(get_cache)) -> ORJSONResponse:
+    """Get grade statistics of a course endpoint
+
+    Mean, median, standard deviation, percentiles, a histogram in buckets of
+    10 points and the rank of every student. The result is cached until the
+    next grade write on the course.
+
+    Args:
+        course_id (int): Course ID
+        db (AsyncSession, optional): DB session, a replica if one is fit. Defaults to Depends(get_read_db).
+        cache (Cache, optional): response cache. Defaults to Depends(get_cache).
+
+    Returns:
+        ORJSONResponse: statistics of the course
+    """
+    key = course_statistics_key(course_id)
+    statistics = await cache.get(key)
+    if statistics is None:
+        statistics = await course_statistics(db, course_id)
+        if statistics is None:
+            if not await db.get(CourseDB, course_id):
+                raise HTTPException(status_code=404, detail="Course not found")
+            statistics = empty_statistics(course_id)
+        if fresh_for_cache(db):
+            await cache.set(key, statistics)
+    return ORJSONResponse(statistics)
+
+
+@router.get("/{course_id}/students", response_model=List[Student], response_class=ORJSONResponse)
+async def get_students_on_course(course_id: int, response: Response,
+                                 page: PageParams = Depends(),
+                                 db: AsyncSession = Depends(get_read_db),
+                                 cache: Cache = Depends(get_cache)) -> ORJSONResponse:
     """Get student by course ID endpoint
 
+    Students are read from the CourseRosters table, one range of its primary
+    key, ordered by ID. If there are more students, the X-Next-Cursor
+    response header holds the cursor of the next page. Only the first page
+    of the default size is cached: it is the one most clients ask for.
+
     Args:
         course_id (int): Course ID
-        db (Session, optional): DB Session. Defaults to Depends(get_db).
+        response (Response): response object
+        page (PageParams, optional): cursor and limit (defaults to 500) of the page.
+        db (AsyncSession, optional): DB session, a replica if one is fit. Defaults to Depends(get_read_db).
+        cache (Cache, optional): response cache. Defaults to Depends(get_cache).
 
     Returns:
-        List[Student]: List of students
+        ORJSONResponse: List of students
     """
-    course = db.query(CourseDB).filter(CourseDB.id == course_id).first()
-    if not course:
-        raise HTTPException(status_code=404, detail="Course not found")
+    cacheable = page.cursor is None and page.limit == DEFAULT_LIMIT
+    key = roster_key(course_id)
+    cached = await cache.get(key) if cacheable else None
+    if cached is None:
+        students = await course_roster(db, course_id, page, response)
+        cached = {"items": students, "next": response.headers.get(NEXT_CURSOR_HEADER)}
+        if cacheable and fresh_for_cache(db):
+            await cache.set(key, cached)
+    headers = None if cached["next"] is None else {NEXT_CURSOR_HEADER: cached["next"]}
+    return ORJSONResponse(cached["items"], headers=headers)
 
-    student_db_items = db.query(StudentDB).join(GroupDB).filter(GroupDB.courseId == course_id).all()
-    if not student_db_items:
-        raise HTTPException(status_code=404, detail="No students found for this course")
 
-    students = [Student.from_orm(item) for item in student_db_items]
-    return students
\ No newline at end of file
+async def course_roster(db: AsyncSession, course_id: int, page: PageParams,
+                        response: Response) -> List[Dict[str, Any]]:
+    """Select a page of the students of a course as response dicts.
+
+    The course itself is only looked up when its first page is empty.
+
+    Args:
+        db (AsyncSession): DB Session
+        course_id (int): Course ID
+        page (PageParams): pagination parameters
+        response (Response): response to set the X-Next-Cursor header on
+
+    Raises:
+        HTTPException: 404 if there is no such course or it has no students
+
+    Returns:
+        List[Dict[str, Any]]: students in the Student schema
+    """
+    stmt = select(*model_columns(CourseRosterDB, Student)).where(CourseRosterDB.courseId == course_id)
+    students = await fetch_rows_page(db, stmt, CourseRosterDB.id, page, response)
+    if not students and page.cursor is None:
+        if not await db.get(CourseDB, course_id):
+            raise HTTPException(status_code=404, detail="Course not found")
+        raise HTTPException(status_code=404, detail="No students found for this course")
+    return students
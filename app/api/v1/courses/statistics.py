@@ -0,0 +1,163 @@
+from typing import Any, Dict, List, Optional
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..grades.model import GradeDB
+
+PERCENTILES = (10, 25, 50, 75, 90)
+# Histogram buckets [0, 10), [10, 20) ... [90, 100]; grades out of 0-100
+# are counted in the first or the last bucket.
+BUCKET_WIDTH = 10
+BUCKETS = 10
+
+
+def segment_statistics(grades: np.ndarray, counts: np.ndarray) -> Dict[str, np.ndarray]:
+    """Compute the statistics of many courses at once.
+
+    The grades of all courses lie in one array, course after course, each
+    course's grades sorted. Every statistic is computed for all courses in
+    one vectorized pass, without a loop over the courses.
+
+    Args:
+        grades (np.ndarray): sorted grades of each course, concatenated
+        counts (np.ndarray): number of grades of each course, all above 0
+
+    Returns:
+        Dict[str, np.ndarray]: one array per statistic with a value per course;
+            percentiles has a column per PERCENTILES value and histogram one per bucket
+    """
+    values = grades.astype(np.float64)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    mean = np.add.reduceat(values, starts) / counts
+    variance = np.add.reduceat(values ** 2, starts) / counts - mean ** 2
+    # linear interpolation between the closest ranks, as np.percentile does
+    positions = starts[:, None] + (counts[:, None] - 1) * np.array(PERCENTILES) / 100
+    low = np.floor(positions).astype(np.int64)
+    high = np.ceil(positions).astype(np.int64)
+    percentiles = values[low] + (values[high] - values[low]) * (positions - low)
+
+    course_index = np.repeat(np.arange(len(counts)), counts)
+    buckets = np.clip(grades // BUCKET_WIDTH, 0, BUCKETS - 1)
+    histogram = np.bincount(course_index * BUCKETS + buckets,
+                            minlength=len(counts) * BUCKETS).reshape(len(counts), BUCKETS)
+    return {
+        "count": counts,
+        "mean": mean,
+        "std": np.sqrt(np.maximum(variance, 0)),
+        "min": grades[starts],
+        "max": grades[starts + counts - 1],
+        "percentiles": percentiles,
+        "histogram": histogram,
+    }
+
+
+def _round(value: float) -> float:
+    return round(float(value), 2)
+
+
+def statistics_dicts(course_ids: List[int], stats: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Turn segment_statistics() arrays into response dicts.
+
+    Args:
+        course_ids (List[int]): course of each segment
+        stats (Dict[str, np.ndarray]): statistics from segment_statistics()
+
+    Returns:
+        List[Dict[str, Any]]: statistics in the CourseStatistics schema
+    """
+    bounds = [(bucket * BUCKET_WIDTH, (bucket + 1) * BUCKET_WIDTH) for bucket in range(BUCKETS)]
+    return [
+        {
+            "courseId": course_id,
+            "count": int(stats["count"][i]),
+            "mean": _round(stats["mean"][i]),
+            "median": _round(stats["percentiles"][i, PERCENTILES.index(50)]),
+            "std": _round(stats["std"][i]),
+            "min": int(stats["min"][i]),
+            "max": int(stats["max"][i]),
+            "percentiles": {f"p{q}": _round(value) for q, value in zip(PERCENTILES, stats["percentiles"][i])},
+            "histogram": [{"low": low, "high": high, "count": int(count)}
+                          for (low, high), count in zip(bounds, stats["histogram"][i])],
+        }
+        for i, course_id in enumerate(course_ids)
+    ]
+
+
+def empty_statistics(course_id: int) -> Dict[str, Any]:
+    return {
+        "courseId": course_id, "count": 0, "mean": None, "median": None, "std": None,
+        "min": None, "max": None, "percentiles": {}, "histogram": [], "ranking": [],
+    }
+
+
+def ranking(grades: np.ndarray, student_ids: np.ndarray) -> List[Dict[str, int]]:
+    """Rank the students of a course by grade, best first.
+
+    Students with equal grades share a rank and the next rank is skipped
+    (1, 2, 2, 4).
+
+    Args:
+        grades (np.ndarray): grades sorted in ascending order
+        student_ids (np.ndarray): student of each grade
+
+    Returns:
+        List[Dict[str, int]]: studentId, grade and rank of every grade
+    """
+    # rank = 1 + number of strictly better grades
+    ranks = len(grades) - np.searchsorted(grades, grades, side="right") + 1
+    return [{"studentId": student_id, "grade": grade, "rank": rank}
+            for student_id, grade, rank in zip(student_ids[::-1].tolist(), grades[::-1].tolist(),
+                                                ranks[::-1].tolist())]
+
+
+async def course_statistics(db: AsyncSession, course_id: int) -> Optional[Dict[str, Any]]:
+    """Get the grade statistics and the student ranking of a course.
+
+    The grades come in one row as two arrays sorted by grade.
+
+    Args:
+        db (AsyncSession): DB session
+        course_id (int): Course ID
+
+    Returns:
+        Optional[Dict[str, Any]]: statistics in the CourseStatisticsDetail schema,
+            None if the course has no grades
+    """
+    order = (GradeDB.grade, GradeDB.studentId)
+    stmt = (select(func.array_agg(aggregate_order_by(GradeDB.grade, *order)),
+                   func.array_agg(aggregate_order_by(GradeDB.studentId, *order)))
+            .where(GradeDB.courseId == course_id, GradeDB.grade.isnot(None)))
+    grades, student_ids = (await db.execute(stmt)).one()
+    if not grades:
+        return None
+    grades = np.array(grades, dtype=np.int64)
+    result = statistics_dicts([course_id], segment_statistics(grades, np.array([len(grades)])))[0]
+    result["ranking"] = ranking(grades, np.array(student_ids, dtype=np.int64))
+    return result
+
+
+async def all_course_statistics(db: AsyncSession) -> List[Dict[str, Any]]:
+    """Get the grade statistics of every course with grades.
+
+    One grouped query returns a sorted grade array per course; the
+    statistics of all courses are then computed together.
+
+    Args:
+        db (AsyncSession): DB session
+
+    Returns:
+        List[Dict[str, Any]]: statistics in the CourseStatistics schema, ordered by course ID
+    """
+    stmt = (select(GradeDB.courseId, func.array_agg(aggregate_order_by(GradeDB.grade, GradeDB.grade)))
+            .where(GradeDB.courseId.isnot(None), GradeDB.grade.isnot(None))
+            .group_by(GradeDB.courseId)
+            .order_by(GradeDB.courseId))
+    rows = (await db.execute(stmt)).all()
+    if not rows:
+        return []
+    course_ids = [course_id for course_id, _ in rows]
+    counts = np.array([len(grades) for _, grades in rows])
+    grades = np.fromiter((grade for _, course_grades in rows for grade in course_grades),
+                         dtype=np.int64, count=int(counts.sum()))
+    return statistics_dicts(course_ids, segment_statistics(grades, counts))
@@ -0,0 +1,104 @@
+import hashlib
+from typing import Callable, Optional
+from fastapi import HTTPException, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+# Headers that describe the body and don't belong in a 304 response.
+_BODY_HEADERS = {"content-length", "content-type", "content-encoding"}
+
+
+def body_etag(body: bytes) -> str:
+    """Make a strong ETag out of a response body.
+
+    Args:
+        body (bytes): response body
+
+    Returns:
+        str: quoted ETag
+    """
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_of(model: BaseModel) -> str:
+    """Get the ETag a GET of the object is served with.
+
+    Args:
+        model (BaseModel): response model object
+
+    Returns:
+        str: quoted ETag
+    """
+    return body_etag(JSONResponse(jsonable_encoder(model)).body)
+
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = True) -> bool:
+    """Check an If-None-Match or If-Match header against an ETag.
+
+    Args:
+        header (Optional[str]): header value, a list of ETags or "*"
+        etag (str): current ETag
+        weak (bool, optional): use weak comparison (If-None-Match); strong
+            comparison (If-Match) never matches W/ tags. Defaults to True.
+
+    Returns:
+        bool: True if one of the header ETags matches
+    """
+    if header is None:
+        return False
+    for tag in (tag.strip() for tag in header.split(",")):
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            if not weak:
+                continue
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def check_if_match(if_match: Optional[str], current: BaseModel) -> None:
+    """Enforce an If-Match precondition of a write.
+
+    Args:
+        if_match (Optional[str]): If-Match header, None if not sent
+        current (BaseModel): current state of the object
+
+    Raises:
+        HTTPException: 412 if the object has changed since the client read it
+    """
+    if if_match is not None and not etag_matches(if_match, etag_of(current), weak=False):
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED,
+                            detail="The object has been changed by another request.")
+
+
+class ETagRoute(APIRoute):
+    """Route class that adds an ETag to successful GET responses and answers
+    a matching If-None-Match with 304 Not Modified.
+
+    Streaming responses are passed through untouched.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if "GET" not in self.methods:
+            return handler
+
+        async def etag_handler(request: Request) -> Response:
+            response = await handler(request)
+            body = getattr(response, "body", None)
+            if response.status_code != status.HTTP_200_OK or body is None:
+                return response
+
+            etag = response.headers.get("etag") or body_etag(body)
+            response.headers["ETag"] = etag
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                headers = {key: value for key, value in response.headers.items()
+                           if key not in _BODY_HEADERS}
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+            return response
+
+        return etag_handler
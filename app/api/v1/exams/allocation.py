@@ -0,0 +1,348 @@
+import asyncio
+import datetime
+import multiprocessing
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import EXAM_ALLOCATION_PARALLEL_MIN, EXAM_ALLOCATION_WORKERS
+from ..bookings.model import BookingDB
+from ..bookings.validation import SLOT_LENGTH
+from ..classrooms.model import ClassroomDB
+from ..courses.model import CourseRosterDB
+from ..groups.model import GroupDB
+
+SLOT_MINUTES = int(SLOT_LENGTH.total_seconds()) // 60
+# no classroom is large enough / every large enough classroom is taken /
+# a group of the course has another exam at the time
+REASONS = ("capacity", "classroom", "group")
+# Longest session window of one request, in days counting both ends
+MAX_SESSION_DAYS = 62
+# Rounds of moving exams between classrooms to place the unassigned ones
+LOCAL_SEARCH_ROUNDS = 3
+
+# An exam to place: ID, start in minutes from the window start, students, groups
+Exam = Tuple[int, int, int, Tuple[int, ...]]
+# A classroom: ID, capacity
+Room = Tuple[int, int]
+# Lessons in a classroom, as starts in minutes
+Lessons = Dict[int, List[int]]
+# Classroom of every placed exam and reason of every unplaced one
+Plan = Tuple[Dict[int, int], Dict[int, str]]
+# Exam ID of a lesson in the occupied slots of a classroom; serial IDs start at 1
+LESSON = 0
+
+
+def _overlapping(slots: List[tuple], start: int) -> List[tuple]:
+    """Get the slots overlapping the slot starting at start; all slots are equally long."""
+    i = bisect_right(slots, (start - SLOT_MINUTES, float("inf")))
+    found = []
+    while i < len(slots) and slots[i][0] < start + SLOT_MINUTES:
+        found.append(slots[i])
+        i += 1
+    return found
+
+
+class _Session:
+    """Occupied slots of the classrooms and groups while a run is solved.
+
+    Slots are kept per classroom and per group as sorted lists of
+    (start, exam ID); lessons have the exam ID LESSON and are never moved.
+    The groups of an exam get their slots only once it has a classroom.
+    """
+
+    def __init__(self, rooms: Sequence[Room], lessons: Lessons) -> None:
+        self.rooms = rooms
+        self.capacities = [capacity for _, capacity in rooms]
+        self.room_slots: Dict[int, List[tuple]] = {
+            room_id: [(start, LESSON) for start in sorted(lessons.get(room_id, ()))] for room_id, _ in rooms}
+        self.group_slots: Dict[int, List[tuple]] = defaultdict(list)
+        self.assigned: Dict[int, int] = {}
+
+    def fitting(self, size: int) -> Sequence[Room]:
+        """Get the classrooms with room for size students, smallest first."""
+        return self.rooms[bisect_left(self.capacities, size):]
+
+    def free(self, room_id: int, start: int) -> bool:
+        return not _overlapping(self.room_slots[room_id], start)
+
+    def clashes(self, start: int, groups: Tuple[int, ...]) -> bool:
+        return any(_overlapping(self.group_slots[group], start) for group in groups)
+
+    def _take(self, exam_id: int, start: int, room_id: int) -> None:
+        insort(self.room_slots[room_id], (start, exam_id))
+        self.assigned[exam_id] = room_id
+
+    def place(self, exam_id: int, start: int, room_id: int, groups: Tuple[int, ...]) -> None:
+        self._take(exam_id, start, room_id)
+        for group in groups:
+            insort(self.group_slots[group], (start, exam_id))
+
+    def relocate(self, exam_id: int, start: int, size: int, groups: Tuple[int, ...],
+                 sizes: Dict[int, int]) -> bool:
+        """Place an exam, moving the one exam that blocks a classroom to another one."""
+        if self.clashes(start, groups):
+            return False
+        for room_id, _ in self.fitting(size):
+            if self.free(room_id, start):
+                self.place(exam_id, start, room_id, groups)
+                return True
+            blockers = _overlapping(self.room_slots[room_id], start)
+            if len(blockers) != 1 or blockers[0][1] == LESSON:
+                continue
+            other_start, other_id = blockers[0]
+            target = next((other_room for other_room, _ in self.fitting(sizes[other_id])
+                           if other_room != room_id and self.free(other_room, other_start)), None)
+            if target is None:
+                continue
+            slots = self.room_slots[room_id]
+            del slots[bisect_left(slots, blockers[0])]
+            # the moved exam keeps its time, so its group slots stay
+            self._take(other_id, other_start, target)
+            self.place(exam_id, start, room_id, groups)
+            return True
+        return False
+
+
+def solve(exams: List[Exam], rooms: Sequence[Room], lessons: Lessons) -> Plan:
+    """Assign classrooms to exams that overlap in time.
+
+    Greedy interval partitioning: exams are taken by start time, larger
+    ones first, and each goes to the smallest free classroom that fits its
+    students, so that large classrooms stay free for large exams. A local
+    search then places the exams left over: an exam that finds every
+    fitting classroom taken by a single other exam moves that exam to
+    another free classroom and takes its place. Only placed exams hold their
+    groups, so "group" always names a clash with an exam that got a
+    classroom.
+
+    Args:
+        exams (List[Exam]): exams to place
+        rooms (Sequence[Room]): classrooms, ordered by capacity
+        lessons (Lessons): lesson starts by classroom ID
+
+    Returns:
+        Plan: classroom ID by exam ID and reason by unplaced exam ID
+    """
+    session = _Session(rooms, lessons)
+    unassigned: Dict[int, str] = {}
+    pending = []
+    for exam_id, start, size, groups in sorted(exams, key=lambda exam: (exam[1], -exam[2], exam[0])):
+        if not session.fitting(size):
+            unassigned[exam_id] = "capacity"
+            continue
+        if session.clashes(start, groups):
+            unassigned[exam_id] = "group"
+            continue
+        room_id = next((room_id for room_id, _ in session.fitting(size) if session.free(room_id, start)), None)
+        if room_id is None:
+            pending.append((exam_id, start, size, groups))
+        else:
+            session.place(exam_id, start, room_id, groups)
+
+    sizes = {exam_id: size for exam_id, _, size, _ in exams}
+    pending.sort(key=lambda exam: -exam[2])
+    for _ in range(LOCAL_SEARCH_ROUNDS):
+        left = [exam for exam in pending if not session.relocate(*exam, sizes)]
+        if len(left) == len(pending):
+            break
+        pending = left
+    unassigned.update((exam_id, "group" if session.clashes(start, groups) else "classroom")
+                      for exam_id, start, _, groups in pending)
+    return session.assigned, unassigned
+
+
+def split_runs(exams: List[Exam]) -> List[List[Exam]]:
+    """Split exams into runs that don't overlap in time with each other.
+
+    Classrooms and groups can only clash within a run, so the runs are
+    solved independently.
+
+    Args:
+        exams (List[Exam]): exams
+
+    Returns:
+        List[List[Exam]]: runs of exams, in time order
+    """
+    runs: List[List[Exam]] = []
+    end = None
+    for exam in sorted(exams, key=lambda exam: exam[1]):
+        if end is None or exam[1] >= end:
+            runs.append([])
+        runs[-1].append(exam)
+        end = max(end or 0, exam[1] + SLOT_MINUTES)
+    return runs
+
+
+def solve_runs(runs: List[Tuple[List[Exam], Lessons]], rooms: Sequence[Room]) -> Plan:
+    """Solve runs of exams one after another; the task of a pool worker."""
+    assigned: Dict[int, int] = {}
+    unassigned: Dict[int, str] = {}
+    for exams, lessons in runs:
+        run_assigned, run_unassigned = solve(exams, rooms, lessons)
+        assigned.update(run_assigned)
+        unassigned.update(run_unassigned)
+    return assigned, unassigned
+
+
+def _run_lessons(exams: List[Exam], lessons: Dict[int, List[int]]) -> Lessons:
+    """Get the lessons that overlap a run of exams; lesson starts are sorted."""
+    low, high = exams[0][1] - SLOT_MINUTES, exams[-1][1] + SLOT_MINUTES
+    run_lessons = {}
+    for room_id, starts in lessons.items():
+        found = starts[bisect_right(starts, low):bisect_left(starts, high)]
+        if found:
+            run_lessons[room_id] = found
+    return run_lessons
+
+
+# One pool per server worker, shared by its requests and started on first use
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def process_pool() -> ProcessPoolExecutor:
+    """Get the solver pool of this process, starting it if needed.
+
+    Its processes come from a fork server: forking the threaded server
+    worker itself could copy locks held by other threads.
+
+    Returns:
+        ProcessPoolExecutor: pool of EXAM_ALLOCATION_WORKERS processes
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=EXAM_ALLOCATION_WORKERS,
+                                    mp_context=multiprocessing.get_context("forkserver"))
+    return _pool
+
+
+def shutdown_pool() -> None:
+    """Stop the solver pool of this process, if it was started."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+@asynccontextmanager
+async def lifespan(app) -> AsyncIterator[None]:
+    """Stop the solver pool when the worker process exits."""
+    try:
+        yield
+    finally:
+        shutdown_pool()
+
+
+async def solve_session(exams: List[Exam], rooms: Sequence[Room], lessons: Dict[int, List[int]],
+                        workers: int = EXAM_ALLOCATION_WORKERS,
+                        parallel_min: int = EXAM_ALLOCATION_PARALLEL_MIN) -> Plan:
+    """Assign classrooms to the exams of a session.
+
+    Sessions of parallel_min exams or more are split into runs that are
+    solved in the process pool of the worker, in batches of about equal size.
+
+    Args:
+        exams (List[Exam]): exams
+        rooms (Sequence[Room]): classrooms, ordered by capacity
+        lessons (Dict[int, List[int]]): sorted lesson starts by classroom ID
+        workers (int, optional): batches to split the session into. Defaults to EXAM_ALLOCATION_WORKERS.
+        parallel_min (int, optional): smallest session solved in the pool.
+            Defaults to EXAM_ALLOCATION_PARALLEL_MIN.
+
+    Returns:
+        Plan: classroom ID by exam ID and reason by unplaced exam ID
+    """
+    runs = [(run, _run_lessons(run, lessons)) for run in split_runs(exams)]
+    if len(exams) < parallel_min or workers < 2 or len(runs) < 2:
+        return solve_runs(runs, rooms)
+
+    batch_size = -(-len(exams) // workers)
+    batches: List[List[Tuple[List[Exam], Lessons]]] = [[]]
+    size = 0
+    for run in runs:
+        if size >= batch_size:
+            batches.append([])
+            size = 0
+        batches[-1].append(run)
+        size += len(run[0])
+    loop = asyncio.get_running_loop()
+    pool = process_pool()
+    plans = await asyncio.gather(*(loop.run_in_executor(pool, solve_runs, batch, rooms) for batch in batches))
+    assigned: Dict[int, int] = {}
+    unassigned: Dict[int, str] = {}
+    for batch_assigned, batch_unassigned in plans:
+        assigned.update(batch_assigned)
+        unassigned.update(batch_unassigned)
+    return assigned, unassigned
+
+
+def _minutes(day: datetime.date, time: datetime.time, date_from: datetime.date) -> int:
+    return (day - date_from).days * 24 * 60 + time.hour * 60 + time.minute
+
+
+async def allocate_exams(db: AsyncSession, date_from: datetime.date, date_to: datetime.date,
+                         workers: int = EXAM_ALLOCATION_WORKERS,
+                         parallel_min: int = EXAM_ALLOCATION_PARALLEL_MIN) -> Dict[str, Any]:
+    """Plan the classrooms of the exams of a session window.
+
+    The exams and lessons of the window are read from the Bookings table.
+    The students of an exam are the students of the groups of its course;
+    an exam fits a classroom whose capacity is at least that, no classroom
+    gets two exams or an exam and a lesson at the same time, and no group
+    gets two exams at the same time. Nothing is saved.
+
+    Args:
+        db (AsyncSession): DB session
+        date_from (datetime.date): first day of the session
+        date_to (datetime.date): last day of the session
+        workers (int, optional): pool processes. Defaults to EXAM_ALLOCATION_WORKERS.
+        parallel_min (int, optional): smallest session solved in the pool.
+            Defaults to EXAM_ALLOCATION_PARALLEL_MIN.
+
+    Returns:
+        Dict[str, Any]: plan in the ExamAllocationPlan schema
+    """
+    in_window = BookingDB.date.between(date_from, date_to)
+    exam_rows = (await db.execute(
+        select(BookingDB.sourceId, BookingDB.date, BookingDB.time, BookingDB.courseId)
+        .where(BookingDB.kind == "exam", in_window)
+        .order_by(BookingDB.date, BookingDB.time, BookingDB.sourceId))).all()
+    course_ids = {course_id for _, _, _, course_id in exam_rows if course_id is not None}
+    students = dict((await db.execute(
+        select(CourseRosterDB.courseId, func.count())
+        .where(CourseRosterDB.courseId.in_(course_ids))
+        .group_by(CourseRosterDB.courseId))).all())
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for group_id, course_id in await db.execute(
+            select(GroupDB.id, GroupDB.courseId).where(GroupDB.courseId.in_(course_ids))):
+        groups[course_id].append(group_id)
+    rooms = (await db.execute(
+        select(ClassroomDB.id, ClassroomDB.capacity)
+        .where(ClassroomDB.capacity.isnot(None))
+        .order_by(ClassroomDB.capacity, ClassroomDB.id))).all()
+    lessons: Dict[int, List[int]] = defaultdict(list)
+    for classroom_id, day, time in await db.execute(
+            select(BookingDB.classroomId, BookingDB.date, BookingDB.time)
+            .where(BookingDB.kind == "schedule", in_window, BookingDB.classroomId.isnot(None))
+            .order_by(BookingDB.classroomId, BookingDB.date, BookingDB.time)):
+        lessons[classroom_id].append(_minutes(day, time, date_from))
+
+    exams = [(exam_id, _minutes(day, time, date_from), students.get(course_id, 0),
+              tuple(groups.get(course_id, ())))
+             for exam_id, day, time, course_id in exam_rows]
+    assigned, unassigned = await solve_session(exams, [tuple(room) for room in rooms], lessons,
+                                               workers, parallel_min)
+
+    capacity = dict(rooms)
+    plan, left = [], []
+    for (exam_id, day, time, course_id), (_, _, size, _) in zip(exam_rows, exams):
+        entry = {"examId": exam_id, "date": day, "time": time, "courseId": course_id, "students": size}
+        if exam_id in assigned:
+            room_id = assigned[exam_id]
+            plan.append({**entry, "classroomId": room_id, "capacity": capacity[room_id]})
+        else:
+            left.append({**entry, "reason": unassigned[exam_id]})
+    return {"exams": len(exams), "plan": plan, "unassigned": left}
@@ -1,5 +1,8 @@
+import datetime
+from typing import List, Optional
 from sqlalchemy import Column, Integer, Date, Time, ForeignKey
 from core.database import Base
+from pydantic import BaseModel
 
 class ExamDB(Base):
     """The DB model for an exam."""
@@ -9,4 +12,57 @@ class ExamDB(Base):
     date = Column(Date)
     time = Column(Time)
     courseId = Column(Integer, ForeignKey("Courses.id"))
-    classroomId = Column(Integer, ForeignKey("Classrooms.id"))
\ No newline at end of file
+    classroomId = Column(Integer, ForeignKey("Classrooms.id"))
+
+
+class Exam(BaseModel):
+    """The Pydantic model for an exam."""
+    id: int
+    date: datetime.date
+    time: datetime.time
+    courseId: int
+    classroomId: int
+
+    class Config:
+        orm_mode = True
+
+
+class ExamCreate(BaseModel):
+    """The Pydantic model for creating an exam."""
+    date: datetime.date
+    time: datetime.time
+    courseId: int
+    classroomId: int
+
+
+class ExamAllocation(BaseModel):
+    """The Pydantic model for the classroom planned for an exam."""
+    examId: int
+    date: datetime.date
+    time: datetime.time
+    courseId: Optional[int]
+    students: int
+    classroomId: int
+    capacity: int
+
+
+class UnassignedExam(BaseModel):
+    """The Pydantic model for an exam no classroom was found for.
+
+    reason is capacity (no classroom is large enough), classroom (every
+    large enough classroom is taken) or group (a group of the course has
+    another exam at the time).
+    """
+    examId: int
+    date: datetime.date
+    time: datetime.time
+    courseId: Optional[int]
+    students: int
+    reason: str
+
+
+class ExamAllocationPlan(BaseModel):
+    """The Pydantic model for the classroom plan of an exam session."""
+    exams: int
+    plan: List[ExamAllocation]
+    unassigned: List[UnassignedExam]
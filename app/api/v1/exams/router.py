@@ -0,0 +1,120 @@
+import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_async_db
+from core.replicas import get_read_db
+from .allocation import MAX_SESSION_DAYS, allocate_exams
+from .model import ExamDB, Exam, ExamAllocationPlan, ExamCreate
+from ..bookings.model import BOOKING_CONFLICT, TimetableReport
+from ..bookings.validation import validate_timetable
+from ..bulk import read_rows, request_body_schema
+from ..constraints import constraint_errors
+from ..etag import ETagRoute
+from ..pagination import PageParams, fetch_page
+from ..rows import insert_returning
+
+router = APIRouter(route_class=ETagRoute)
+
+
+@router.get("/", response_model=List[Exam])
+async def get_exams(response: Response,
+                    courseId: Optional[int] = None,
+                    classroomId: Optional[int] = None,
+                    page: PageParams = Depends(),
+                    db: AsyncSession = Depends(get_async_db)) -> List[Exam]:
+    """Get exams list endpoint
+
+    The list is ordered by ID. If there are more exams, the X-Next-Cursor
+    response header holds the cursor of the next page.
+
+    Args:
+        response (Response): response object
+        courseId (Optional[int], optional): Course ID filter. Defaults to None.
+        classroomId (Optional[int], optional): Classroom ID filter. Defaults to None.
+        page (PageParams, optional): cursor and limit (defaults to 500) of the page.
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+
+    Returns:
+        List[Exam]: List of exam objects
+    """
+    stmt = select(ExamDB)
+    if courseId is not None:
+        stmt = stmt.where(ExamDB.courseId == courseId)
+    if classroomId is not None:
+        stmt = stmt.where(ExamDB.classroomId == classroomId)
+    return await fetch_page(db, stmt, ExamDB.id, page, response)
+
+
+@router.post("/", response_model=Exam)
+async def create_exam(exam: ExamCreate, db: AsyncSession = Depends(get_async_db)) -> Exam:
+    """Create an exam endpoint
+
+    The DB rejects an exam that overlaps a lesson or an exam in the same
+    classroom or of the same course with 409.
+
+    Args:
+        exam (ExamCreate): new exam object
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+
+    Returns:
+        Exam: created exam
+    """
+    async with constraint_errors(db, BOOKING_CONFLICT, "Invalid payload."):
+        new_exam = await insert_returning(db, ExamDB, Exam, exam.dict())
+        await db.commit()
+    return new_exam
+
+
+@router.post("/validate", response_model=TimetableReport,
+             openapi_extra={"requestBody": request_body_schema(ExamCreate)})
+async def validate_exams(request: Request,
+                         db: AsyncSession = Depends(get_async_db)) -> TimetableReport:
+    """Validate a timetable of exams endpoint
+
+    The body is a JSON array, NDJSON or CSV (with a header row) of exam
+    objects. Nothing is saved: the report lists the invalid rows and every
+    double booking of a classroom or a course, between the rows and with the
+    stored schedules and exams.
+
+    Args:
+        request (Request): request object
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+
+    Returns:
+        TimetableReport: invalid rows and conflicts
+    """
+    report = await validate_timetable(db, read_rows(request), ExamCreate)
+    return JSONResponse(report.dict())
+
+
+@router.get("/allocation", response_model=ExamAllocationPlan, response_class=ORJSONResponse)
+async def get_exam_allocation(dateFrom: datetime.date, dateTo: datetime.date,
+                              db: AsyncSession = Depends(get_read_db)) -> ORJSONResponse:
+    """Plan the classrooms of an exam session endpoint
+
+    Every exam of the window gets a classroom that holds the students of
+    the groups of its course, without double-booking a classroom (with
+    exams or lessons) or a group. Large sessions are solved in a process
+    pool. Nothing is saved: the plan lists the classroom of every exam and
+    the exams no classroom was found for.
+
+    Args:
+        dateFrom (datetime.date): first day of the session
+        dateTo (datetime.date): last day of the session, at most 61 days after dateFrom
+        db (AsyncSession, optional): DB session, a replica if one is fit. Defaults to Depends(get_read_db).
+
+    Raises:
+        HTTPException: 400 if dateTo is before dateFrom or the window is longer than 62 days
+
+    Returns:
+        ORJSONResponse: classroom plan and unassigned exams
+    """
+    if dateTo < dateFrom:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="dateTo is before dateFrom")
+    if (dateTo - dateFrom).days >= MAX_SESSION_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"The window is longer than {MAX_SESSION_DAYS} days")
+    return ORJSONResponse(await allocate_exams(db, dateFrom, dateTo))
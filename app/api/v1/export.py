@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+from enum import Enum
+from typing import AsyncIterator, List, Sequence
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Rows fetched from the server-side cursor and sent per chunk.
+PARTITION_SIZE = 1000
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def _csv_chunk(rows: Sequence[Sequence]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue()
+
+
+def _ndjson_chunk(columns: List[str], rows: Sequence[Sequence]) -> str:
+    return "".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows)
+
+
+async def _stream_rows(db: AsyncSession, stmt: Select, fmt: ExportFormat) -> AsyncIterator[str]:
+    result = await db.stream(stmt.execution_options(yield_per=PARTITION_SIZE))
+    columns = list(result.keys())
+    if fmt == ExportFormat.csv:
+        yield _csv_chunk([columns])
+    async for rows in result.partitions():
+        if fmt == ExportFormat.csv:
+            yield _csv_chunk(rows)
+        else:
+            yield _ndjson_chunk(columns, rows)
+
+
+def export_response(db: AsyncSession, stmt: Select, fmt: ExportFormat, name: str) -> StreamingResponse:
+    """Stream the rows of a select as NDJSON or CSV.
+
+    Rows are read through a server-side cursor in partitions of
+    PARTITION_SIZE, so memory use doesn't depend on the table size. The
+    session has to stay open until the body is sent, which FastAPI
+    dependencies with yield guarantee.
+
+    Args:
+        db (AsyncSession): DB session
+        stmt (Select): select of plain columns; the column names become
+            CSV headers and NDJSON keys
+        fmt (ExportFormat): output format
+        name (str): file name without extension
+
+    Returns:
+        StreamingResponse: response streaming the rows
+    """
+    return StreamingResponse(
+        _stream_rows(db, stmt, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt.value}"'},
+    )
@@ -1,11 +1,16 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from typing import List, Optional
+from sqlalchemy import BigInteger, Column, Integer, ForeignKey, UniqueConstraint
 from core.database import Base
 from pydantic import BaseModel
+from ..bulk import RowResult
 
 
 class GradeDB(Base):
     """The DB model for a grade"""
     __tablename__ = "Grades"
+    __table_args__ = (
+        UniqueConstraint("studentId", "courseId", name="uq_Grades_studentId_courseId"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     grade = Column(Integer)
@@ -13,6 +18,21 @@ class GradeDB(Base):
     courseId = Column(Integer, ForeignKey("Courses.id"))
 
 
+class StudentGradeSummaryDB(Base):
+    """The DB model for the grade totals of a student.
+
+    The table is maintained by triggers on Grades and Courses
+    (db/queries/create_grade_summaries.sql) and is only read by the API.
+    """
+    __tablename__ = "StudentGradeSummaries"
+
+    studentId = Column(Integer, ForeignKey("Students.id", ondelete="CASCADE"), primary_key=True)
+    gradeCount = Column(Integer, nullable=False)
+    gradeSum = Column(BigInteger, nullable=False)
+    credits = Column(BigInteger, nullable=False)
+    creditPoints = Column(BigInteger, nullable=False)
+
+
 class Grade(BaseModel):
     """The Pydantic model for a grade."""
     id: int
@@ -29,3 +49,33 @@ class GradeCreate(BaseModel):
     grade: int
     studentId: int
     courseId: int
+
+
+class GradeUpsertReport(BaseModel):
+    """The Pydantic model for the result of a bulk grade upsert."""
+    created: int
+    updated: int
+    failed: int
+    results: List[RowResult]
+
+
+class GradeSummary(BaseModel):
+    """The Pydantic model for the grade average and GPA of a student."""
+    studentId: int
+    gradeCount: int
+    mean: Optional[float]
+    credits: int
+    gpa: Optional[float]
+
+
+class TranscriptEntry(BaseModel):
+    """The Pydantic model for a grade on a transcript."""
+    courseId: int
+    courseName: Optional[str]
+    credits: int
+    grade: int
+
+
+class Transcript(GradeSummary):
+    """The Pydantic model for a student transcript."""
+    grades: List[TranscriptEntry]
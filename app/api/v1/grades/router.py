@@ -1,63 +1,184 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from core.database import get_db
-from .model import GradeDB, Grade, GradeCreate
+from core.cache import Cache, get_cache
+from core.database import get_async_db
+from .model import GradeDB, Grade, GradeCreate, GradeUpsertReport
+from .upsert import upsert_grades
+from ..bulk import read_rows, request_body_schema
+from ..cache import invalidate_grades
+from ..constraints import constraint_errors
+from ..etag import ETagRoute, check_if_match, etag_of
+from ..export import ExportFormat, export_response
+from ..pagination import PageParams, fetch_page
+from ..rows import insert_returning, update_returning
+
+GRADE_CONFLICT = {
+    "uq_Grades_studentId_courseId": "Grade with this student id and course id already exists",
+}
+
+router = APIRouter(route_class=ETagRoute)
+
+
+@router.get("/", response_model=List[Grade])
+async def get_grades(response: Response,
+                     studentId: Optional[int] = None,
+                     courseId: Optional[int] = None,
+                     page: PageParams = Depends(),
+                     db: AsyncSession = Depends(get_async_db)) -> List[Grade]:
+    """Get grades list endpoint
+
+    The list is ordered by ID. If there are more grades, the X-Next-Cursor
+    response header holds the cursor of the next page.
+
+    Args:
+        response (Response): response object
+        studentId (Optional[int], optional): Student ID filter. Defaults to None.
+        courseId (Optional[int], optional): Course ID filter. Defaults to None.
+        page (PageParams, optional): cursor and limit (defaults to 500) of the page.
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+
+    Returns:
+        List[Grade]: List of grade objects
+    """
+    stmt = select(GradeDB)
+    if studentId is not None:
+        stmt = stmt.where(GradeDB.studentId == studentId)
+    if courseId is not None:
+        stmt = stmt.where(GradeDB.courseId == courseId)
+    return await fetch_page(db, stmt, GradeDB.id, page, response)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_grades(format: ExportFormat = ExportFormat.ndjson,
+                        studentId: Optional[int] = None,
+                        courseId: Optional[int] = None,
+                        db: AsyncSession = Depends(get_async_db)) -> StreamingResponse:
+    """Export grades endpoint
+
+    Streams all grades ordered by ID through a server-side cursor.
+
+    Args:
+        format (ExportFormat, optional): ndjson or csv. Defaults to ndjson.
+        studentId (Optional[int], optional): Student ID filter. Defaults to None.
+        courseId (Optional[int], optional): Course ID filter. Defaults to None.
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+
+    Returns:
+        StreamingResponse: grades as NDJSON or CSV
+    """
+    stmt = select(GradeDB.id, GradeDB.grade, GradeDB.studentId,
+                  GradeDB.courseId).order_by(GradeDB.id)
+    if studentId is not None:
+        stmt = stmt.where(GradeDB.studentId == studentId)
+    if courseId is not None:
+        stmt = stmt.where(GradeDB.courseId == courseId)
+    return export_response(db, stmt, format, "grades")
+
+
+@router.get("/{grade_id}", response_model=Grade)
+async def get_grade_by_id(grade_id: int, db: AsyncSession = Depends(get_async_db)) -> Grade:
+    """Get grade by ID endpoint
+
+    Args:
+        grade_id (int): grade id in DB
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+
+    Returns:
+        Grade: grade object
+    """
+    grade = await db.get(GradeDB, grade_id)
+    if grade is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Grade not found")
+    return grade
 
-router = APIRouter()
 
 @router.post("/", response_model=Grade)
-def create_grade(grade: GradeCreate, db: Session = Depends(get_db)) -> Grade:
+async def create_grade(grade: GradeCreate, db: AsyncSession = Depends(get_async_db),
+                       cache: Cache = Depends(get_cache)) -> Grade:
     """Create a new grade
 
     Args:
         grade (GradeCreate): new grade object
-        db (Session, optional): DB session. Defaults to Depends(get_db).
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+        cache (Cache, optional): response cache. Defaults to Depends(get_cache).
 
     Returns:
         Grade: created grade
     """
+    async with constraint_errors(db, GRADE_CONFLICT, "Invalid payload."):
+        new_grade = await insert_returning(db, GradeDB, Grade, grade.dict())
+        await db.commit()
+    await invalidate_grades(cache, [grade.courseId])
+    return new_grade
+
+
+@router.post("/bulk", response_model=GradeUpsertReport,
+             openapi_extra={"requestBody": request_body_schema(GradeCreate)})
+async def upsert_grades_bulk(request: Request,
+                             db: AsyncSession = Depends(get_async_db),
+                             cache: Cache = Depends(get_cache)) -> GradeUpsertReport:
+    """Bulk create or update grades endpoint
+
+    The body is a JSON array, NDJSON or CSV (with a header row) of grade
+    objects. A grade of an existing (studentId, courseId) pair is updated,
+    otherwise a new one is created. Valid rows are saved in one transaction;
+    the rest are reported with an error.
+
+    Args:
+        request (Request): request object
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+        cache (Cache, optional): response cache. Defaults to Depends(get_cache).
+
+    Returns:
+        GradeUpsertReport: created/updated/failed counts and per-row results
+    """
+    courses = set()
     try:
-        existing_grade = db.query(GradeDB).filter(
-            GradeDB.studentId == grade.studentId, GradeDB.courseId == grade.courseId).first()
-        if existing_grade:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
-                                detail="Grade with this student id and course id already exists")
-
-        new_grade = GradeDB(**grade.dict())
-        db.add(new_grade)
-        db.commit()
-        db.refresh(new_grade)
-        return new_grade
+        report = await upsert_grades(db, read_rows(request), courses)
+        await db.commit()
     except IntegrityError:
-        raise HTTPException(status_code=400, detail="Invalid payload.")
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail="The grades conflict with concurrent changes.")
+    await invalidate_grades(cache, courses)
+    # The report is built from checked values; skip re-validating every row.
+    return JSONResponse(report.dict())
 
 
 @router.put("/{grade_id}", response_model=Grade)
-def update_grade(grade_id: int, grade: GradeCreate, db: Session = Depends(get_db)) -> Grade:
+async def update_grade(grade_id: int, grade: GradeCreate, response: Response,
+                       if_match: Optional[str] = Header(None),
+                       db: AsyncSession = Depends(get_async_db),
+                       cache: Cache = Depends(get_cache)) -> Grade:
     """Update a grade endpoint
 
+    With an If-Match header the grade is only updated if its ETag matches,
+    otherwise 412 is returned.
+
     Args:
         grade_id (int): grade id in DB
         grade (GradeCreate): a new grade object
-        db (Session, optional): DB session. Defaults to Depends(get_db).
+        response (Response): response object
+        if_match (Optional[str], optional): If-Match header. Defaults to None.
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+        cache (Cache, optional): response cache. Defaults to Depends(get_cache).
 
     Returns:
         Grade: updated grade
     """
-    db_grade = db.get(GradeDB, grade_id)
-    if not db_grade:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Grade not found")
-
-    for key, value in grade.dict().items():
-        setattr(db_grade, key, value)
+    async with constraint_errors(db, GRADE_CONFLICT, "Invalid data."):
+        states = await update_returning(db, GradeDB, Grade, grade_id, grade.dict())
+        if states is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Grade not found")
+        old, new = states
+        check_if_match(if_match, Grade.construct(**old))
+        await db.commit()
+    await invalidate_grades(cache, {old["courseId"], new["courseId"]})
 
-    try:
-        db.commit()
-        db.refresh(db_grade)
-        return db_grade
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid data.")
\ No newline at end of file
+    response.headers["ETag"] = etag_of(Grade.construct(**new))
+    return new
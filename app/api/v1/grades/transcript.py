@@ -0,0 +1,94 @@
+from typing import Any, Dict, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import Select, and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .model import GradeDB, StudentGradeSummaryDB
+from ..courses.model import CourseDB
+from ..students.model import StudentDB
+
+# Totals come from StudentGradeSummaries, kept up to date by triggers, so
+# neither query aggregates over Grades. Students without grades have no
+# summary row yet, hence the outer join.
+_SUMMARY_COLUMNS = (
+    StudentDB.id,
+    StudentGradeSummaryDB.gradeCount,
+    StudentGradeSummaryDB.gradeSum,
+    StudentGradeSummaryDB.credits,
+    StudentGradeSummaryDB.creditPoints,
+)
+
+
+def _summary_select(*columns) -> Select:
+    return (select(*_SUMMARY_COLUMNS, *columns)
+            .outerjoin(StudentGradeSummaryDB, StudentGradeSummaryDB.studentId == StudentDB.id))
+
+
+def _ratio(total: Optional[int], count: Optional[int]) -> Optional[float]:
+    return round(total / count, 2) if count else None
+
+
+def _summary(row) -> Dict[str, Any]:
+    return {
+        "studentId": row.id,
+        "gradeCount": row.gradeCount or 0,
+        "mean": _ratio(row.gradeSum, row.gradeCount),
+        "credits": row.credits or 0,
+        "gpa": _ratio(row.creditPoints, row.credits),
+    }
+
+
+def _not_found() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student not found")
+
+
+async def grade_summary(db: AsyncSession, student_id: int) -> Dict[str, Any]:
+    """Get the grade count, mean and credit-weighted GPA of a student.
+
+    Args:
+        db (AsyncSession): DB session
+        student_id (int): Student ID
+
+    Raises:
+        HTTPException: 404 if there is no such student
+
+    Returns:
+        Dict[str, Any]: summary in the GradeSummary schema
+    """
+    row = (await db.execute(_summary_select().where(StudentDB.id == student_id))).first()
+    if row is None:
+        raise _not_found()
+    return _summary(row)
+
+
+async def transcript(db: AsyncSession, student_id: int) -> Dict[str, Any]:
+    """Get the grades of a student with their courses and the summary.
+
+    Everything is read in one query: the summary columns repeat on every
+    grade row.
+
+    Args:
+        db (AsyncSession): DB session
+        student_id (int): Student ID
+
+    Raises:
+        HTTPException: 404 if there is no such student
+
+    Returns:
+        Dict[str, Any]: transcript in the Transcript schema
+    """
+    stmt = (_summary_select(GradeDB.courseId, CourseDB.name.label("courseName"),
+                            CourseDB.credits.label("courseCredits"), GradeDB.grade)
+            .outerjoin(GradeDB, and_(GradeDB.studentId == StudentDB.id, GradeDB.grade.isnot(None)))
+            .outerjoin(CourseDB, CourseDB.id == GradeDB.courseId)
+            .where(StudentDB.id == student_id)
+            .order_by(GradeDB.courseId))
+    rows = (await db.execute(stmt)).all()
+    if not rows:
+        raise _not_found()
+    result = _summary(rows[0])
+    result["grades"] = [
+        {"courseId": row.courseId, "courseName": row.courseName,
+         "credits": row.courseCredits, "grade": row.grade}
+        for row in rows if row.courseId is not None
+    ]
+    return result
@@ -0,0 +1,96 @@
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from pydantic import ValidationError
+from sqlalchemy import Integer, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from .model import GradeCreate, GradeUpsertReport
+from ..bulk import RowResult, batches, validation_message
+
+BATCH_SIZE = 5000
+
+# Rows with an unknown student or course are filtered out instead of failing
+# the statement; the rest are inserted or updated in the same round trip.
+# xmax is 0 only for rows inserted by this statement.
+_UPSERT_GRADES = text("""
+    INSERT INTO "Grades" (grade, "studentId", "courseId")
+    SELECT i.grade, i."studentId", i."courseId"
+    FROM unnest(:grades, :student_ids, :course_ids) AS i(grade, "studentId", "courseId")
+    WHERE EXISTS (SELECT 1 FROM "Students" s WHERE s.id = i."studentId")
+      AND EXISTS (SELECT 1 FROM "Courses" c WHERE c.id = i."courseId")
+    ON CONFLICT ("studentId", "courseId") DO UPDATE SET grade = EXCLUDED.grade
+    RETURNING id, "studentId", "courseId", xmax = 0 AS inserted
+""").bindparams(
+    bindparam("grades", type_=ARRAY(Integer)),
+    bindparam("student_ids", type_=ARRAY(Integer)),
+    bindparam("course_ids", type_=ARRAY(Integer)),
+)
+
+
+async def _upsert_batch(db: AsyncSession, batch: List[Tuple[int, Any]],
+                        seen: Set[Tuple[int, int]], courses: Set[int]) -> Tuple[List[RowResult], int]:
+    results: Dict[int, RowResult] = {}
+    valid: List[Tuple[int, GradeCreate]] = []
+
+    for number, row in batch:
+        try:
+            grade = GradeCreate.parse_obj(row)
+        except ValidationError as error:
+            results[number] = RowResult.construct(row=number, error=validation_message(error))
+            continue
+        key = (grade.studentId, grade.courseId)
+        if key in seen:
+            results[number] = RowResult.construct(
+                row=number, error="Duplicate student id and course id in the request")
+            continue
+        seen.add(key)
+        valid.append((number, grade))
+
+    created = 0
+    if valid:
+        upserted = await db.execute(_UPSERT_GRADES, {
+            "grades": [grade.grade for _, grade in valid],
+            "student_ids": [grade.studentId for _, grade in valid],
+            "course_ids": [grade.courseId for _, grade in valid],
+        })
+        ids = {}
+        for grade_id, student_id, course_id, inserted in upserted:
+            ids[student_id, course_id] = grade_id
+            courses.add(course_id)
+            created += inserted
+        for number, grade in valid:
+            grade_id = ids.get((grade.studentId, grade.courseId))
+            if grade_id is None:
+                results[number] = RowResult.construct(row=number, error="Invalid student id or course id.")
+            else:
+                results[number] = RowResult.construct(row=number, id=grade_id)
+
+    return [results[number] for number, _ in batch], created
+
+
+async def upsert_grades(db: AsyncSession, rows: AsyncIterator[Any],
+                        courses: Optional[Set[int]] = None) -> GradeUpsertReport:
+    """Insert or update grades by (studentId, courseId) in one statement per batch.
+
+    Rows that fail are reported and skipped; the caller commits the rest.
+
+    Args:
+        db (AsyncSession): DB session
+        rows (AsyncIterator[Any]): rows from read_rows()
+        courses (Optional[Set[int]], optional): set to add the IDs of courses with changed grades to
+
+    Returns:
+        GradeUpsertReport: counts and per-row results in input order
+    """
+    results: List[RowResult] = []
+    created = 0
+    seen: Set[Tuple[int, int]] = set()
+    courses = set() if courses is None else courses
+    async for batch in batches(rows, BATCH_SIZE):
+        batch_results, batch_created = await _upsert_batch(db, batch, seen, courses)
+        results.extend(batch_results)
+        created += batch_created
+
+    succeeded = sum(1 for result in results if result.id is not None)
+    return GradeUpsertReport.construct(
+        created=created, updated=succeeded - created,
+        failed=len(results) - succeeded, results=results)
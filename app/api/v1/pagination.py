@@ -0,0 +1,130 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+from .rows import as_dicts
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    """Make an opaque cursor pointing after a row.
+
+    Args:
+        last_id (int): ID of the last row of a page
+
+    Returns:
+        str: cursor
+    """
+    raw = json.dumps({"after": last_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Get the row ID a cursor points after.
+
+    Args:
+        cursor (str): cursor from the X-Next-Cursor header
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+
+    Returns:
+        int: ID of the last row of the previous page
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        after = json.loads(raw)["after"]
+    except (ValueError, KeyError, TypeError):
+        after = None
+    if not isinstance(after, int):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+    return after
+
+
+class PageParams:
+    """Keyset pagination query parameters dependency."""
+
+    def __init__(self,
+                 cursor: Optional[str] = None,
+                 limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT)) -> None:
+        self.cursor = cursor
+        self.limit = limit
+
+
+def keyset_page(stmt: Select, id_column: InstrumentedAttribute, page: PageParams) -> Select:
+    """Restrict a select to one page, ordered by the id column.
+
+    One extra row is selected to learn whether there is a next page.
+
+    Args:
+        stmt (Select): select statement with filters applied
+        id_column (InstrumentedAttribute): unique, indexed id column
+        page (PageParams): pagination parameters
+
+    Returns:
+        Select: statement for the page
+    """
+    if page.cursor is not None:
+        stmt = stmt.where(id_column > decode_cursor(page.cursor))
+    return stmt.order_by(id_column).limit(page.limit + 1)
+
+
+def finish_page(items: List, page: PageParams, response: Response, key: str = "id") -> List:
+    """Cut the extra row off a page and set the X-Next-Cursor header.
+
+    Args:
+        items (List): rows selected by a keyset_page() statement
+        page (PageParams): pagination parameters
+        response (Response): response to set the header on
+        key (str, optional): name of the id attribute. Defaults to "id".
+
+    Returns:
+        List: rows of the page
+    """
+    if len(items) > page.limit:
+        items = items[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(items[-1], key))
+    return items
+
+
+async def fetch_page(db: AsyncSession, stmt: Select, id_column: InstrumentedAttribute,
+                     page: PageParams, response: Response) -> List:
+    """Fetch one page of ORM objects with keyset pagination.
+
+    Args:
+        db (AsyncSession): DB session
+        stmt (Select): select of ORM entities with filters applied
+        id_column (InstrumentedAttribute): unique, indexed id column
+        page (PageParams): pagination parameters
+        response (Response): response to set the X-Next-Cursor header on
+
+    Returns:
+        List: ORM objects of the page
+    """
+    result = await db.scalars(keyset_page(stmt, id_column, page))
+    return finish_page(result.all(), page, response, id_column.key)
+
+
+async def fetch_rows_page(db: AsyncSession, stmt: Select, id_column: InstrumentedAttribute,
+                          page: PageParams, response: Response) -> List[Dict[str, Any]]:
+    """Fetch one page of plain rows with keyset pagination.
+
+    Args:
+        db (AsyncSession): DB session
+        stmt (Select): select of columns (see rows.model_columns) with filters applied
+        id_column (InstrumentedAttribute): unique, indexed id column, must be selected
+        page (PageParams): pagination parameters
+        response (Response): response to set the X-Next-Cursor header on
+
+    Returns:
+        List[Dict[str, Any]]: rows of the page as dicts
+    """
+    result = await db.execute(keyset_page(stmt, id_column, page))
+    return as_dicts(finish_page(result.all(), page, response, id_column.key))
@@ -3,6 +3,9 @@ from .teachers.router import router as teachers_router
 from .students.router import router as students_router
 from .courses.router import router as courses_router
 from .grades.router import router as grades_router
+from .schedules.router import router as schedules_router
+from .exams.router import router as exams_router
+from .timetable.router import router as timetable_router
 
 router = APIRouter()
 
@@ -10,3 +13,6 @@ router.include_router(teachers_router, prefix='/teachers', tags=['Teachers'])
 router.include_router(students_router, prefix='/students', tags=['Students'])
 router.include_router(courses_router, prefix='/courses', tags=['Courses'])
 router.include_router(grades_router, prefix='/grades', tags=['Grades'])
+router.include_router(schedules_router, prefix='/schedules', tags=['Schedules'])
+router.include_router(exams_router, prefix='/exams', tags=['Exams'])
+router.include_router(timetable_router, prefix='/timetable', tags=['Timetable'])
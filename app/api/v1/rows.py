@@ -0,0 +1,89 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+from pydantic import BaseModel
+from sqlalchemy import Row, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+
+def model_columns(entity: Type, model: Type[BaseModel]) -> List[InstrumentedAttribute]:
+    """Get the columns of an ORM entity that make up a response model.
+
+    Selecting these instead of the entity returns plain row tuples, which
+    are much cheaper to build than ORM objects.
+
+    Args:
+        entity (Type): ORM class, e.g. StudentDB
+        model (Type[BaseModel]): Pydantic model with fields named as the columns
+
+    Returns:
+        List[InstrumentedAttribute]: columns in the order of the model fields
+    """
+    return [getattr(entity, name) for name in model.__fields__]
+
+
+def as_dicts(rows: Iterable[Row]) -> List[Dict[str, Any]]:
+    """Turn rows selected with model_columns() into response dicts.
+
+    The values come from the DB as they were validated on write, so the
+    dicts are returned as they are, without a second Pydantic pass.
+
+    Args:
+        rows (Iterable[Row]): result rows
+
+    Returns:
+        List[Dict[str, Any]]: one dict per row
+    """
+    return [row._asdict() for row in rows]
+
+
+async def insert_returning(db: AsyncSession, entity: Type, model: Type[BaseModel],
+                           values: Dict[str, Any]) -> Dict[str, Any]:
+    """INSERT a row and get it back in the same statement.
+
+    Args:
+        db (AsyncSession): DB session
+        entity (Type): ORM class
+        model (Type[BaseModel]): response model
+        values (Dict[str, Any]): column values
+
+    Returns:
+        Dict[str, Any]: the new row in the response model schema
+    """
+    table = entity.__table__
+    stmt = insert(table).values(**values).returning(*(table.c[name] for name in model.__fields__))
+    return (await db.execute(stmt)).one()._asdict()
+
+
+async def update_returning(db: AsyncSession, entity: Type, model: Type[BaseModel], object_id: int,
+                           values: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """UPDATE a row by ID and get its old and new state in the same statement.
+
+    The old state is read with FOR UPDATE in the statement itself, so
+    callers can check preconditions on it and roll back.
+
+    Args:
+        db (AsyncSession): DB session
+        entity (Type): ORM class with an id column
+        model (Type[BaseModel]): response model
+        object_id (int): ID of the row
+        values (Dict[str, Any]): new column values
+
+    Returns:
+        Optional[Tuple[Dict[str, Any], Dict[str, Any]]]: the old and the new
+            row in the response model schema, None if there is no such row
+    """
+    table = entity.__table__
+    columns = [table.c[name] for name in model.__fields__]
+    old = select(*columns).where(table.c.id == object_id).with_for_update().subquery("old")
+    stmt = (
+        update(table)
+        .where(table.c.id == old.c.id)
+        .values(**values)
+        .returning(*columns, *(old.c[column.key].label(f"old_{column.key}") for column in columns))
+    )
+    row = (await db.execute(stmt)).one_or_none()
+    if row is None:
+        return None
+    row = row._asdict()
+    return ({column.key: row[f"old_{column.key}"] for column in columns},
+            {column.key: row[column.key] for column in columns})
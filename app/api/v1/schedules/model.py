@@ -1,5 +1,7 @@
+import datetime
 from sqlalchemy import Column, Integer, Date, Time, ForeignKey
 from core.database import Base
+from pydantic import BaseModel
 
 class ScheduleDB(Base):
     """The DB model for a schedule."""
@@ -9,4 +11,24 @@ class ScheduleDB(Base):
     date = Column(Date)
     time = Column(Time)
     courseId = Column(Integer, ForeignKey("Courses.id"))
-    classroomId = Column(Integer, ForeignKey("Classrooms.id"))
\ No newline at end of file
+    classroomId = Column(Integer, ForeignKey("Classrooms.id"))
+
+
+class Schedule(BaseModel):
+    """The Pydantic model for a schedule."""
+    id: int
+    date: datetime.date
+    time: datetime.time
+    courseId: int
+    classroomId: int
+
+    class Config:
+        orm_mode = True
+
+
+class ScheduleCreate(BaseModel):
+    """The Pydantic model for creating a schedule."""
+    date: datetime.date
+    time: datetime.time
+    courseId: int
+    classroomId: int
@@ -0,0 +1,87 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_async_db
+from .model import ScheduleDB, Schedule, ScheduleCreate
+from ..bookings.model import BOOKING_CONFLICT, TimetableReport
+from ..bookings.validation import validate_timetable
+from ..bulk import read_rows, request_body_schema
+from ..constraints import constraint_errors
+from ..etag import ETagRoute
+from ..pagination import PageParams, fetch_page
+from ..rows import insert_returning
+
+router = APIRouter(route_class=ETagRoute)
+
+
+@router.get("/", response_model=List[Schedule])
+async def get_schedules(response: Response,
+                        courseId: Optional[int] = None,
+                        classroomId: Optional[int] = None,
+                        page: PageParams = Depends(),
+                        db: AsyncSession = Depends(get_async_db)) -> List[Schedule]:
+    """Get schedules list endpoint
+
+    The list is ordered by ID. If there are more schedules, the X-Next-Cursor
+    response header holds the cursor of the next page.
+
+    Args:
+        response (Response): response object
+        courseId (Optional[int], optional): Course ID filter. Defaults to None.
+        classroomId (Optional[int], optional): Classroom ID filter. Defaults to None.
+        page (PageParams, optional): cursor and limit (defaults to 500) of the page.
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+
+    Returns:
+        List[Schedule]: List of schedule objects
+    """
+    stmt = select(ScheduleDB)
+    if courseId is not None:
+        stmt = stmt.where(ScheduleDB.courseId == courseId)
+    if classroomId is not None:
+        stmt = stmt.where(ScheduleDB.classroomId == classroomId)
+    return await fetch_page(db, stmt, ScheduleDB.id, page, response)
+
+
+@router.post("/", response_model=Schedule)
+async def create_schedule(schedule: ScheduleCreate, db: AsyncSession = Depends(get_async_db)) -> Schedule:
+    """Create a schedule endpoint
+
+    The DB rejects a schedule that overlaps a lesson or an exam in the same
+    classroom or of the same course with 409.
+
+    Args:
+        schedule (ScheduleCreate): new schedule object
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+
+    Returns:
+        Schedule: created schedule
+    """
+    async with constraint_errors(db, BOOKING_CONFLICT, "Invalid payload."):
+        new_schedule = await insert_returning(db, ScheduleDB, Schedule, schedule.dict())
+        await db.commit()
+    return new_schedule
+
+
+@router.post("/validate", response_model=TimetableReport,
+             openapi_extra={"requestBody": request_body_schema(ScheduleCreate)})
+async def validate_schedules(request: Request,
+                             db: AsyncSession = Depends(get_async_db)) -> TimetableReport:
+    """Validate a timetable of schedules endpoint
+
+    The body is a JSON array, NDJSON or CSV (with a header row) of schedule
+    objects. Nothing is saved: the report lists the invalid rows and every
+    double booking of a classroom or a course, between the rows and with the
+    stored schedules and exams.
+
+    Args:
+        request (Request): request object
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+
+    Returns:
+        TimetableReport: invalid rows and conflicts
+    """
+    report = await validate_timetable(db, read_rows(request), ScheduleCreate)
+    return JSONResponse(report.dict())
@@ -1,11 +1,16 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from core.database import Base
 from pydantic import BaseModel, EmailStr
+from typing import List
+from ..bulk import RowResult
 
 class StudentDB(Base):
     """The DB model for a student."""
     __tablename__ = "Students"
+    __table_args__ = (
+        UniqueConstraint("email", name="uq_Students_email"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     firstName = Column(String(100), nullable=False)
@@ -31,4 +36,10 @@ class StudentCreate(BaseModel):
     firstName: str
     lastName: str
     email: EmailStr
-    groupId: int
\ No newline at end of file
+    groupId: int
+
+class StudentImportReport(BaseModel):
+    """The Pydantic model for the result of a student import."""
+    created: int
+    failed: int
+    results: List[RowResult]
@@ -1,106 +1,247 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from .model import StudentDB, Student, StudentCreate
-from core.database import get_db
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .model import StudentDB, Student, StudentCreate, StudentImportReport
+from .importer import import_students
+from core.cache import Cache, get_cache
+from core.database import get_async_db
+from core.replicas import fresh_for_cache, get_read_db
 from sqlalchemy.exc import IntegrityError
+from ..bulk import read_rows, request_body_schema
+from ..cache import student_key, courses_of_groups, invalidate_grades, invalidate_students
+from ..constraints import constraint_errors
+from ..etag import ETagRoute, check_if_match, etag_of
+from ..export import ExportFormat, export_response
+from ..grades.model import GradeDB, GradeSummary, Transcript
+from ..grades.transcript import grade_summary, transcript
+from ..pagination import PageParams, fetch_page
+from ..rows import insert_returning, update_returning
 
-router = APIRouter()
+EMAIL_CONFLICT = {"uq_Students_email": "Student with this email already exists"}
+
+router = APIRouter(route_class=ETagRoute)
+
+
+@router.get("/", response_model=List[Student])
+async def get_students(response: Response,
+                       groupId: Optional[int] = None,
+                       page: PageParams = Depends(),
+                       db: AsyncSession = Depends(get_async_db)) -> List[Student]:
+    """Get students list endpoint
+
+    The list is ordered by ID. If there are more students, the X-Next-Cursor
+    response header holds the cursor of the next page.
+
+    Args:
+        response (Response): response object
+        groupId (Optional[int], optional): Group ID filter. Defaults to None.
+        page (PageParams, optional): cursor and limit (defaults to 500) of the page.
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+
+    Returns:
+        List[Student]: List of student objects
+    """
+    stmt = select(StudentDB)
+    if groupId is not None:
+        stmt = stmt.where(StudentDB.groupId == groupId)
+    return await fetch_page(db, stmt, StudentDB.id, page, response)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_students(format: ExportFormat = ExportFormat.ndjson,
+                          groupId: Optional[int] = None,
+                          db: AsyncSession = Depends(get_async_db)) -> StreamingResponse:
+    """Export students endpoint
+
+    Streams all students ordered by ID through a server-side cursor.
+
+    Args:
+        format (ExportFormat, optional): ndjson or csv. Defaults to ndjson.
+        groupId (Optional[int], optional): Group ID filter. Defaults to None.
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+
+    Returns:
+        StreamingResponse: students as NDJSON or CSV
+    """
+    stmt = select(StudentDB.id, StudentDB.firstName, StudentDB.lastName,
+                  StudentDB.email, StudentDB.groupId).order_by(StudentDB.id)
+    if groupId is not None:
+        stmt = stmt.where(StudentDB.groupId == groupId)
+    return export_response(db, stmt, format, "students")
 
 
 @router.get("/{student_id}", response_model=Student)
-def get_student_by_id(student_id: int, db: Session = Depends(get_db)) -> Student:
+async def get_student_by_id(student_id: int, db: AsyncSession = Depends(get_read_db),
+                            cache: Cache = Depends(get_cache)) -> Student:
     """Get student by ID endpoint
 
     Args:
         student_id (int): Student ID in datebase
-        db (Session, optional): DB session. Defaults to Depends(get_db).
+        db (AsyncSession, optional): DB session, a replica if one is fit. Defaults to Depends(get_read_db).
+        cache (Cache, optional): response cache. Defaults to Depends(get_cache).
 
     Returns:
         Student: student object
     """
-    student = db.get(StudentDB, student_id)
+    key = student_key(student_id)
+    cached = await cache.get(key)
+    if cached is not None:
+        return cached
+
+    student = await db.get(StudentDB, student_id)
     if student is None:
         raise HTTPException(status_code=404, detail="Student not found")
-    return student
+    data = Student.from_orm(student).dict()
+    if fresh_for_cache(db):
+        await cache.set(key, data)
+    return data
+
+
+@router.get("/{student_id}/transcript", response_model=Transcript)
+async def get_student_transcript(student_id: int, db: AsyncSession = Depends(get_read_db)) -> Transcript:
+    """Get student transcript endpoint
+
+    Lists the grades of the student by course with the grade count, mean
+    and GPA, weighted by course credits.
+
+    Args:
+        student_id (int): Student ID in datebase
+        db (AsyncSession, optional): DB session, a replica if one is fit. Defaults to Depends(get_read_db).
+
+    Returns:
+        Transcript: grades and their summary
+    """
+    return await transcript(db, student_id)
+
+
+@router.get("/{student_id}/gpa", response_model=GradeSummary)
+async def get_student_gpa(student_id: int, db: AsyncSession = Depends(get_read_db)) -> GradeSummary:
+    """Get student grade summary endpoint
+
+    Args:
+        student_id (int): Student ID in datebase
+        db (AsyncSession, optional): DB session, a replica if one is fit. Defaults to Depends(get_read_db).
+
+    Returns:
+        GradeSummary: grade count, mean and GPA weighted by course credits
+    """
+    return await grade_summary(db, student_id)
 
 
 @router.post("/", response_model=Student)
-def create_student(student: StudentCreate, db: Session = Depends(get_db)) -> Student:
+async def create_student(student: StudentCreate, db: AsyncSession = Depends(get_async_db),
+                         cache: Cache = Depends(get_cache)) -> Student:
     """Create a new student endpoint
 
     Args:
         student (StudentCreate): new student object
-        db (Session, optional): DB session. Defaults to Depends(get_db).
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+        cache (Cache, optional): response cache. Defaults to Depends(get_cache).
 
     Returns:
         Student: New created student object
     """
+    async with constraint_errors(db, EMAIL_CONFLICT, "Invalid groupid."):
+        new_student = await insert_returning(db, StudentDB, Student, student.dict())
+        await db.commit()
+    await invalidate_students(
+        cache, course_ids=await courses_of_groups(db, [new_student["groupId"]]))
+    return new_student
+
+
+@router.post("/import", response_model=StudentImportReport,
+             openapi_extra={"requestBody": request_body_schema(StudentCreate)})
+async def import_students_bulk(request: Request,
+                               db: AsyncSession = Depends(get_async_db),
+                               cache: Cache = Depends(get_cache)) -> StudentImportReport:
+    """Bulk import students endpoint
+
+    The body is a JSON array, NDJSON or CSV (with a header row) of new
+    student objects. Valid rows are created in one transaction; the rest
+    are reported with an error.
+
+    Args:
+        request (Request): request object
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+        cache (Cache, optional): response cache. Defaults to Depends(get_cache).
+
+    Returns:
+        StudentImportReport: created/failed counts and per-row results
+    """
     try:
-        existing_student = db.query(StudentDB).filter(
-            StudentDB.email == student.email).first()
-        if existing_student:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
-                                detail="Student with this email already exists")
-
-        new_student = StudentDB(**student.dict())
-        db.add(new_student)
-        db.commit()
-        db.refresh(new_student)
-        return new_student
+        report, group_ids = await import_students(db, read_rows(request))
+        await db.commit()
     except IntegrityError:
-        raise HTTPException(status_code=400, detail="Invalid groupid.")
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail="The import conflicts with concurrent changes.")
+    await invalidate_students(cache, course_ids=await courses_of_groups(db, group_ids))
+    # The report is built from checked values; skip re-validating every row.
+    return JSONResponse(report.dict())
 
 
 @router.put("/{student_id}", response_model=Student)
-def update_student(student_id: int, student: StudentCreate, db: Session = Depends(get_db)) -> Student:
+async def update_student(student_id: int, student: StudentCreate, response: Response,
+                         if_match: Optional[str] = Header(None),
+                         db: AsyncSession = Depends(get_async_db),
+                         cache: Cache = Depends(get_cache)) -> Student:
     """Update a student endpoint
 
+    With an If-Match header the student is only updated if its ETag
+    matches, otherwise 412 is returned.
+
     Args:
         student_id (int): Student ID
         student (StudentCreate): Student object for updating
-        db (Session, optional): DB session. Defaults to Depends(get_db).
+        response (Response): response object
+        if_match (Optional[str], optional): If-Match header. Defaults to None.
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+        cache (Cache, optional): response cache. Defaults to Depends(get_cache).
 
     Returns:
         Student: updated student object
     """
-    db_student = db.get(StudentDB, student_id)
-    if not db_student:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Student not found")
-
-    existing_student = db.query(StudentDB).filter(
-        StudentDB.email == student.email).first()
-    if existing_student:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
-                            detail="Student with this email already exists")
-
-    for key, value in student.dict().items():
-        setattr(db_student, key, value)
+    async with constraint_errors(db, EMAIL_CONFLICT, "Invalid data."):
+        states = await update_returning(db, StudentDB, Student, student_id, student.dict())
+        if states is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Student not found")
+        old, new = states
+        check_if_match(if_match, Student.construct(**old))
+        await db.commit()
 
-    try:
-        db.commit()
-        db.refresh(db_student)
-        return db_student
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid data.")
+    await invalidate_students(
+        cache, [student_id], await courses_of_groups(db, {old["groupId"], new["groupId"]}))
+    response.headers["ETag"] = etag_of(Student.construct(**new))
+    return new
 
 
 @router.delete("/{student_id}", response_model=Student)
-def delete_student(student_id: int, db: Session = Depends(get_db)) -> Student:
+async def delete_student(student_id: int, db: AsyncSession = Depends(get_async_db),
+                         cache: Cache = Depends(get_cache)) -> Student:
     """Delete a student endpoint
 
+    The student's grades go with it, so the statistics of their courses are
+    evicted too.
+
     Args:
         student_id (int): student ID
-        db (Session, optional): DB session. Defaults to Depends(get_db).
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
+        cache (Cache, optional): response cache. Defaults to Depends(get_cache).
 
     Returns:
         Student: Deleted student object
     """
-    student = db.get(StudentDB, student_id)
+    student = await db.get(StudentDB, student_id)
     if not student:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Student not found")
-    db.delete(student)
-    db.commit()
+    course_ids = await courses_of_groups(db, [student.groupId])
+    graded_course_ids = set(await db.scalars(select(GradeDB.courseId).where(GradeDB.studentId == student_id)))
+    await db.delete(student)
+    await db.commit()
+    await invalidate_students(cache, [student_id], course_ids)
+    if graded_course_ids:
+        await invalidate_grades(cache, graded_course_ids)
     return student
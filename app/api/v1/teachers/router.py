@@ -1,21 +1,75 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from .model import TeacherDB, Teacher
-from core.database import get_db
+from core.cache import Cache, get_cache
+from core.database import get_async_db
+from core.replicas import fresh_for_cache, get_read_db
+from ..cache import teachers_key
+from ..etag import ETagRoute
+from ..export import ExportFormat, export_response
+from ..pagination import NEXT_CURSOR_HEADER, PageParams, fetch_rows_page
+from ..rows import model_columns
 
-router = APIRouter()
+router = APIRouter(route_class=ETagRoute)
 
-@router.get("/", response_model=List[Teacher])
-def get_teachers(limit: int = 500, db: Session = Depends(get_db)) -> List[Teacher]:
+@router.get("/", response_model=List[Teacher], response_class=ORJSONResponse)
+async def get_teachers(response: Response,
+                       facultyId: Optional[int] = None,
+                       page: PageParams = Depends(),
+                       db: AsyncSession = Depends(get_read_db),
+                       cache: Cache = Depends(get_cache)) -> ORJSONResponse:
     """Get teachers list endpoint
 
+    The list is ordered by ID. If there are more teachers, the X-Next-Cursor
+    response header holds the cursor of the next page. Rows are selected as
+    tuples and rendered with orjson, skipping ORM objects and response model
+    validation.
+
+    Args:
+        response (Response): response object
+        facultyId (Optional[int], optional): Faculty ID filter. Defaults to None.
+        page (PageParams, optional): cursor and limit (defaults to 500) of the page.
+        db (AsyncSession, optional): DB session, a replica if one is fit. Defaults to Depends(get_read_db).
+        cache (Cache, optional): response cache. Defaults to Depends(get_cache).
+
+    Returns:
+        ORJSONResponse: List of teacher objects
+    """
+    key = teachers_key(facultyId, page.cursor, page.limit)
+    cached = await cache.get(key)
+    if cached is None:
+        stmt = select(*model_columns(TeacherDB, Teacher))
+        if facultyId is not None:
+            stmt = stmt.where(TeacherDB.facultyId == facultyId)
+        teachers = await fetch_rows_page(db, stmt, TeacherDB.id, page, response)
+        cached = {"items": teachers, "next": response.headers.get(NEXT_CURSOR_HEADER)}
+        if fresh_for_cache(db):
+            await cache.set(key, cached)
+    headers = None if cached["next"] is None else {NEXT_CURSOR_HEADER: cached["next"]}
+    return ORJSONResponse(cached["items"], headers=headers)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_teachers(format: ExportFormat = ExportFormat.ndjson,
+                          facultyId: Optional[int] = None,
+                          db: AsyncSession = Depends(get_async_db)) -> StreamingResponse:
+    """Export teachers endpoint
+
+    Streams all teachers ordered by ID through a server-side cursor.
+
     Args:
-        limit (int, optional): Limit of teachers. Defaults to 500.
-        db (Session, optional): DB session. Defaults to Depends(get_db).
+        format (ExportFormat, optional): ndjson or csv. Defaults to ndjson.
+        facultyId (Optional[int], optional): Faculty ID filter. Defaults to None.
+        db (AsyncSession, optional): DB session. Defaults to Depends(get_async_db).
 
     Returns:
-        List[Teacher]: List of teacher objects
+        StreamingResponse: teachers as NDJSON or CSV
     """
-    teachers = db.query(TeacherDB).limit(limit).all()
-    return [Teacher.from_orm(teacher) for teacher in teachers]
\ No newline at end of file
+    stmt = select(TeacherDB.id, TeacherDB.firstName, TeacherDB.lastName,
+                  TeacherDB.email, TeacherDB.facultyId).order_by(TeacherDB.id)
+    if facultyId is not None:
+        stmt = stmt.where(TeacherDB.facultyId == facultyId)
+    return export_response(db, stmt, format, "teachers")
@@ -0,0 +1,74 @@
+import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.replicas import get_read_db
+from ..bookings.model import BookingDB, TimetableEntry
+from ..groups.model import GroupDB
+from ..etag import ETagRoute
+from ..rows import as_dicts, model_columns
+
+# Longest date window of one request, in days counting both ends
+MAX_WINDOW_DAYS = 31
+
+router = APIRouter(route_class=ETagRoute)
+
+
+@router.get("/", response_model=List[TimetableEntry], response_class=ORJSONResponse)
+async def get_timetable(dateFrom: datetime.date,
+                        dateTo: datetime.date,
+                        buildingId: Optional[int] = None,
+                        classroomId: Optional[int] = None,
+                        teacherId: Optional[int] = None,
+                        groupId: Optional[int] = None,
+                        courseId: Optional[int] = None,
+                        kind: Optional[str] = Query(None, regex="^(schedule|exam)$"),
+                        db: AsyncSession = Depends(get_read_db)) -> ORJSONResponse:
+    """Get the lessons and exams of a date window endpoint
+
+    Entries are read from the Bookings table, which carries the course,
+    teacher, classroom and building of every lesson and exam, through one
+    of its (filter, date, time) indexes. A group is resolved to its course.
+    The list is ordered by date and time.
+
+    Args:
+        dateFrom (datetime.date): first day of the window
+        dateTo (datetime.date): last day of the window, at most 30 days after dateFrom
+        buildingId (Optional[int], optional): Building ID filter. Defaults to None.
+        classroomId (Optional[int], optional): Classroom ID filter. Defaults to None.
+        teacherId (Optional[int], optional): Teacher ID filter. Defaults to None.
+        groupId (Optional[int], optional): Group ID filter. Defaults to None.
+        courseId (Optional[int], optional): Course ID filter. Defaults to None.
+        kind (Optional[str], optional): schedule or exam. Defaults to None.
+        db (AsyncSession, optional): DB session, a replica if one is fit. Defaults to Depends(get_read_db).
+
+    Raises:
+        HTTPException: 400 if dateTo is before dateFrom or the window is too long
+
+    Returns:
+        ORJSONResponse: List of timetable entries
+    """
+    if dateTo < dateFrom:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="dateTo is before dateFrom")
+    if (dateTo - dateFrom).days >= MAX_WINDOW_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"The window is longer than {MAX_WINDOW_DAYS} days")
+
+    stmt = select(*model_columns(BookingDB, TimetableEntry)).where(BookingDB.date.between(dateFrom, dateTo))
+    if buildingId is not None:
+        stmt = stmt.where(BookingDB.buildingId == buildingId)
+    if classroomId is not None:
+        stmt = stmt.where(BookingDB.classroomId == classroomId)
+    if teacherId is not None:
+        stmt = stmt.where(BookingDB.teacherId == teacherId)
+    if groupId is not None:
+        course = select(GroupDB.courseId).where(GroupDB.id == groupId).scalar_subquery()
+        stmt = stmt.where(BookingDB.courseId == course)
+    if courseId is not None:
+        stmt = stmt.where(BookingDB.courseId == courseId)
+    if kind is not None:
+        stmt = stmt.where(BookingDB.kind == kind)
+    stmt = stmt.order_by(BookingDB.date, BookingDB.time, BookingDB.kind, BookingDB.sourceId)
+    return ORJSONResponse(as_dicts((await db.execute(stmt)).all()))
@@ -0,0 +1,39 @@
+"""Compare a benchmark report with a baseline; exit 1 on a regression.
+
+Usage: python -m benchmarks.compare BASELINE CURRENT [--threshold F]
+       [--metric p50Ms|p95Ms|p99Ms] [--min-delta-ms MS] [--track NAME ...]
+"""
+import argparse
+import json
+import sys
+from .report import LATENCY_METRICS, compare
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline', help='baseline JSON report')
+    parser.add_argument('current', help='JSON report to check')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed relative change')
+    parser.add_argument('--metric', choices=LATENCY_METRICS, default='p95Ms', help='latency metric')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='latency growth below this is noise')
+    parser.add_argument('--track', action='append', help='result to check; all of the baseline by default')
+    args = parser.parse_args()
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+    if baseline["kind"] != current["kind"]:
+        sys.exit(f'Can\'t compare a {baseline["kind"]} report with a {current["kind"]} one.')
+
+    regressions = compare(baseline, current, args.threshold, args.metric, args.min_delta_ms, args.track)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions beyond {args.threshold:.0%}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""Drive the v1 API with a read/write mix and report latency per endpoint.
+
+The database should be seeded with generate_data.py at the same --scale;
+IDs are drawn from its ranges. Without --url the app is served in process.
+
+Usage: python -m benchmarks.load [--url URL] [--scale F] [--duration S]
+       [--concurrency N] [--write-ratio F] [--seed N] [--output FILE]
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import httpx
+from generate_data import Sizes
+from .report import make_report, summarize, write_report
+
+Operation = Callable[[httpx.AsyncClient, random.Random, Sizes, str], Awaitable[httpx.Response]]
+
+
+async def get_student(client, rng, sizes, tag):
+    return await client.get(f"/api/v1/students/{rng.randint(1, sizes.students)}")
+
+
+async def list_students(client, rng, sizes, tag):
+    return await client.get("/api/v1/students/", params={"groupId": rng.randint(1, sizes.groups)})
+
+
+async def list_teachers(client, rng, sizes, tag):
+    return await client.get("/api/v1/teachers/", params={"facultyId": rng.randint(1, sizes.faculties)})
+
+
+async def get_course(client, rng, sizes, tag):
+    return await client.get(f"/api/v1/courses/{rng.randint(1, sizes.courses)}")
+
+
+async def course_roster(client, rng, sizes, tag):
+    return await client.get(f"/api/v1/courses/{rng.randint(1, sizes.courses)}/students")
+
+
+async def list_grades(client, rng, sizes, tag):
+    return await client.get("/api/v1/grades/", params={"studentId": rng.randint(1, sizes.students)})
+
+
+async def create_student(client, rng, sizes, tag):
+    return await client.post("/api/v1/students/", json={
+        "firstName": "Load", "lastName": "Test", "groupId": rng.randint(1, sizes.groups),
+        "email": f"load.{tag}.{rng.getrandbits(48):x}@example.com"})
+
+
+async def update_student(client, rng, sizes, tag):
+    # read-modify-write keeping the email, as a profile edit does
+    student = await client.get(f"/api/v1/students/{rng.randint(1, sizes.students)}")
+    if student.status_code != 200:
+        return student
+    body = student.json()
+    body["lastName"] = f"Edited{rng.randint(1, 999)}"
+    return await client.put(f"/api/v1/students/{body.pop('id')}", json=body)
+
+
+async def upsert_grades(client, rng, sizes, tag):
+    student_id = rng.randint(1, sizes.students)
+    course_ids = rng.sample(range(1, sizes.courses + 1), min(20, sizes.courses))
+    rows = [{"grade": rng.randint(40, 100), "studentId": student_id, "courseId": course_id}
+            for course_id in course_ids]
+    return await client.post("/api/v1/grades/bulk", json=rows)
+
+
+# (result name, weight, operation)
+READS: List[Tuple[str, int, Operation]] = [
+    ("GET /students/{student_id}", 30, get_student),
+    ("GET /students/", 10, list_students),
+    ("GET /teachers/", 10, list_teachers),
+    ("GET /courses/{course_id}", 10, get_course),
+    ("GET /courses/{course_id}/students", 15, course_roster),
+    ("GET /grades/", 10, list_grades),
+]
+WRITES: List[Tuple[str, int, Operation]] = [
+    ("POST /students/", 3, create_student),
+    ("PUT /students/{student_id}", 3, update_student),
+    ("POST /grades/bulk", 4, upsert_grades),
+]
+
+
+def pick(rng: random.Random, operations: List[Tuple[str, int, Operation]]) -> Tuple[str, Operation]:
+    name, _, operation = rng.choices(operations, weights=[weight for _, weight, _ in operations])[0]
+    return name, operation
+
+
+async def worker(client: httpx.AsyncClient, rng: random.Random, sizes: Sizes, tag: str,
+                 write_ratio: float, deadline: float, samples: Dict[str, List[float]],
+                 errors: Dict[str, int]) -> None:
+    while time.perf_counter() < deadline:
+        name, operation = pick(rng, WRITES if rng.random() < write_ratio else READS)
+        start = time.perf_counter()
+        try:
+            response = await operation(client, rng, sizes, tag)
+            failed = response.status_code >= 500
+        except httpx.HTTPError:
+            failed = True
+        # 4xx (an empty roster, a taken email) is a valid answer and is timed
+        samples[name].append((time.perf_counter() - start) * 1000)
+        if failed:
+            errors[name] += 1
+
+
+async def run(url: Optional[str], sizes: Sizes, duration: float, concurrency: int,
+              write_ratio: float, seed: int) -> Dict[str, Dict[str, Any]]:
+    if url is None:
+        from main import app
+        client = httpx.AsyncClient(app=app, base_url="http://benchmark")
+    else:
+        client = httpx.AsyncClient(base_url=url, limits=httpx.Limits(max_connections=concurrency))
+
+    samples: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    tag = f"{seed}.{int(time.time())}"
+    async with client:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(
+            worker(client, random.Random(f"{seed}/{n}"), sizes, tag, write_ratio, deadline, samples, errors)
+            for n in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    results = {name: summarize(samples[name], elapsed, errors[name])
+               for name, _, _ in READS + WRITES if samples[name]}
+    results["total"] = summarize([ms for values in samples.values() for ms in values],
+                                 elapsed, sum(errors.values()))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='base URL of a running server; in process if not set')
+    parser.add_argument('--scale', type=float, default=1.0, help='scale the DB was seeded with')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run')
+    parser.add_argument('--concurrency', type=int, default=20, help='concurrent clients')
+    parser.add_argument('--write-ratio', type=float, default=0.1, help='share of write operations')
+    parser.add_argument('--seed', type=int, default=1, help='random seed of the request mix')
+    parser.add_argument('--output', help='file to save the JSON report to')
+    args = parser.parse_args()
+
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    results = asyncio.run(run(args.url, Sizes(scale=args.scale, years=10), args.duration,
+                              args.concurrency, args.write_ratio, args.seed))
+    write_report(make_report("load", config, results), args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Micro-benchmarks of serialization and the query layer.
+
+Query benchmarks read a database seeded with generate_data.py; pass
+--no-db to run only the serialization ones.
+
+Usage: python -m benchmarks.micro [--iterations N] [--rows N] [--no-db]
+       [--only PREFIX] [--output FILE]
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+from fastapi import Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import AsyncSessionLocal, async_engine
+from main import app  # noqa: F401 -- registers all mappers
+from api.v1.courses.router import course_roster
+from api.v1.export import _csv_chunk, _ndjson_chunk
+from api.v1.grades.model import GradeDB
+from api.v1.groups.model import GroupDB
+from api.v1.pagination import PageParams, fetch_page, fetch_rows_page
+from api.v1.rows import model_columns
+from api.v1.students.model import StudentDB, Student
+from api.v1.teachers.model import TeacherDB, Teacher
+from .report import make_report, summarize, write_report
+
+STUDENTS_FIELD = create_response_field(name="students", type_=List[Student])
+
+Benchmark = Callable[[], Awaitable[Any]]
+
+
+def serialization_benchmarks(rows: int) -> Dict[str, Benchmark]:
+    students = [{"id": n, "firstName": "First", "lastName": f"Last{n}",
+                 "email": f"student{n}@university.edu", "groupId": n % 100 + 1} for n in range(1, rows + 1)]
+    columns = list(students[0])
+    tuples = [tuple(student.values()) for student in students]
+
+    async def pydantic_json():
+        content = await serialize_response(field=STUDENTS_FIELD, response_content=students)
+        return JSONResponse(content).body
+
+    async def orjson():
+        return ORJSONResponse(students).body
+
+    async def ndjson():
+        return _ndjson_chunk(columns, tuples)
+
+    async def csv():
+        return _csv_chunk(tuples)
+
+    return {
+        f"serialize.students[{rows}].response_model+json": pydantic_json,
+        f"serialize.students[{rows}].orjson": orjson,
+        f"serialize.export[{rows}].ndjson": ndjson,
+        f"serialize.export[{rows}].csv": csv,
+    }
+
+
+async def query_benchmarks() -> Dict[str, Benchmark]:
+    async with AsyncSessionLocal() as db:
+        roster_course = await db.scalar(
+            select(GroupDB.courseId).join(StudentDB).group_by(GroupDB.courseId)
+            .order_by(func.count().desc()).limit(1))
+        student_id = await db.scalar(select(func.max(StudentDB.id)))
+    if roster_course is None:
+        raise SystemExit("The DB has no students; seed it with generate_data.py or pass --no-db.")
+    page = PageParams(cursor=None, limit=500)
+
+    def session_benchmark(query: Callable[[AsyncSession], Awaitable[Any]]) -> Benchmark:
+        # a new session per run so the identity map doesn't hand back loaded objects
+        async def benchmark():
+            async with AsyncSessionLocal() as db:
+                return await query(db)
+        return benchmark
+
+    async def roster_orm(db):
+        result = await db.scalars(select(StudentDB).join(GroupDB).where(GroupDB.courseId == roster_course))
+        return [Student.from_orm(item).dict() for item in result.all()]
+
+    return {
+        "query.student.get": session_benchmark(lambda db: db.get(StudentDB, student_id)),
+        "query.students.page.orm": session_benchmark(
+            lambda db: fetch_page(db, select(StudentDB), StudentDB.id, page, Response())),
+        "query.teachers.page.rows": session_benchmark(
+            lambda db: fetch_rows_page(db, select(*model_columns(TeacherDB, Teacher)),
+                                       TeacherDB.id, page, Response())),
+        "query.roster.orm": session_benchmark(roster_orm),
+        "query.roster.rows": session_benchmark(lambda db: course_roster(db, roster_course, page, Response())),
+        "query.grades.by_student": session_benchmark(
+            lambda db: db.execute(select(GradeDB.id, GradeDB.grade, GradeDB.courseId)
+                                  .where(GradeDB.studentId == student_id))),
+    }
+
+
+async def measure(benchmark: Benchmark, iterations: int, warmup: int) -> Dict[str, Any]:
+    for _ in range(warmup):
+        await benchmark()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        began = time.perf_counter()
+        await benchmark()
+        latencies.append((time.perf_counter() - began) * 1000)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+async def run(iterations: int, rows: int, use_db: bool, only: str) -> Dict[str, Dict[str, Any]]:
+    benchmarks = serialization_benchmarks(rows)
+    try:
+        if use_db:
+            benchmarks.update(await query_benchmarks())
+        return {name: await measure(benchmark, iterations, warmup=max(1, iterations // 10))
+                for name, benchmark in benchmarks.items() if name.startswith(only)}
+    finally:
+        await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=50, help='timed runs of each benchmark')
+    parser.add_argument('--rows', type=int, default=1000, help='rows of the serialization benchmarks')
+    parser.add_argument('--no-db', dest='use_db', action='store_false', help='skip the query benchmarks')
+    parser.add_argument('--only', default='', help='run the benchmarks whose names start with this')
+    parser.add_argument('--output', help='file to save the JSON report to')
+    args = parser.parse_args()
+
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    results = asyncio.run(run(args.iterations, args.rows, args.use_db, args.only))
+    write_report(make_report("micro", config, results), args.output)
+
+
+if __name__ == '__main__':
+    main()
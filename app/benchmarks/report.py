@@ -0,0 +1,112 @@
+import datetime
+import json
+import math
+import platform
+from typing import Any, Dict, Iterable, List, Optional
+
+# Latency metrics of a result, in milliseconds.
+LATENCY_METRICS = ("p50Ms", "p95Ms", "p99Ms")
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Percentile with linear interpolation between the closest ranks.
+
+    Args:
+        samples (List[float]): sorted samples
+        q (float): percentile, 0-100
+
+    Returns:
+        float: value of the percentile, NaN if there are no samples
+    """
+    if not samples:
+        return math.nan
+    rank = (len(samples) - 1) * q / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(samples) - 1)
+    return samples[low] + (samples[high] - samples[low]) * (rank - low)
+
+
+def summarize(latencies_ms: Iterable[float], elapsed_s: float, errors: int = 0,
+              **extra: Any) -> Dict[str, Any]:
+    """Summarize the latencies of one endpoint or benchmark.
+
+    Args:
+        latencies_ms (Iterable[float]): latency of every operation in ms
+        elapsed_s (float): wall time the operations took
+        errors (int, optional): failed operations. Defaults to 0.
+
+    Returns:
+        Dict[str, Any]: count, errors, mean, p50/p95/p99 and throughput (ops/s)
+    """
+    samples = sorted(latencies_ms)
+    result = {
+        "count": len(samples),
+        "errors": errors,
+        "meanMs": sum(samples) / len(samples) if samples else math.nan,
+        "p50Ms": percentile(samples, 50),
+        "p95Ms": percentile(samples, 95),
+        "p99Ms": percentile(samples, 99),
+        "throughput": len(samples) / elapsed_s if elapsed_s > 0 else math.nan,
+    }
+    result.update(extra)
+    return result
+
+
+def make_report(kind: str, config: Dict[str, Any], results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "kind": kind,
+        "createdAt": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": config,
+        "results": results,
+    }
+
+
+def write_report(report: Dict[str, Any], path: Optional[str]) -> None:
+    """Print a results table and save the JSON report if a path is given."""
+    print(f'{"":46} {"count":>8} {"errors":>6} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"ops/s":>9}')
+    for name, result in report["results"].items():
+        print(f'{name:46} {result["count"]:>8} {result["errors"]:>6} {result["p50Ms"]:>9.2f} '
+              f'{result["p95Ms"]:>9.2f} {result["p99Ms"]:>9.2f} {result["throughput"]:>9.1f}')
+    if path:
+        with open(path, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float,
+            metric: str = "p95Ms", min_delta_ms: float = 1.0,
+            track: Optional[List[str]] = None) -> List[str]:
+    """Find tracked results that regressed from the baseline.
+
+    A result regresses when the latency metric grows by more than threshold
+    (and by more than min_delta_ms, to ignore noise in sub-millisecond
+    benchmarks) or the throughput drops by more than threshold.
+
+    Args:
+        baseline (Dict[str, Any]): baseline report
+        current (Dict[str, Any]): report to check
+        threshold (float): allowed relative change, e.g. 0.1 for 10%
+        metric (str, optional): latency metric. Defaults to "p95Ms".
+        min_delta_ms (float, optional): allowed absolute latency growth. Defaults to 1.0.
+        track (Optional[List[str]], optional): results to check. Defaults to
+            all results of the baseline.
+
+    Returns:
+        List[str]: a message per regression, empty if there are none
+    """
+    regressions = []
+    for name in track or list(baseline["results"]):
+        before = baseline["results"].get(name)
+        after = current["results"].get(name)
+        if before is None or after is None:
+            regressions.append(f"{name}: missing from the {'baseline' if before is None else 'current'} report")
+            continue
+        growth = after[metric] - before[metric]
+        if growth > before[metric] * threshold and growth > min_delta_ms:
+            regressions.append(f"{name}: {metric} {before[metric]:.2f} -> {after[metric]:.2f}")
+        if after["throughput"] < before["throughput"] * (1 - threshold):
+            regressions.append(
+                f"{name}: throughput {before['throughput']:.1f} -> {after['throughput']:.1f} ops/s")
+        if after["errors"] > before["errors"]:
+            regressions.append(f"{name}: errors {before['errors']} -> {after['errors']}")
+    return regressions
@@ -0,0 +1,116 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from .config import CACHE_BACKEND, CACHE_TTL, CACHE_MAX_ENTRIES, REDIS_URL
+
+
+class Cache:
+    """Cache backend interface. The base class stores nothing."""
+
+    async def get(self, key: str) -> Optional[Any]:
+        return None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        pass
+
+    async def delete(self, *keys: str) -> None:
+        pass
+
+    async def clear(self) -> None:
+        pass
+
+
+class MemoryCache(Cache):
+    """In-process LRU cache with a TTL per entry.
+
+    Values are stored as they are, so callers must not mutate them. Each
+    worker process has its own copy; use RedisCache to share invalidations.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+
+class RedisCache(Cache):
+    """Cache backend on a Redis-compatible server. Values are stored as JSON.
+
+    Args:
+        client: redis.asyncio.Redis or any object with the same get, set,
+            delete and scan_iter coroutines
+        ttl (float, optional): default TTL in seconds
+        prefix (str, optional): key prefix
+    """
+
+    def __init__(self, client: Any, ttl: float = CACHE_TTL, prefix: str = "ums:") -> None:
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        await self.client.set(self.prefix + key, json.dumps(value), px=int(ttl * 1000))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+    async def clear(self) -> None:
+        keys = [key async for key in self.client.scan_iter(match=self.prefix + "*")]
+        if keys:
+            await self.client.delete(*keys)
+
+
+def create_cache(backend: str = CACHE_BACKEND) -> Cache:
+    """Create the cache backend selected in the config.
+
+    Args:
+        backend (str, optional): "memory", "redis" or "none". Defaults to CACHE_BACKEND.
+
+    Returns:
+        Cache: cache backend
+    """
+    if backend == "memory":
+        return MemoryCache()
+    if backend == "redis":
+        import redis.asyncio as redis
+        return RedisCache(redis.Redis.from_url(REDIS_URL))
+    return Cache()
+
+
+cache = create_cache()
+
+
+def get_cache() -> Cache:
+    return cache
@@ -5,4 +5,50 @@ DB_NAME = os.getenv('DB_NAME')
 DB_USER = os.getenv('DB_USER')
 DB_PASS = os.getenv('DB_PASS')
 
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:5432/{DB_NAME}" 
\ No newline at end of file
+DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:5432/{DB_NAME}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:5432/{DB_NAME}"
+
+# Connection pool settings, applied per engine and per worker process.
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+
+# Set when connecting through PgBouncer in transaction pooling mode: the app
+# keeps no pool of its own and doesn't use server-side prepared statements.
+DB_EXTERNAL_POOLER = os.getenv('DB_EXTERNAL_POOLER', 'false').lower() == 'true'
+
+# Connections every worker opens on startup, and the seconds it waits on
+# shutdown for connections still in use before closing the pools.
+DB_POOL_WARMUP = int(os.getenv('DB_POOL_WARMUP', DB_POOL_SIZE))
+DB_DRAIN_TIMEOUT = float(os.getenv('DB_DRAIN_TIMEOUT', 10))
+
+# Read replicas (host or host:port, comma separated; same DB and credentials).
+# Replicas lagging more than DB_REPLICA_MAX_LAG seconds or failing the check
+# every DB_REPLICA_CHECK_INTERVAL seconds get no reads.
+DB_REPLICA_HOSTS = [host.strip() for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', 5))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_CHECK_INTERVAL', 2))
+
+# Response cache: "memory" (per process LRU), "redis" or "none".
+CACHE_BACKEND = os.getenv('CACHE_BACKEND') or 'memory'
+CACHE_TTL = float(os.getenv('CACHE_TTL', 60))
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 10000))
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+# Prometheus metrics at /metrics and the SQLAlchemy hooks behind them.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+# Opt-in SQL tracing: a Server-Timing header, N+1 warnings and a slow query
+# log with EXPLAIN plans. Slow queries are logged with their parameters.
+SQL_TRACE = os.getenv('SQL_TRACE', 'false').lower() == 'true'
+SQL_SLOW_QUERY_MS = float(os.getenv('SQL_SLOW_QUERY_MS', 100))
+SQL_REPEATED_THRESHOLD = int(os.getenv('SQL_REPEATED_THRESHOLD', 5))
+SQL_EXPLAIN = os.getenv('SQL_EXPLAIN', 'true').lower() == 'true'
+
+# Exam room allocation: sessions of at least EXAM_ALLOCATION_PARALLEL_MIN
+# exams are solved in a pool of EXAM_ALLOCATION_WORKERS processes per server
+# worker; gunicorn.conf.py divides the CPUs between its workers.
+EXAM_ALLOCATION_WORKERS = int(os.getenv('EXAM_ALLOCATION_WORKERS') or os.cpu_count() or 1)
+EXAM_ALLOCATION_PARALLEL_MIN = int(os.getenv('EXAM_ALLOCATION_PARALLEL_MIN', 2000))
@@ -1,16 +1,149 @@
-from sqlalchemy import create_engine
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Type
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from starlette.requests import Request
+
+from .config import (
+    DATABASE_URL,
+    ASYNC_DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_EXTERNAL_POOLER,
+    DB_POOL_WARMUP,
+    DB_DRAIN_TIMEOUT,
+)
+from .pool import pool_status, timed_pool_class
+
+
+def engine_options(pool_class: Type[QueuePool]) -> Dict:
+    """Build create_engine() pool arguments from the config.
+
+    Args:
+        pool_class (Type[QueuePool]): Queue pool class of the engine flavour
+
+    Returns:
+        Dict: keyword arguments for create_engine/create_async_engine
+    """
+    if DB_EXTERNAL_POOLER:
+        return {"poolclass": NullPool}
+    return {
+        "poolclass": timed_pool_class(pool_class),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def async_connect_args() -> Dict:
+    """Build asyncpg connect arguments from the config.
 
-from .config import DATABASE_URL
+    PgBouncer in transaction mode can't keep prepared statements between
+    transactions, so the statement caches are turned off behind it.
 
-engine = create_engine(DATABASE_URL)
+    Returns:
+        Dict: connect_args for create_async_engine
+    """
+    if DB_EXTERNAL_POOLER:
+        return {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+    return {}
+
+
+engine = create_engine(DATABASE_URL, **engine_options(QueuePool))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=async_connect_args(),
+    **engine_options(AsyncAdaptedQueuePool),
+)
+
+
+class AsyncWriteSession(AsyncSession):
+    """Async session that notes the primary's WAL position after each commit.
+
+    Only sessions of requests (info["request"]) whose state has write_lsn,
+    put there by WriteLSNMiddleware, read it; the position replaces that
+    value. It's read on the session's own connection: waiting for a second
+    one from a pool would stall writes under load.
+    """
+
+    async def commit(self) -> None:
+        await super().commit()
+        request = self.info.get("request")
+        if request is not None and hasattr(request.state, "write_lsn"):
+            request.state.write_lsn = await self.scalar(text("SELECT pg_current_wal_lsn()::text"))
+
 
-async def get_db():
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncWriteSession, autoflush=False, expire_on_commit=False)
+
+
+def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db(request: Request):
+    async with AsyncSessionLocal(info={"request": request}) as db:
+        yield db
+
+
+async def warm_up_pool(count: int) -> None:
+    """Open pooled connections of the async engine ahead of the first requests.
+
+    Args:
+        count (int): connections to open, at most the pool size
+    """
+    if DB_EXTERNAL_POOLER or count <= 0:
+        return
+    # the first connection initializes the dialect under a thread lock that
+    # concurrent connects on the same thread would deadlock on
+    connections = [await async_engine.connect().start()]
+    connections += await asyncio.gather(
+        *(async_engine.connect().start() for _ in range(min(count, DB_POOL_SIZE) - 1)))
+    for connection in connections:
+        await connection.close()
+
+
+async def drain_pools(timeout: float) -> None:
+    """Wait for connections in use to be returned, then close the pools.
+
+    Args:
+        timeout (float): seconds to wait; connections still in use are then dropped
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline and any(
+            pool_status(pool).get("checkedOut", 0) for pool in (engine.pool, async_engine.pool)):
+        await asyncio.sleep(0.05)
+    await async_engine.dispose()
+    engine.dispose()
+
+
+@asynccontextmanager
+async def lifespan(app) -> AsyncIterator[None]:
+    """Own the connection pools for the life of a worker process.
+
+    A worker forked from a process that had already connected (gunicorn
+    --preload) would share its sockets, so the pools are reset without
+    closing them before the warm-up.
+    """
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    await warm_up_pool(DB_POOL_WARMUP)
+    yield
+    await drain_pools(DB_DRAIN_TIMEOUT)
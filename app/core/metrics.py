@@ -0,0 +1,180 @@
+import os
+import time
+from typing import Dict, Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess)
+from prometheus_client.core import GaugeMetricFamily, HistogramMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .pool import WAIT_BUCKETS, pool_status
+from .request_stats import RequestStats, request_stats
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+# Route label of requests that matched no route, so that scanners can't
+# blow up the number of series.
+UNMATCHED = "<unmatched>"
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+# Set by gunicorn.conf.py when several workers serve the app: the metrics are
+# kept in files there and summed over the workers on scrape.
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+registry = CollectorRegistry()
+
+REQUESTS = Counter("http_requests", "HTTP requests served",
+                   ["method", "route", "status"], registry=registry)
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being served",
+                  multiprocess_mode="livesum", registry=registry)
+REQUEST_DURATION = Histogram("http_request_duration_seconds", "HTTP request latency",
+                             ["method", "route", "status"], buckets=LATENCY_BUCKETS, registry=registry)
+REQUEST_QUERIES = Histogram("http_request_db_queries", "DB queries per HTTP request",
+                            ["route"], buckets=QUERY_COUNT_BUCKETS, registry=registry)
+REQUEST_DB_DURATION = Histogram("http_request_db_duration_seconds", "Time an HTTP request spent in DB queries",
+                                ["route"], buckets=LATENCY_BUCKETS, registry=registry)
+REQUEST_CHECKOUT_WAIT = Histogram("http_request_db_checkout_wait_seconds",
+                                  "Time an HTTP request waited for pooled DB connections",
+                                  ["route"], buckets=WAIT_BUCKETS, registry=registry)
+QUERY_DURATION = Histogram("db_query_duration_seconds", "DB query latency",
+                           ["engine"], buckets=LATENCY_BUCKETS, registry=registry)
+
+
+class MetricsMiddleware:
+    """ASGI middleware that records request metrics.
+
+    Requests are labelled with the route template (e.g.
+    /api/v1/students/{student_id}) rather than the path. The DB metrics of
+    a request are collected by the engine hooks into a RequestStats.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        # labels() takes about as long as the updates themselves, so the
+        # labelled children are looked up once per series
+        self._series: Dict[Tuple[str, str, int], Tuple] = {}
+
+    def series(self, method: str, route: str, status: int) -> Tuple:
+        if method not in METHODS:
+            method = "OTHER"
+        key = (method, route, status)
+        series = self._series.get(key)
+        if series is None:
+            labels = (method, route, str(status))
+            series = self._series[key] = (
+                REQUESTS.labels(*labels),
+                REQUEST_DURATION.labels(*labels),
+                REQUEST_QUERIES.labels(route),
+                REQUEST_DB_DURATION.labels(route),
+                REQUEST_CHECKOUT_WAIT.labels(route),
+            )
+        return series
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_FLIGHT.dec()
+            request_stats.reset(token)
+            route = getattr(scope.get("route"), "path_format", UNMATCHED)
+            requests, duration, queries, db_duration, checkout_wait = self.series(
+                scope["method"], route, status)
+            requests.inc()
+            duration.observe(elapsed)
+            queries.observe(stats.queries)
+            if stats.queries:
+                db_duration.observe(stats.db_seconds)
+            if stats.checkout_seconds:
+                checkout_wait.observe(stats.checkout_seconds)
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Time every query of an engine.
+
+    Args:
+        engine (Engine): engine, async_engine.sync_engine for an AsyncEngine
+        name (str): value of the engine label
+    """
+    duration = QUERY_DURATION.labels(name)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query(conn, cursor, statement, parameters, context, executemany) -> None:
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def finish_query(conn, cursor, statement, parameters, context, executemany) -> None:
+        seconds = time.perf_counter() - context._metrics_started
+        duration.observe(seconds)
+        stats = request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += seconds
+
+
+class PoolCollector:
+    """Expose the pool size and the checkout wait histogram of engines."""
+
+    def __init__(self, engines: Dict[str, Engine]) -> None:
+        self.engines = engines
+
+    def collect(self):
+        checked_out = GaugeMetricFamily("db_pool_checked_out", "Connections in use", labels=["engine"])
+        checked_in = GaugeMetricFamily("db_pool_checked_in", "Idle pooled connections", labels=["engine"])
+        wait = HistogramMetricFamily("db_pool_checkout_wait_seconds", "Time spent waiting for a connection",
+                                     labels=["engine"])
+        for name, engine in self.engines.items():
+            # read engine.pool every time: dispose() replaces the pool
+            status = pool_status(engine.pool)
+            if "checkedOut" in status:
+                checked_out.add_metric([name], status["checkedOut"])
+                checked_in.add_metric([name], status["checkedIn"])
+            if "waitSeconds" in status:
+                histogram = status["waitSeconds"]
+                wait.add_metric([name], list(histogram["buckets"].items()), histogram["sum"])
+        yield checked_out
+        yield checked_in
+        yield wait
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Prometheus scrape endpoint."""
+    if MULTIPROCESS:
+        workers = CollectorRegistry()
+        multiprocess.MultiProcessCollector(workers)
+        return Response(generate_latest(workers), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def setup_metrics(app: ASGIApp, engines: Dict[str, Engine]) -> None:
+    """Add the metrics middleware, the DB hooks and the /metrics route.
+
+    Args:
+        app (ASGIApp): FastAPI application
+        engines (Dict[str, Engine]): engines to instrument by label
+    """
+    for name, engine in engines.items():
+        instrument_engine(engine, name)
+    # the pools of other workers can't be read; see /internal/pool of each
+    if not MULTIPROCESS:
+        registry.register(PoolCollector(engines))
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
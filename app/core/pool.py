@@ -0,0 +1,107 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Sequence, Type
+
+from sqlalchemy.pool import Pool, QueuePool
+
+from .request_stats import request_stats
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class WaitHistogram:
+    """Histogram of connection checkout wait times in seconds."""
+
+    def __init__(self, buckets: Sequence[float] = WAIT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        """Record a single wait.
+
+        Args:
+            seconds (float): Time spent waiting for a connection
+        """
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def snapshot(self) -> Dict:
+        """Get the histogram with cumulative bucket counts.
+
+        Returns:
+            Dict: count, sum, max and buckets keyed by upper bound
+        """
+        with self._lock:
+            counts = list(self.counts)
+            snapshot = {"count": self.count, "sum": self.sum, "max": self.max}
+        buckets = {}
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            total += count
+            buckets["+Inf" if bound == float("inf") else str(bound)] = total
+        snapshot["buckets"] = buckets
+        return snapshot
+
+
+class _TimedPoolMixin:
+    wait_histogram: WaitHistogram
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            wait = time.perf_counter() - start
+            self.wait_histogram.observe(wait)
+            stats = request_stats.get()
+            if stats is not None:
+                stats.checkout_seconds += wait
+
+
+def timed_pool_class(base: Type[QueuePool]) -> Type[QueuePool]:
+    """Make a pool class that records checkout wait times.
+
+    The histogram lives on the class, so it survives pool.recreate() on
+    engine.dispose().
+
+    Args:
+        base (Type[QueuePool]): QueuePool or AsyncAdaptedQueuePool
+
+    Returns:
+        Type[QueuePool]: pool class with its own wait_histogram
+    """
+    return type(f"Timed{base.__name__}", (_TimedPoolMixin, base),
+                {"wait_histogram": WaitHistogram()})
+
+
+def pool_status(pool: Pool) -> Dict:
+    """Get live statistics of a connection pool.
+
+    Args:
+        pool (Pool): engine.pool
+
+    Returns:
+        Dict: pool statistics
+    """
+    status = {"class": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checkedIn=pool.checkedin(),
+            checkedOut=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    histogram = getattr(pool, "wait_histogram", None)
+    if histogram is not None:
+        status["waitSeconds"] = histogram.snapshot()
+    return status
@@ -0,0 +1,221 @@
+import asyncio
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import (
+    DB_USER,
+    DB_PASS,
+    DB_NAME,
+    DB_REPLICA_HOSTS,
+    DB_REPLICA_MAX_LAG,
+    DB_REPLICA_CHECK_INTERVAL,
+)
+from .database import AsyncSessionLocal, async_connect_args, engine_options
+
+logger = logging.getLogger(__name__)
+
+# Read-your-writes: responses to writes carry the WAL position of the
+# primary after the write, and reads that send it back are only served by
+# replicas that have replayed that far.
+LSN_HEADER = "X-Last-Write-LSN"
+LSN_COOKIE = "last_write_lsn"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+REPLICA_STATUS_SQL = text("""
+    SELECT
+        pg_is_in_recovery(),
+        pg_last_wal_replay_lsn()::text,
+        CASE
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+        END
+""")
+
+
+def parse_lsn(value: Optional[str]) -> Optional[int]:
+    """Convert a pg_lsn like 16/B374D848 to an int; None if it isn't one."""
+    if not value:
+        return None
+    high, _, low = value.partition("/")
+    try:
+        return (int(high, 16) << 32) + int(low, 16)
+    except ValueError:
+        return None
+
+
+class Replica:
+    """A read replica and its state as of the last health check."""
+
+    def __init__(self, name: str, engine: AsyncEngine) -> None:
+        self.name = name
+        self.engine = engine
+        self.sessionmaker = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+        self.healthy = False
+        self.replay_lsn = 0
+
+    async def check(self, max_lag: float, timeout: float) -> None:
+        """Refresh the health and the replay position of the replica.
+
+        A replica is healthy if it answers within timeout, is in recovery
+        and lags behind the primary by at most max_lag seconds.
+
+        Args:
+            max_lag (float): allowed replication lag in seconds
+            timeout (float): seconds to wait for the answer
+        """
+        async def status() -> tuple:
+            async with self.engine.connect() as connection:
+                return (await connection.execute(REPLICA_STATUS_SQL)).one()
+
+        # the connect counts too: a host that drops packets would hang it
+        # for the driver's connect timeout
+        try:
+            in_recovery, replay_lsn, lag = await asyncio.wait_for(status(), timeout)
+        except Exception as error:
+            if self.healthy:
+                logger.warning("Replica %s is down: %s", self.name, error)
+            self.healthy = False
+            return
+        healthy = bool(in_recovery) and lag is not None and lag <= max_lag
+        if healthy and not self.healthy:
+            logger.info("Replica %s is up (lag %s s)", self.name, lag)
+        elif self.healthy and not healthy:
+            logger.warning("Replica %s is down (in recovery: %s, lag %s s)", self.name, in_recovery, lag)
+        self.healthy = healthy
+        self.replay_lsn = parse_lsn(replay_lsn) or 0
+
+
+class ReplicaRouter:
+    """Spread reads over the healthy replicas in turn."""
+
+    def __init__(self, replicas: List[Replica]) -> None:
+        self.replicas = replicas
+        self._turn = itertools.count()
+        # highest write LSN this process has handed out, see fresh_for_cache()
+        self.last_write_lsn = 0
+
+    def choose(self, min_lsn: int = 0) -> Optional[Replica]:
+        """Get the next healthy replica that has replayed min_lsn.
+
+        Args:
+            min_lsn (int, optional): WAL position the reader has to see. Defaults to 0.
+
+        Returns:
+            Optional[Replica]: replica, or None to read from the primary
+        """
+        fit = [replica for replica in self.replicas if replica.healthy and replica.replay_lsn >= min_lsn]
+        if not fit:
+            return None
+        return fit[next(self._turn) % len(fit)]
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(replica.check(DB_REPLICA_MAX_LAG, DB_REPLICA_CHECK_INTERVAL)
+                               for replica in self.replicas))
+
+    async def monitor(self, interval: float) -> None:
+        """Check the replicas every interval seconds until cancelled."""
+        while True:
+            await self.check_all()
+            await asyncio.sleep(interval)
+
+    @asynccontextmanager
+    async def lifespan(self, app) -> AsyncIterator[None]:
+        """Health-check the replicas while the app runs; close their pools after."""
+        if not self.replicas:
+            yield
+            return
+        await self.check_all()
+        task = asyncio.create_task(self.monitor(DB_REPLICA_CHECK_INTERVAL))
+        try:
+            yield
+        finally:
+            task.cancel()
+            for replica in self.replicas:
+                await replica.engine.dispose()
+
+
+def replica_engine(host: str) -> AsyncEngine:
+    host, _, port = host.partition(":")
+    return create_async_engine(
+        f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{host}:{port or 5432}/{DB_NAME}",
+        connect_args=async_connect_args(),
+        **engine_options(AsyncAdaptedQueuePool),
+    )
+
+
+replicas = ReplicaRouter([Replica(host, replica_engine(host)) for host in DB_REPLICA_HOSTS])
+
+
+def requested_lsn(request: Request) -> int:
+    """Get the write LSN a reader sent in the header or the cookie."""
+    return parse_lsn(request.headers.get(LSN_HEADER) or request.cookies.get(LSN_COOKIE)) or 0
+
+
+async def get_read_db(request: Request) -> AsyncIterator[AsyncSession]:
+    """Session for handlers that only read: a replica if one is fit, else the primary."""
+    replica = replicas.choose(requested_lsn(request))
+    sessionmaker = AsyncSessionLocal if replica is None else replica.sessionmaker
+    async with sessionmaker() as db:
+        db.info["replayLsn"] = None if replica is None else replica.replay_lsn
+        yield db
+
+
+def fresh_for_cache(db: AsyncSession) -> bool:
+    """Check that what a session read may go to the response cache.
+
+    The cache is invalidated right after writes commit on the primary. A
+    replica that hasn't replayed the writes of this process yet would put
+    the old rows back for the whole TTL.
+
+    Args:
+        db (AsyncSession): session from get_read_db() or get_async_db()
+
+    Returns:
+        bool: False if the session reads a replica behind the last write
+    """
+    replay_lsn = db.info.get("replayLsn")
+    return replay_lsn is None or replay_lsn >= replicas.last_write_lsn
+
+
+class WriteLSNMiddleware:
+    """ASGI middleware that returns the primary's WAL position after writes.
+
+    Successful requests with unsafe methods that committed through
+    get_async_db() get the position in the X-Last-Write-LSN header and the
+    last_write_lsn cookie; the next reads of the client go to replicas that
+    have replayed it. The middleware asks for the position with write_lsn in
+    the request state; the session reads it right after the commit and
+    leaves it there.
+    """
+
+    def __init__(self, app: ASGIApp, router: ReplicaRouter = replicas) -> None:
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        state = scope.setdefault("state", {})
+        state["write_lsn"] = None
+
+        async def send_with_lsn(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                lsn = state["write_lsn"]
+                if lsn is not None:
+                    self.router.last_write_lsn = max(self.router.last_write_lsn, parse_lsn(lsn) or 0)
+                    headers = MutableHeaders(scope=message)
+                    headers.append(LSN_HEADER, lsn)
+                    headers.append("Set-Cookie", f"{LSN_COOKIE}={lsn}; Path=/; HttpOnly; SameSite=Lax")
+            await send(message)
+
+        await self.app(scope, receive, send_with_lsn)
+
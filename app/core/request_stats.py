@@ -0,0 +1,17 @@
+from contextvars import ContextVar
+from typing import Optional
+
+
+class RequestStats:
+    """DB work done while serving one request."""
+    __slots__ = ("queries", "db_seconds", "checkout_seconds")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.checkout_seconds = 0.0
+
+
+# Set by MetricsMiddleware for the duration of a request. Sync dependencies
+# run in a thread pool with a copy of the context, so they see the same object.
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
@@ -0,0 +1,11 @@
+from uvicorn.workers import UvicornWorker as BaseUvicornWorker
+
+
+class UvicornWorker(BaseUvicornWorker):
+    """Gunicorn worker that serves the app on uvloop and httptools.
+
+    Unlike "auto", it fails to start without them rather than falling back
+    to asyncio and h11.
+    """
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
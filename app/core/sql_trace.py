@@ -0,0 +1,169 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import SQL_EXPLAIN, SQL_REPEATED_THRESHOLD, SQL_SLOW_QUERY_MS
+
+logger = logging.getLogger(__name__)
+
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+class QueryTrace:
+    """Statements run while serving one request."""
+    __slots__ = ("statements", "count", "seconds")
+
+    def __init__(self) -> None:
+        self.statements: Counter = Counter()
+        self.count = 0
+        self.seconds = 0.0
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Get statements run at least threshold times, the N+1 suspects.
+
+        Args:
+            threshold (int): minimum number of runs
+
+        Returns:
+            List[Tuple[str, int]]: statements and their run counts
+        """
+        return [(statement, count) for statement, count in self.statements.most_common()
+                if count >= threshold]
+
+
+query_trace: ContextVar[Optional[QueryTrace]] = ContextVar("query_trace", default=None)
+
+
+def _explain(conn, statement: str, parameters) -> str:
+    # a cursor of its own: the query's cursor may still hold unread rows
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN {statement}", parameters)
+        return "\n".join(row[0] for row in cursor.fetchall())
+    except Exception as error:
+        return f"EXPLAIN failed: {error}"
+    finally:
+        cursor.close()
+
+
+def instrument_engine(engine: Engine, slow_query_ms: float = SQL_SLOW_QUERY_MS,
+                      explain: bool = SQL_EXPLAIN) -> None:
+    """Trace the statements of an engine run during traced requests.
+
+    Statements slower than slow_query_ms are logged with their parameters
+    and, if explain is set, their EXPLAIN plan.
+
+    Args:
+        engine (Engine): engine, async_engine.sync_engine for an AsyncEngine
+        slow_query_ms (float, optional): slow query threshold. Defaults to SQL_SLOW_QUERY_MS.
+        explain (bool, optional): log plans of slow queries. Defaults to SQL_EXPLAIN.
+    """
+    slow_query_seconds = slow_query_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query(conn, cursor, statement, parameters, context, executemany) -> None:
+        context._trace_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def finish_query(conn, cursor, statement, parameters, context, executemany) -> None:
+        trace = query_trace.get()
+        if trace is None:
+            return
+        seconds = time.perf_counter() - context._trace_started
+        trace.statements[statement] += 1
+        trace.count += 1
+        trace.seconds += seconds
+        if seconds >= slow_query_seconds:
+            plan = ""
+            if explain and not executemany and statement.lstrip().upper().startswith(_EXPLAINABLE):
+                plan = "\n" + _explain(conn, statement, parameters)
+            logger.warning("Slow query (%.1f ms): %s\nParameters: %r%s",
+                           seconds * 1000, statement, parameters, plan)
+
+
+@contextmanager
+def count_queries(engine: Engine) -> Iterator[List[str]]:
+    """Collect the statements an engine runs inside the block.
+
+    Meant for query budgets in tests:
+
+        with count_queries(engine) as queries:
+            client.get("/api/v1/students/1")
+        assert len(queries) <= 1
+
+    Args:
+        engine (Engine): engine, async_engine.sync_engine for an AsyncEngine
+
+    Yields:
+        List[str]: statements in the order they ran
+    """
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement)
+
+    event.listen(engine, "after_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "after_cursor_execute", record)
+
+
+class SQLTraceMiddleware:
+    """ASGI middleware that traces the statements of every request.
+
+    Adds a Server-Timing header with the DB time and the statement count
+    (up to the moment the response starts) and logs statements repeated at
+    least repeated_threshold times in one request.
+    """
+
+    def __init__(self, app: ASGIApp, repeated_threshold: int = SQL_REPEATED_THRESHOLD) -> None:
+        self.app = app
+        self.repeated_threshold = repeated_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = QueryTrace()
+        start = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(trace, time.perf_counter() - start))
+            await send(message)
+
+        token = query_trace.set(trace)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            query_trace.reset(token)
+            for statement, count in trace.repeated(self.repeated_threshold):
+                logger.warning("Possible N+1: %s %s ran %d times: %s",
+                               scope["method"], scope["path"], count, statement)
+
+
+def server_timing(trace: QueryTrace, seconds: float) -> str:
+    return (f'db;dur={trace.seconds * 1000:.2f};desc="{trace.count} queries", '
+            f'app;dur={seconds * 1000:.2f}')
+
+
+def setup_sql_trace(app: ASGIApp, engines: List[Engine]) -> None:
+    """Add the tracing middleware and hooks.
+
+    Args:
+        app (ASGIApp): FastAPI application
+        engines (List[Engine]): engines to trace
+    """
+    for engine in engines:
+        instrument_engine(engine)
+    app.add_middleware(SQLTraceMiddleware)
@@ -0,0 +1,27 @@
+"""bookings of classrooms and courses with exclusion constraints
+
+Revision ID: a7c3e9f1d5b4
+Revises: f2b8d4e6a0c3
+Create Date: 2026-10-19 00:12:31.552904
+
+"""
+from alembic import op
+from db.scripts import read_script
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e9f1d5b4'
+down_revision = 'f2b8d4e6a0c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing double bookings fail the upgrade with the conflicting keys in
+    # the error; they have to be moved by hand first.
+    op.execute('LOCK TABLE "Schedules", "Exams" IN SHARE MODE')
+    op.execute(read_script("create_bookings.sql"))
+
+
+def downgrade() -> None:
+    op.execute(read_script("drop_bookings.sql"))
@@ -0,0 +1,25 @@
+"""timetable read model on bookings
+
+Revision ID: b4d8f0a2c6e9
+Revises: a7c3e9f1d5b4
+Create Date: 2026-10-19 01:04:17.230914
+
+"""
+from alembic import op
+from db.scripts import read_script
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d8f0a2c6e9'
+down_revision = 'a7c3e9f1d5b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute('LOCK TABLE "Schedules", "Exams", "Courses", "Classrooms" IN SHARE MODE')
+    op.execute(read_script("create_timetable.sql"))
+
+
+def downgrade() -> None:
+    op.execute(read_script("drop_timetable.sql"))
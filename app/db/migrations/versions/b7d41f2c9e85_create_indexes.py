@@ -0,0 +1,28 @@
+"""create indexes
+
+Revision ID: b7d41f2c9e85
+Revises: 606a0c0562e0
+Create Date: 2026-10-18 19:05:12.418230
+
+"""
+from alembic import op
+from db.scripts import read_statements
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d41f2c9e85'
+down_revision = '606a0c0562e0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for sql in read_statements("create_indexes.sql"):
+            op.execute(sql)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for sql in read_statements("drop_indexes.sql"):
+            op.execute(sql)
@@ -0,0 +1,28 @@
+"""grades unique student and course
+
+Revision ID: c3e8a5d1f0b2
+Revises: b7d41f2c9e85
+Create Date: 2026-10-18 20:14:37.905113
+
+"""
+from alembic import op
+from db.scripts import read_statements
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8a5d1f0b2'
+down_revision = 'b7d41f2c9e85'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for sql in read_statements("create_grades_unique.sql"):
+            op.execute(sql)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for sql in read_statements("drop_grades_unique.sql"):
+            op.execute(sql)
@@ -0,0 +1,41 @@
+"""students email and courses name teacher unique
+
+Revision ID: d9f2b6a4c1e7
+Revises: c3e8a5d1f0b2
+Create Date: 2026-10-18 21:02:11.417530
+
+"""
+from alembic import op
+from sqlalchemy import text
+from db.scripts import read_statements
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9f2b6a4c1e7'
+down_revision = 'c3e8a5d1f0b2'
+branch_labels = None
+depends_on = None
+
+# Duplicates can't be resolved automatically: students and courses own grades.
+DUPLICATES_SQL = {
+    "Students.email": 'SELECT email FROM "Students" GROUP BY email HAVING count(*) > 1 LIMIT 5',
+    "Courses(name, teacherId)": 'SELECT name FROM "Courses" GROUP BY name, "teacherId" HAVING count(*) > 1 LIMIT 5',
+}
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    for columns, sql in DUPLICATES_SQL.items():
+        duplicates = connection.execute(text(sql)).scalars().all()
+        if duplicates:
+            raise RuntimeError(f"Merge the duplicate {columns} values before the upgrade: {duplicates}")
+
+    with op.get_context().autocommit_block():
+        for sql in read_statements("create_unique_constraints.sql"):
+            op.execute(sql)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for sql in read_statements("drop_unique_constraints.sql"):
+            op.execute(sql)
@@ -0,0 +1,27 @@
+"""course rosters table maintained by triggers
+
+Revision ID: e5a1c7f3b9d2
+Revises: d9f2b6a4c1e7
+Create Date: 2026-10-18 22:10:45.208113
+
+"""
+from alembic import op
+from db.scripts import read_script
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a1c7f3b9d2'
+down_revision = 'd9f2b6a4c1e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # the table is filled and the triggers are created in one transaction,
+    # so no student write falls between the two
+    op.execute('LOCK TABLE "Students", "Groups" IN SHARE MODE')
+    op.execute(read_script("create_course_rosters.sql"))
+
+
+def downgrade() -> None:
+    op.execute(read_script("drop_course_rosters.sql"))
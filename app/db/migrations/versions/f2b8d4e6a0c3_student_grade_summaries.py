@@ -0,0 +1,26 @@
+"""student grade summaries maintained by triggers, course credits
+
+Revision ID: f2b8d4e6a0c3
+Revises: e5a1c7f3b9d2
+Create Date: 2026-10-18 23:04:12.730521
+
+"""
+from alembic import op
+from db.scripts import read_script
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b8d4e6a0c3'
+down_revision = 'e5a1c7f3b9d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # no grade write may fall between the backfill and the triggers
+    op.execute('LOCK TABLE "Grades", "Courses" IN SHARE MODE')
+    op.execute(read_script("create_grade_summaries.sql"))
+
+
+def downgrade() -> None:
+    op.execute(read_script("drop_grade_summaries.sql"))
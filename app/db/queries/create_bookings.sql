@@ -0,0 +1,51 @@
+-- Занятие или экзамен занимает 90 минут с указанного времени.
+CREATE FUNCTION "booking_slot"(day DATE, start TIME) RETURNS TSRANGE AS $$
+    SELECT tsrange(day + start, day + start + interval '90 minutes')
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Занятость аудиторий и курсов: занятия и экзамены в одной таблице, её поддерживают триггеры.
+-- Ограничения-исключения не дают занять аудиторию или курс дважды в пересекающееся время,
+-- в том числе занятием и экзаменом. Проверка идёт по GiST-индексу, O(log n) от числа записей.
+-- int4range(id, id, '[]') вместо id: равенство целых в GiST требует расширения btree_gist.
+CREATE TABLE "Bookings" (
+    kind VARCHAR(8) NOT NULL,
+    "sourceId" INT NOT NULL,
+    "classroomId" INT,
+    "courseId" INT,
+    slot TSRANGE NOT NULL,
+    PRIMARY KEY (kind, "sourceId")
+);
+
+INSERT INTO "Bookings" (kind, "sourceId", "classroomId", "courseId", slot)
+SELECT 'schedule', id, "classroomId", "courseId", "booking_slot"(date, time)
+FROM "Schedules" WHERE date IS NOT NULL AND time IS NOT NULL
+UNION ALL
+SELECT 'exam', id, "classroomId", "courseId", "booking_slot"(date, time)
+FROM "Exams" WHERE date IS NOT NULL AND time IS NOT NULL;
+
+-- Время идёт первым: по нему GiST-индекс делится лучше, чем по немногим аудиториям.
+ALTER TABLE "Bookings" ADD CONSTRAINT "ex_Bookings_classroom" EXCLUDE USING gist
+    (slot WITH &&, int4range("classroomId", "classroomId", '[]') WITH &&) WHERE ("classroomId" IS NOT NULL);
+ALTER TABLE "Bookings" ADD CONSTRAINT "ex_Bookings_course" EXCLUDE USING gist
+    (slot WITH &&, int4range("courseId", "courseId", '[]') WITH &&) WHERE ("courseId" IS NOT NULL);
+
+-- Занятие или экзамен добавлен, изменён или удалён. TG_ARGV[0] - вид записи.
+CREATE FUNCTION "bookings_on_write"() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        DELETE FROM "Bookings" WHERE kind = TG_ARGV[0] AND "sourceId" = OLD.id;
+    END IF;
+    IF TG_OP <> 'DELETE' AND NEW.date IS NOT NULL AND NEW.time IS NOT NULL THEN
+        INSERT INTO "Bookings" (kind, "sourceId", "classroomId", "courseId", slot)
+        VALUES (TG_ARGV[0], NEW.id, NEW."classroomId", NEW."courseId", "booking_slot"(NEW.date, NEW.time));
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "Bookings_schedules"
+AFTER INSERT OR UPDATE OR DELETE ON "Schedules"
+FOR EACH ROW EXECUTE FUNCTION "bookings_on_write"('schedule');
+CREATE TRIGGER "Bookings_exams"
+AFTER INSERT OR UPDATE OR DELETE ON "Exams"
+FOR EACH ROW EXECUTE FUNCTION "bookings_on_write"('exam');
@@ -0,0 +1,69 @@
+-- Состав курсов: студенты каждого курса вместе с полями студента.
+-- Таблица производная, её поддерживают триггеры на "Students" и "Groups", поэтому
+-- список студентов курса читается одним диапазоном первичного ключа, без соединений.
+CREATE TABLE "CourseRosters" (
+    "courseId" INT NOT NULL,
+    "studentId" INT NOT NULL,
+    "firstName" VARCHAR(100),
+    "lastName" VARCHAR(100),
+    email VARCHAR(100),
+    "groupId" INT NOT NULL,
+    PRIMARY KEY ("courseId", "studentId")
+);
+-- Индексы для триггеров: поиск строк студента и строк группы.
+CREATE INDEX "ix_CourseRosters_studentId" ON "CourseRosters" ("studentId");
+CREATE INDEX "ix_CourseRosters_groupId" ON "CourseRosters" ("groupId");
+
+INSERT INTO "CourseRosters" ("courseId", "studentId", "firstName", "lastName", email, "groupId")
+SELECT g."courseId", s.id, s."firstName", s."lastName", s.email, s."groupId"
+FROM "Students" s
+JOIN "Groups" g ON g.id = s."groupId"
+WHERE g."courseId" IS NOT NULL;
+
+-- Студент добавлен, изменён или удалён.
+CREATE FUNCTION "course_rosters_on_students"() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW."groupId" IS NOT DISTINCT FROM OLD."groupId" THEN
+        UPDATE "CourseRosters"
+        SET "studentId" = NEW.id, "firstName" = NEW."firstName", "lastName" = NEW."lastName",
+            email = NEW.email
+        WHERE "studentId" = OLD.id;
+        RETURN NULL;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        DELETE FROM "CourseRosters" WHERE "studentId" = OLD.id;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        -- FOR SHARE ждёт параллельную смену курса группы и читает уже новый курс
+        INSERT INTO "CourseRosters" ("courseId", "studentId", "firstName", "lastName", email, "groupId")
+        SELECT g."courseId", NEW.id, NEW."firstName", NEW."lastName", NEW.email, NEW."groupId"
+        FROM "Groups" g
+        WHERE g.id = NEW."groupId" AND g."courseId" IS NOT NULL
+        FOR SHARE;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "CourseRosters_students"
+AFTER INSERT OR UPDATE OR DELETE ON "Students"
+FOR EACH ROW EXECUTE FUNCTION "course_rosters_on_students"();
+
+-- Группу перевели на другой курс: её студенты переходят в состав нового курса.
+CREATE FUNCTION "course_rosters_on_groups"() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM "CourseRosters" WHERE "groupId" = OLD.id;
+    IF NEW."courseId" IS NOT NULL THEN
+        INSERT INTO "CourseRosters" ("courseId", "studentId", "firstName", "lastName", email, "groupId")
+        SELECT NEW."courseId", s.id, s."firstName", s."lastName", s.email, s."groupId"
+        FROM "Students" s
+        WHERE s."groupId" = NEW.id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "CourseRosters_groups"
+AFTER UPDATE OF "courseId" ON "Groups"
+FOR EACH ROW WHEN (OLD."courseId" IS DISTINCT FROM NEW."courseId")
+EXECUTE FUNCTION "course_rosters_on_groups"();
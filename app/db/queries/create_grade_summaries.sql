@@ -0,0 +1,99 @@
+-- Кредиты курса: вес оценки курса в среднем балле (GPA).
+ALTER TABLE "Courses" ADD COLUMN credits INT NOT NULL DEFAULT 1 CHECK (credits > 0);
+
+-- Балл GPA по 4-балльной шкале для оценки из 100.
+CREATE FUNCTION "grade_points"(grade INT) RETURNS INT AS $$
+    SELECT CASE
+        WHEN grade >= 90 THEN 4
+        WHEN grade >= 80 THEN 3
+        WHEN grade >= 70 THEN 2
+        WHEN grade >= 60 THEN 1
+        ELSE 0
+    END
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Итоги оценок студента: количество, сумма, сумма кредитов и взвешенная сумма баллов.
+-- Хранятся суммы, а не средние: их можно менять на разницу, не пересчитывая все оценки.
+CREATE TABLE "StudentGradeSummaries" (
+    "studentId" INT PRIMARY KEY REFERENCES "Students"(id) ON DELETE CASCADE,
+    "gradeCount" INT NOT NULL DEFAULT 0,
+    "gradeSum" BIGINT NOT NULL DEFAULT 0,
+    credits BIGINT NOT NULL DEFAULT 0,
+    "creditPoints" BIGINT NOT NULL DEFAULT 0
+);
+
+-- Прибавляет добавленные оценки и вычитает удалённые (обновление = удаление + добавление).
+CREATE FUNCTION "apply_grade_changes"(added "Grades"[], removed "Grades"[]) RETURNS void AS $$
+    INSERT INTO "StudentGradeSummaries" AS s ("studentId", "gradeCount", "gradeSum", credits, "creditPoints")
+    SELECT g."studentId", sum(g.sign), sum(g.sign * g.grade), sum(g.sign * c.credits),
+           sum(g.sign * c.credits * "grade_points"(g.grade))
+    FROM (
+        SELECT a."studentId", a."courseId", a.grade, 1 AS sign FROM unnest(added) a
+        UNION ALL
+        SELECT r."studentId", r."courseId", r.grade, -1 FROM unnest(removed) r
+    ) g
+    JOIN "Courses" c ON c.id = g."courseId"
+    WHERE g."studentId" IS NOT NULL AND g.grade IS NOT NULL
+    GROUP BY g."studentId"
+    -- один порядок блокировок строк итогов у параллельных транзакций
+    ORDER BY g."studentId"
+    ON CONFLICT ("studentId") DO UPDATE SET
+        "gradeCount" = s."gradeCount" + EXCLUDED."gradeCount",
+        "gradeSum" = s."gradeSum" + EXCLUDED."gradeSum",
+        credits = s.credits + EXCLUDED.credits,
+        "creditPoints" = s."creditPoints" + EXCLUDED."creditPoints"
+$$ LANGUAGE sql;
+
+-- Триггеры уровня оператора: пакетная запись оценок даёт один запрос к итогам.
+CREATE FUNCTION "grade_summaries_on_grades"() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM "apply_grade_changes"(ARRAY(SELECT n::"Grades" FROM new_grades n), '{}');
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM "apply_grade_changes"(ARRAY(SELECT n::"Grades" FROM new_grades n),
+                                      ARRAY(SELECT o::"Grades" FROM old_grades o));
+    ELSE
+        PERFORM "apply_grade_changes"('{}', ARRAY(SELECT o::"Grades" FROM old_grades o));
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "StudentGradeSummaries_insert" AFTER INSERT ON "Grades"
+REFERENCING NEW TABLE AS new_grades
+FOR EACH STATEMENT EXECUTE FUNCTION "grade_summaries_on_grades"();
+CREATE TRIGGER "StudentGradeSummaries_update" AFTER UPDATE ON "Grades"
+REFERENCING OLD TABLE AS old_grades NEW TABLE AS new_grades
+FOR EACH STATEMENT EXECUTE FUNCTION "grade_summaries_on_grades"();
+CREATE TRIGGER "StudentGradeSummaries_delete" AFTER DELETE ON "Grades"
+REFERENCING OLD TABLE AS old_grades
+FOR EACH STATEMENT EXECUTE FUNCTION "grade_summaries_on_grades"();
+
+-- Изменились кредиты курса: пересчитываются веса оценок этого курса.
+CREATE FUNCTION "grade_summaries_on_courses"() RETURNS trigger AS $$
+BEGIN
+    UPDATE "StudentGradeSummaries" s
+    SET credits = s.credits + d.grades * (NEW.credits - OLD.credits),
+        "creditPoints" = s."creditPoints" + d.points * (NEW.credits - OLD.credits)
+    FROM (
+        SELECT "studentId", count(*) AS grades, sum("grade_points"(grade)) AS points
+        FROM "Grades"
+        WHERE "courseId" = NEW.id AND "studentId" IS NOT NULL AND grade IS NOT NULL
+        GROUP BY "studentId"
+    ) d
+    WHERE s."studentId" = d."studentId";
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "StudentGradeSummaries_courses"
+AFTER UPDATE OF credits ON "Courses"
+FOR EACH ROW WHEN (OLD.credits IS DISTINCT FROM NEW.credits)
+EXECUTE FUNCTION "grade_summaries_on_courses"();
+
+INSERT INTO "StudentGradeSummaries" ("studentId", "gradeCount", "gradeSum", credits, "creditPoints")
+SELECT g."studentId", count(*), sum(g.grade), sum(c.credits), sum(c.credits * "grade_points"(g.grade))
+FROM "Grades" g
+JOIN "Courses" c ON c.id = g."courseId"
+WHERE g."studentId" IS NOT NULL AND g.grade IS NOT NULL
+GROUP BY g."studentId";
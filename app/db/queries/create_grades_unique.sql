@@ -0,0 +1,28 @@
+-- Оценка одна на пару студент-курс. Из дубликатов остаётся последняя оценка.
+DELETE FROM "Grades" g
+USING "Grades" newer
+WHERE g."studentId" = newer."studentId"
+  AND g."courseId" = newer."courseId"
+  AND g.id < newer.id;
+-- Индекс, недостроенный прошлой попыткой (дубликат вставили во время сборки), остаётся INVALID,
+-- и IF NOT EXISTS его бы пропустил. Такой индекс удаляется, чтобы собрать его заново.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_index
+               WHERE indexrelid = to_regclass('"uq_Grades_studentId_courseId"') AND NOT indisvalid) THEN
+        DROP INDEX "uq_Grades_studentId_courseId";
+    END IF;
+END
+$$;
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "uq_Grades_studentId_courseId" ON "Grades" ("studentId", "courseId");
+-- Повторный запуск после успешного не падает на существующем ограничении.
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint
+                   WHERE conrelid = '"Grades"'::regclass AND conname = 'uq_Grades_studentId_courseId') THEN
+        ALTER TABLE "Grades" ADD CONSTRAINT "uq_Grades_studentId_courseId" UNIQUE USING INDEX "uq_Grades_studentId_courseId";
+    END IF;
+END
+$$;
+-- Уникальный индекс заменяет обычный индекс по тем же полям.
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Grades_studentId_courseId";
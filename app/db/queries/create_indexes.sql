@@ -0,0 +1,24 @@
+-- Индексы внешних ключей и полей, по которым фильтруют эндпоинты и запросы.
+-- Составные индексы (fk, id) обслуживают и поиск по внешнему ключу, и постраничную выборку с фильтром.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Classrooms_buildingId" ON "Classrooms" ("buildingId");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Departments_facultyId" ON "Departments" ("facultyId");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Teachers_facultyId_id" ON "Teachers" ("facultyId", id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Courses_teacherId_id" ON "Courses" ("teacherId", id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Courses_name_teacherId" ON "Courses" (name, "teacherId");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_CoursePrograms_courseId" ON "CoursePrograms" ("courseId");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Groups_departmentId" ON "Groups" ("departmentId");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Groups_courseId" ON "Groups" ("courseId");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_StudyPlans_semesterId" ON "StudyPlans" ("semesterId");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_StudyPlans_courseId" ON "StudyPlans" ("courseId");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_StudyPlans_groupId" ON "StudyPlans" ("groupId");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Students_groupId_id" ON "Students" ("groupId", id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Students_email" ON "Students" (email);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Schedules_courseId" ON "Schedules" ("courseId");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Schedules_classroomId" ON "Schedules" ("classroomId");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Exams_courseId" ON "Exams" ("courseId");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Exams_classroomId" ON "Exams" ("classroomId");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Grades_studentId_courseId" ON "Grades" ("studentId", "courseId");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Grades_courseId_id" ON "Grades" ("courseId", id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Assignments_courseId" ON "Assignments" ("courseId");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Assignments_dateAssigned" ON "Assignments" ("dateAssigned");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Faculties_name" ON "Faculties" (name);
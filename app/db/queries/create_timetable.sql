@@ -0,0 +1,74 @@
+-- Расписание для чтения: занятость дополняется датой, временем, курсом, преподавателем,
+-- аудиторией и зданием, чтобы выборка по любому из них шла по одной таблице без соединений.
+ALTER TABLE "Bookings"
+    ADD COLUMN date DATE,
+    ADD COLUMN time TIME,
+    ADD COLUMN "courseName" VARCHAR(100),
+    ADD COLUMN "teacherId" INT,
+    ADD COLUMN "classroomNumber" INT,
+    ADD COLUMN "buildingId" INT;
+
+UPDATE "Bookings" b
+SET date = lower(b.slot)::date, time = lower(b.slot)::time,
+    "courseName" = c.name, "teacherId" = c."teacherId"
+FROM "Courses" c
+WHERE c.id = b."courseId";
+UPDATE "Bookings" b
+SET date = lower(b.slot)::date, time = lower(b.slot)::time,
+    "classroomNumber" = r.number, "buildingId" = r."buildingId"
+FROM "Classrooms" r
+WHERE r.id = b."classroomId";
+
+-- Индексы выборок расписания за период: по аудитории, курсу, зданию, преподавателю и без фильтра.
+CREATE INDEX "ix_Bookings_classroomId_date_time" ON "Bookings" ("classroomId", date, time);
+CREATE INDEX "ix_Bookings_courseId_date" ON "Bookings" ("courseId", date);
+CREATE INDEX "ix_Bookings_buildingId_date_time" ON "Bookings" ("buildingId", date, time);
+CREATE INDEX "ix_Bookings_teacherId_date_time" ON "Bookings" ("teacherId", date, time);
+CREATE INDEX "ix_Bookings_date_time" ON "Bookings" (date, time);
+
+-- Занятие или экзамен добавлен, изменён или удалён. TG_ARGV[0] - вид записи.
+CREATE OR REPLACE FUNCTION "bookings_on_write"() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        DELETE FROM "Bookings" WHERE kind = TG_ARGV[0] AND "sourceId" = OLD.id;
+    END IF;
+    IF TG_OP <> 'DELETE' AND NEW.date IS NOT NULL AND NEW.time IS NOT NULL THEN
+        INSERT INTO "Bookings" (kind, "sourceId", "classroomId", "courseId", slot, date, time,
+                                "courseName", "teacherId", "classroomNumber", "buildingId")
+        SELECT TG_ARGV[0], NEW.id, NEW."classroomId", NEW."courseId", "booking_slot"(NEW.date, NEW.time),
+               NEW.date, NEW.time, c.name, c."teacherId", r.number, r."buildingId"
+        FROM (SELECT) one
+        LEFT JOIN "Courses" c ON c.id = NEW."courseId"
+        LEFT JOIN "Classrooms" r ON r.id = NEW."classroomId";
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+-- Курс переименовали или передали другому преподавателю.
+CREATE FUNCTION "bookings_on_courses"() RETURNS trigger AS $$
+BEGIN
+    UPDATE "Bookings" SET "courseName" = NEW.name, "teacherId" = NEW."teacherId"
+    WHERE "courseId" = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "Bookings_courses"
+AFTER UPDATE OF name, "teacherId" ON "Courses"
+FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name OR OLD."teacherId" IS DISTINCT FROM NEW."teacherId")
+EXECUTE FUNCTION "bookings_on_courses"();
+
+-- Аудиторию перенумеровали или отнесли к другому зданию.
+CREATE FUNCTION "bookings_on_classrooms"() RETURNS trigger AS $$
+BEGIN
+    UPDATE "Bookings" SET "classroomNumber" = NEW.number, "buildingId" = NEW."buildingId"
+    WHERE "classroomId" = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "Bookings_classrooms"
+AFTER UPDATE OF number, "buildingId" ON "Classrooms"
+FOR EACH ROW WHEN (OLD.number IS DISTINCT FROM NEW.number OR OLD."buildingId" IS DISTINCT FROM NEW."buildingId")
+EXECUTE FUNCTION "bookings_on_classrooms"();
@@ -0,0 +1,41 @@
+-- Уникальность email студента и названия курса у преподавателя обеспечивает БД, а не проверка в API.
+-- Индекс, недостроенный прошлой попыткой, остаётся INVALID, и IF NOT EXISTS его бы пропустил.
+-- Такой индекс удаляется, чтобы собрать его заново.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_index
+               WHERE indexrelid = to_regclass('"uq_Students_email"') AND NOT indisvalid) THEN
+        DROP INDEX "uq_Students_email";
+    END IF;
+END
+$$;
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "uq_Students_email" ON "Students" (email);
+-- Повторный запуск после успешного не падает на существующем ограничении.
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint
+                   WHERE conrelid = '"Students"'::regclass AND conname = 'uq_Students_email') THEN
+        ALTER TABLE "Students" ADD CONSTRAINT "uq_Students_email" UNIQUE USING INDEX "uq_Students_email";
+    END IF;
+END
+$$;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_index
+               WHERE indexrelid = to_regclass('"uq_Courses_name_teacherId"') AND NOT indisvalid) THEN
+        DROP INDEX "uq_Courses_name_teacherId";
+    END IF;
+END
+$$;
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "uq_Courses_name_teacherId" ON "Courses" (name, "teacherId");
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint
+                   WHERE conrelid = '"Courses"'::regclass AND conname = 'uq_Courses_name_teacherId') THEN
+        ALTER TABLE "Courses" ADD CONSTRAINT "uq_Courses_name_teacherId" UNIQUE USING INDEX "uq_Courses_name_teacherId";
+    END IF;
+END
+$$;
+-- Уникальные индексы заменяют обычные индексы по тем же полям.
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Students_email";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Courses_name_teacherId";
@@ -0,0 +1,5 @@
+DROP TRIGGER IF EXISTS "Bookings_exams" ON "Exams";
+DROP TRIGGER IF EXISTS "Bookings_schedules" ON "Schedules";
+DROP FUNCTION IF EXISTS "bookings_on_write"();
+DROP TABLE IF EXISTS "Bookings";
+DROP FUNCTION IF EXISTS "booking_slot"(DATE, TIME);
@@ -0,0 +1,5 @@
+DROP TRIGGER IF EXISTS "CourseRosters_groups" ON "Groups";
+DROP TRIGGER IF EXISTS "CourseRosters_students" ON "Students";
+DROP FUNCTION IF EXISTS "course_rosters_on_groups"();
+DROP FUNCTION IF EXISTS "course_rosters_on_students"();
+DROP TABLE IF EXISTS "CourseRosters";
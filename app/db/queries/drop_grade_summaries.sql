@@ -0,0 +1,10 @@
+DROP TRIGGER IF EXISTS "StudentGradeSummaries_courses" ON "Courses";
+DROP TRIGGER IF EXISTS "StudentGradeSummaries_insert" ON "Grades";
+DROP TRIGGER IF EXISTS "StudentGradeSummaries_update" ON "Grades";
+DROP TRIGGER IF EXISTS "StudentGradeSummaries_delete" ON "Grades";
+DROP FUNCTION IF EXISTS "grade_summaries_on_courses"();
+DROP FUNCTION IF EXISTS "grade_summaries_on_grades"();
+DROP FUNCTION IF EXISTS "apply_grade_changes"("Grades"[], "Grades"[]);
+DROP TABLE IF EXISTS "StudentGradeSummaries";
+DROP FUNCTION IF EXISTS "grade_points"(INT);
+ALTER TABLE "Courses" DROP COLUMN IF EXISTS credits;
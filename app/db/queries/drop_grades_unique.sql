@@ -0,0 +1,2 @@
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Grades_studentId_courseId" ON "Grades" ("studentId", "courseId");
+ALTER TABLE "Grades" DROP CONSTRAINT IF EXISTS "uq_Grades_studentId_courseId";
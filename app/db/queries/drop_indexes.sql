@@ -0,0 +1,22 @@
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Classrooms_buildingId";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Departments_facultyId";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Teachers_facultyId_id";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Courses_teacherId_id";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Courses_name_teacherId";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_CoursePrograms_courseId";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Groups_departmentId";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Groups_courseId";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_StudyPlans_semesterId";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_StudyPlans_courseId";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_StudyPlans_groupId";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Students_groupId_id";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Students_email";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Schedules_courseId";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Schedules_classroomId";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Exams_courseId";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Exams_classroomId";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Grades_studentId_courseId";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Grades_courseId_id";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Assignments_courseId";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Assignments_dateAssigned";
+DROP INDEX CONCURRENTLY IF EXISTS "ix_Faculties_name";
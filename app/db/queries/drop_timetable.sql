@@ -0,0 +1,24 @@
+DROP TRIGGER IF EXISTS "Bookings_classrooms" ON "Classrooms";
+DROP TRIGGER IF EXISTS "Bookings_courses" ON "Courses";
+DROP FUNCTION IF EXISTS "bookings_on_classrooms"();
+DROP FUNCTION IF EXISTS "bookings_on_courses"();
+-- Прежняя функция триггера занятости, без полей расписания.
+CREATE OR REPLACE FUNCTION "bookings_on_write"() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        DELETE FROM "Bookings" WHERE kind = TG_ARGV[0] AND "sourceId" = OLD.id;
+    END IF;
+    IF TG_OP <> 'DELETE' AND NEW.date IS NOT NULL AND NEW.time IS NOT NULL THEN
+        INSERT INTO "Bookings" (kind, "sourceId", "classroomId", "courseId", slot)
+        VALUES (TG_ARGV[0], NEW.id, NEW."classroomId", NEW."courseId", "booking_slot"(NEW.date, NEW.time));
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+ALTER TABLE "Bookings"
+    DROP COLUMN IF EXISTS date,
+    DROP COLUMN IF EXISTS time,
+    DROP COLUMN IF EXISTS "courseName",
+    DROP COLUMN IF EXISTS "teacherId",
+    DROP COLUMN IF EXISTS "classroomNumber",
+    DROP COLUMN IF EXISTS "buildingId";
@@ -0,0 +1,4 @@
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Students_email" ON "Students" (email);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_Courses_name_teacherId" ON "Courses" (name, "teacherId");
+ALTER TABLE "Students" DROP CONSTRAINT IF EXISTS "uq_Students_email";
+ALTER TABLE "Courses" DROP CONSTRAINT IF EXISTS "uq_Courses_name_teacherId";
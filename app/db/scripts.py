@@ -0,0 +1,45 @@
+import os
+from typing import List
+
+QUERIES_DIR = os.path.join(os.path.dirname(__file__), "queries")
+
+
+def read_statements(name: str) -> List[str]:
+    """Read a file of db/queries as separate statements.
+
+    CREATE/DROP INDEX CONCURRENTLY can't run in a transaction or in a
+    multi-statement query, so such files are executed one statement at a
+    time in autocommit mode. ';' inside $$-quoted bodies (DO blocks) doesn't
+    end a statement; the files must not contain ';' inside other strings.
+
+    Args:
+        name (str): file name in db/queries
+
+    Returns:
+        List[str]: statements
+    """
+    with open(os.path.join(QUERIES_DIR, name)) as file:
+        parts = file.read().split("$$")
+    statements = [""]
+    for i, part in enumerate(parts):
+        if i % 2:
+            statements[-1] += f"$${part}$$"
+            continue
+        first, *rest = part.split(";")
+        statements[-1] += first
+        statements.extend(rest)
+    statements = [sql.strip() for sql in statements]
+    return [sql for sql in statements if sql]
+
+
+def read_script(name: str) -> str:
+    """Read a file of db/queries to execute as one multi-statement query.
+
+    Args:
+        name (str): file name in db/queries
+
+    Returns:
+        str: file contents
+    """
+    with open(os.path.join(QUERIES_DIR, name)) as file:
+        return file.read()
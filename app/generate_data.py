@@ -0,0 +1,368 @@
+"""Generate a synthetic university dataset for all tables of create_tables.sql.
+
+Scale 1 is roughly the production volume: 50k students, 5k courses, 2M
+grades and ten years of schedules. The dataset only depends on --seed and
+--scale: every chunk of rows has its own random generator and explicit IDs,
+so the number of parallel COPY jobs doesn't change the result. Schedules
+and exams never put two lessons in the same classroom, or two lessons of
+a course, at the same time.
+
+Usage: python generate_data.py [--scale F] [--seed N] [--jobs N] [--truncate]
+"""
+import argparse
+import csv
+import datetime
+import io
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Tuple
+import psycopg2
+from core.config import DATABASE_URL
+
+START_YEAR = 2014
+# Lessons and exams take 90 minutes.
+SLOTS = [datetime.time(8, 0), datetime.time(9, 40), datetime.time(11, 20),
+         datetime.time(13, 30), datetime.time(15, 10), datetime.time(16, 50)]
+FIRST_NAMES = ["Alexander", "Anna", "Boris", "Daria", "Dmitry", "Elena", "Ivan", "Irina", "Kirill",
+               "Maria", "Maxim", "Natalia", "Nikita", "Olga", "Pavel", "Sofia", "Timur", "Yulia"]
+LAST_NAMES = ["Smirnov", "Ivanov", "Kuznetsov", "Popov", "Vasiliev", "Petrov", "Sokolov", "Mikhailov",
+              "Novikov", "Fedorov", "Morozov", "Volkov", "Alekseev", "Lebedev", "Semenov", "Egorov"]
+SUBJECTS = ["Mathematics", "Physics", "Chemistry", "Biology", "History", "Economics", "Philosophy",
+            "Programming", "Databases", "Statistics", "Linguistics", "Law", "Sociology", "Geology"]
+
+
+@dataclass(frozen=True)
+class Sizes:
+    """Row counts of a dataset. IDs of every table run from 1 to its count."""
+    scale: float
+    years: int
+
+    def scaled(self, base: int) -> int:
+        return max(1, round(base * self.scale))
+
+    @property
+    def buildings(self) -> int:
+        return self.scaled(20)
+
+    @property
+    def classrooms(self) -> int:
+        return self.buildings * 40
+
+    @property
+    def semesters(self) -> int:
+        return self.years * 2
+
+    @property
+    def faculties(self) -> int:
+        return self.scaled(10)
+
+    @property
+    def departments(self) -> int:
+        return self.faculties * 5
+
+    @property
+    def teachers(self) -> int:
+        return self.scaled(2500)
+
+    @property
+    def courses(self) -> int:
+        return self.teachers * 2
+
+    @property
+    def groups(self) -> int:
+        return self.scaled(2000)
+
+    @property
+    def students(self) -> int:
+        return self.groups * 25
+
+    @property
+    def grades_per_student(self) -> int:
+        return min(40, self.courses)
+
+    @property
+    def lessons_per_day(self) -> int:
+        return min(self.scaled(600), self.classrooms * len(SLOTS))
+
+
+def _weekdays(start: datetime.date, end: datetime.date) -> List[datetime.date]:
+    days = (start + datetime.timedelta(days=n) for n in range((end - start).days + 1))
+    return [day for day in days if day.weekday() < 5]
+
+
+def term_days(year: int) -> List[datetime.date]:
+    """Teaching days of an academic year: Sep-Dec and Feb-May."""
+    return (_weekdays(datetime.date(year, 9, 1), datetime.date(year, 12, 28))
+            + _weekdays(datetime.date(year + 1, 2, 7), datetime.date(year + 1, 5, 31)))
+
+
+def session_days(year: int) -> List[datetime.date]:
+    """Exam days of an academic year; they don't overlap the teaching days."""
+    return (_weekdays(datetime.date(year + 1, 1, 9), datetime.date(year + 1, 1, 31))
+            + _weekdays(datetime.date(year + 1, 6, 3), datetime.date(year + 1, 6, 28)))
+
+
+def _rooms(rng: random.Random, sizes: Sizes, count: int) -> Iterator[Tuple[int, datetime.time]]:
+    """Distinct (classroom ID, time) pairs of one day."""
+    for pair in rng.sample(range(sizes.classrooms * len(SLOTS)), count):
+        yield pair // len(SLOTS) + 1, SLOTS[pair % len(SLOTS)]
+
+
+def _person(rng: random.Random) -> Tuple[str, str]:
+    return rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+
+# Row generators. Each takes a chunk of "units" [start, stop) and yields rows;
+# a unit is a row, except for grades (a student), schedules (a teaching day)
+# and exams (an academic year).
+
+def buildings(rng: random.Random, sizes: Sizes, start: int, stop: int) -> Iterator[tuple]:
+    for id in range(start + 1, stop + 1):
+        yield id, f"Building {id}", f"{rng.randint(1, 200)} University Street, block {id}"
+
+
+def semesters(rng: random.Random, sizes: Sizes, start: int, stop: int) -> Iterator[tuple]:
+    for id in range(start + 1, stop + 1):
+        yield id, START_YEAR + (id - 1) // 2, (id - 1) % 2 + 1
+
+
+def faculties(rng: random.Random, sizes: Sizes, start: int, stop: int) -> Iterator[tuple]:
+    for id in range(start + 1, stop + 1):
+        yield id, f"Faculty of {SUBJECTS[(id - 1) % len(SUBJECTS)]} {id}"
+
+
+def classrooms(rng: random.Random, sizes: Sizes, start: int, stop: int) -> Iterator[tuple]:
+    for id in range(start + 1, stop + 1):
+        yield id, 100 + id, rng.choice([20, 30, 30, 60, 120, 250]), (id - 1) % sizes.buildings + 1
+
+
+def departments(rng: random.Random, sizes: Sizes, start: int, stop: int) -> Iterator[tuple]:
+    for id in range(start + 1, stop + 1):
+        yield id, f"Department {id}", (id - 1) % sizes.faculties + 1
+
+
+def teachers(rng: random.Random, sizes: Sizes, start: int, stop: int) -> Iterator[tuple]:
+    for id in range(start + 1, stop + 1):
+        first_name, last_name = _person(rng)
+        yield id, first_name, last_name, f"teacher{id}@university.edu", rng.randint(1, sizes.faculties)
+
+
+def courses(rng: random.Random, sizes: Sizes, start: int, stop: int) -> Iterator[tuple]:
+    for id in range(start + 1, stop + 1):
+        yield id, f"{rng.choice(SUBJECTS)} {id}", (id - 1) % sizes.teachers + 1
+
+
+def course_programs(rng: random.Random, sizes: Sizes, start: int, stop: int) -> Iterator[tuple]:
+    for id in range(start + 1, stop + 1):
+        yield id, f"Program of course {id}: {rng.randint(12, 40)} lectures, {rng.randint(4, 20)} labs", id
+
+
+def groups(rng: random.Random, sizes: Sizes, start: int, stop: int) -> Iterator[tuple]:
+    for id in range(start + 1, stop + 1):
+        yield id, f"G-{id}", rng.randint(1, sizes.departments), rng.randint(1, sizes.courses)
+
+
+def study_plans(rng: random.Random, sizes: Sizes, start: int, stop: int) -> Iterator[tuple]:
+    for id in range(start + 1, stop + 1):
+        group_id = (id - 1) // 8 + 1
+        yield (id, f"Plan of group {group_id}", rng.randint(1, sizes.semesters),
+               rng.randint(1, sizes.courses), group_id)
+
+
+def students(rng: random.Random, sizes: Sizes, start: int, stop: int) -> Iterator[tuple]:
+    for id in range(start + 1, stop + 1):
+        first_name, last_name = _person(rng)
+        yield id, first_name, last_name, f"student{id}@university.edu", rng.randint(1, sizes.groups)
+
+
+def grades(rng: random.Random, sizes: Sizes, start: int, stop: int) -> Iterator[tuple]:
+    per_student = sizes.grades_per_student
+    for student in range(start, stop):
+        course_ids = rng.sample(range(1, sizes.courses + 1), per_student)
+        for n, course_id in enumerate(course_ids):
+            yield student * per_student + n + 1, rng.randint(40, 100), student + 1, course_id
+
+
+def schedules(rng: random.Random, sizes: Sizes, start: int, stop: int) -> Iterator[tuple]:
+    days = all_term_days(sizes)
+    per_day = sizes.lessons_per_day
+    for day in range(start, stop):
+        # a course has one lesson at a time; a slot holds fewer lessons than there are courses
+        busy = set()
+        for n, (classroom_id, slot) in enumerate(_rooms(rng, sizes, per_day)):
+            course_id = rng.randint(1, sizes.courses)
+            while (slot, course_id) in busy:
+                course_id = rng.randint(1, sizes.courses)
+            busy.add((slot, course_id))
+            yield day * per_day + n + 1, days[day], slot, course_id, classroom_id
+
+
+def exams(rng: random.Random, sizes: Sizes, start: int, stop: int) -> Iterator[tuple]:
+    for year in range(start, stop):
+        # one exam per course a year, spread evenly over the session days
+        course_ids = list(range(1, sizes.courses + 1))
+        rng.shuffle(course_ids)
+        days = session_days(START_YEAR + year)
+        per_day = math.ceil(len(course_ids) / len(days))
+        id = year * sizes.courses
+        for n, day in enumerate(days):
+            day_courses = course_ids[n * per_day:(n + 1) * per_day]
+            for course_id, (classroom_id, slot) in zip(day_courses, _rooms(rng, sizes, len(day_courses))):
+                id += 1
+                yield id, day, slot, course_id, classroom_id
+
+
+def assignments(rng: random.Random, sizes: Sizes, start: int, stop: int) -> Iterator[tuple]:
+    for id in range(start + 1, stop + 1):
+        assigned = datetime.date(START_YEAR, 9, 1) + datetime.timedelta(
+            days=rng.randrange(sizes.years * 365))
+        yield (id, f"Assignment {id}", assigned, assigned + datetime.timedelta(days=rng.randint(7, 30)),
+               (id - 1) // 5 + 1)
+
+
+def all_term_days(sizes: Sizes) -> List[datetime.date]:
+    return [day for year in range(sizes.years) for day in term_days(START_YEAR + year)]
+
+
+@dataclass(frozen=True)
+class Table:
+    name: str
+    columns: Tuple[str, ...]
+    rows: Callable[[random.Random, Sizes, int, int], Iterator[tuple]]
+    units: Callable[[Sizes], int]
+    chunk: int = 50000
+
+
+# Tables of a level only reference tables of the previous levels, so they
+# are loaded in parallel.
+LEVELS: List[List[Table]] = [
+    [
+        Table("Buildings", ("id", "name", "address"), buildings, lambda s: s.buildings),
+        Table("Semesters", ("id", "year", "semester"), semesters, lambda s: s.semesters),
+        Table("Faculties", ("id", "name"), faculties, lambda s: s.faculties),
+    ],
+    [
+        Table("Classrooms", ("id", "number", "capacity", "buildingId"), classrooms, lambda s: s.classrooms),
+        Table("Departments", ("id", "name", "facultyId"), departments, lambda s: s.departments),
+        Table("Teachers", ("id", "firstName", "lastName", "email", "facultyId"), teachers,
+              lambda s: s.teachers),
+    ],
+    [
+        Table("Courses", ("id", "name", "teacherId"), courses, lambda s: s.courses),
+    ],
+    [
+        Table("CoursePrograms", ("id", "description", "courseId"), course_programs, lambda s: s.courses),
+        Table("Groups", ("id", "name", "departmentId", "courseId"), groups, lambda s: s.groups),
+        Table("Schedules", ("id", "date", "time", "courseId", "classroomId"), schedules,
+              lambda s: len(all_term_days(s)), chunk=50),
+        Table("Exams", ("id", "date", "time", "courseId", "classroomId"), exams,
+              lambda s: s.years, chunk=1),
+        Table("Assignments", ("id", "description", "dateAssigned", "dueDate", "courseId"), assignments,
+              lambda s: s.courses * 5),
+    ],
+    [
+        Table("StudyPlans", ("id", "description", "semesterId", "courseId", "groupId"), study_plans,
+              lambda s: s.groups * 8),
+        Table("Students", ("id", "firstName", "lastName", "email", "groupId"), students,
+              lambda s: s.students),
+    ],
+    [
+        Table("Grades", ("id", "grade", "studentId", "courseId"), grades, lambda s: s.students, chunk=2500),
+    ],
+]
+TABLES: Dict[str, Table] = {table.name: table for level in LEVELS for table in level}
+# Filled by triggers while the tables above are loaded
+DERIVED_TABLES = ("CourseRosters", "StudentGradeSummaries", "Bookings")
+
+
+def generate_chunk(table: Table, sizes: Sizes, seed: int, start: int) -> List[tuple]:
+    """Generate the rows of one chunk of a table.
+
+    Args:
+        table (Table): table
+        sizes (Sizes): dataset sizes
+        seed (int): dataset seed
+        start (int): first unit of the chunk, a multiple of table.chunk
+
+    Returns:
+        List[tuple]: rows in the order of table.columns
+    """
+    rng = random.Random(f"{seed}/{table.name}/{start}")
+    stop = min(start + table.chunk, table.units(sizes))
+    return list(table.rows(rng, sizes, start, stop))
+
+
+def copy_chunk(name: str, sizes: Sizes, seed: int, start: int) -> int:
+    """Generate a chunk and load it with COPY on its own connection.
+
+    Returns:
+        int: number of rows loaded
+    """
+    table = TABLES[name]
+    buffer = io.StringIO()
+    rows = generate_chunk(table, sizes, seed, start)
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    columns = ", ".join(f'"{column}"' for column in table.columns)
+    with psycopg2.connect(DATABASE_URL) as connection, connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY "{name}" ({columns}) FROM STDIN WITH (FORMAT csv)', buffer)
+    connection.close()
+    return len(rows)
+
+
+def prepare(truncate: bool) -> None:
+    tables = ", ".join(f'"{name}"' for name in [*TABLES, *DERIVED_TABLES])
+    with psycopg2.connect(DATABASE_URL) as connection, connection.cursor() as cursor:
+        if truncate:
+            cursor.execute(f"TRUNCATE {tables} RESTART IDENTITY CASCADE")
+        else:
+            cursor.execute(" UNION ALL ".join(f'SELECT 1 FROM "{name}"' for name in TABLES) + " LIMIT 1")
+            if cursor.fetchone() is not None:
+                raise SystemExit("The tables are not empty; pass --truncate to replace the data.")
+    connection.close()
+
+
+def finish() -> None:
+    """Move the ID sequences past the generated IDs and refresh statistics."""
+    connection = psycopg2.connect(DATABASE_URL)
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        for name in TABLES:
+            cursor.execute(f"SELECT setval(pg_get_serial_sequence('\"{name}\"', 'id'), "
+                           f"coalesce(max(id), 0) + 1, false) FROM \"{name}\"")
+            cursor.execute(f'ANALYZE "{name}"')
+    connection.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, default=1.0, help='scale factor, 1 is the production volume')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--years', type=int, default=10, help='academic years of schedules and exams')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='parallel COPY jobs')
+    parser.add_argument('--truncate', action='store_true', help='delete the existing data first')
+    args = parser.parse_args()
+
+    sizes = Sizes(scale=args.scale, years=args.years)
+    prepare(args.truncate)
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        for level in LEVELS:
+            level_started = time.perf_counter()
+            futures = {table.name: [pool.submit(copy_chunk, table.name, sizes, args.seed, start)
+                                    for start in range(0, table.units(sizes), table.chunk)]
+                       for table in level}
+            for name, chunks in futures.items():
+                rows = sum(future.result() for future in chunks)
+                print(f"{name:15} {rows:>10} rows")
+            print(f"{'':15} {time.perf_counter() - level_started:>10.1f} s")
+    finish()
+    print(f"Done in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Production server: gunicorn supervising uvicorn workers.
+
+Usage: gunicorn -c gunicorn.conf.py main:app
+"""
+import glob
+import multiprocessing
+import os
+
+bind = "0.0.0.0:8000"
+workers = int(os.getenv("WEB_CONCURRENCY") or multiprocessing.cpu_count())
+if workers > 1 and not os.getenv("CACHE_BACKEND"):
+    # a memory cache is per worker, and a write evicts entries only in the
+    # worker that made it; must be set before core.config is imported
+    os.environ["CACHE_BACKEND"] = "none"
+if not os.getenv("EXAM_ALLOCATION_WORKERS"):
+    # every worker starts a solver pool of its own; together they get about
+    # one process per CPU
+    os.environ["EXAM_ALLOCATION_WORKERS"] = str(max(1, multiprocessing.cpu_count() // workers))
+
+from core.config import CACHE_BACKEND, METRICS_ENABLED  # noqa: E402
+
+if CACHE_BACKEND == "memory" and workers > 1:
+    raise RuntimeError("CACHE_BACKEND=memory serves stale entries with several workers; "
+                       "use CACHE_BACKEND=redis or WEB_CONCURRENCY=1")
+worker_class = "core.server.UvicornWorker"
+# seconds in-flight requests get to finish on SIGTERM; DB_DRAIN_TIMEOUT
+# should fit into it
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("KEEPALIVE", 5))
+accesslog = "-"
+
+if METRICS_ENABLED and workers > 1:
+    # must be set before the workers import prometheus_client
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus")
+
+
+def on_starting(server) -> None:
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        # files of a previous run would be summed into the new metrics
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, "*.db")):
+            os.remove(path)
+
+
+def child_exit(server, worker) -> None:
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
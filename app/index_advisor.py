@@ -0,0 +1,109 @@
+"""Report foreign keys without a supporting index and tables that are read
+mostly by sequential scans.
+
+Usage: python index_advisor.py [--min-rows N] [--json]
+"""
+import argparse
+import json
+from typing import Dict, List
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
+from core.config import DATABASE_URL
+
+UNINDEXED_FOREIGN_KEYS_SQL = text("""
+    SELECT
+        t.relname AS "table",
+        c.conname AS "constraint",
+        array_agg(a.attname::text ORDER BY k.ord) AS "columns"
+    FROM pg_constraint c
+    JOIN pg_class t ON t.oid = c.conrelid
+    CROSS JOIN LATERAL unnest(c.conkey) WITH ORDINALITY AS k(attnum, ord)
+    JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+    WHERE c.contype = 'f'
+      AND c.connamespace = 'public'::regnamespace
+      AND NOT EXISTS (
+          SELECT 1
+          FROM pg_index i
+          WHERE i.indrelid = c.conrelid
+            AND (string_to_array(i.indkey::text, ' ')::int2[])[1:array_length(c.conkey, 1)]
+                @> c.conkey
+      )
+    GROUP BY t.relname, c.conname
+    ORDER BY 1, 2
+""")
+
+SEQ_SCAN_TABLES_SQL = text("""
+    SELECT
+        relname AS "table",
+        seq_scan AS "seqScan",
+        seq_tup_read AS "seqTupRead",
+        coalesce(idx_scan, 0) AS "idxScan",
+        n_live_tup AS "liveRows"
+    FROM pg_stat_user_tables
+    WHERE seq_scan > coalesce(idx_scan, 0)
+      AND n_live_tup >= :min_rows
+    ORDER BY seq_tup_read DESC
+""")
+
+
+def unindexed_foreign_keys(connection: Connection) -> List[Dict]:
+    """Find foreign keys whose columns aren't the leading columns of an index.
+
+    Args:
+        connection (Connection): DB connection
+
+    Returns:
+        List[Dict]: table, constraint and columns of every such foreign key
+    """
+    return [dict(row._mapping) for row in connection.execute(UNINDEXED_FOREIGN_KEYS_SQL)]
+
+
+def seq_scan_tables(connection: Connection, min_rows: int = 1000) -> List[Dict]:
+    """Find tables that are scanned sequentially more often than by index.
+
+    Args:
+        connection (Connection): DB connection
+        min_rows (int, optional): Skip tables smaller than this. Defaults to 1000.
+
+    Returns:
+        List[Dict]: scan statistics of the tables, most rows read first
+    """
+    result = connection.execute(SEQ_SCAN_TABLES_SQL, {"min_rows": min_rows})
+    return [dict(row._mapping) for row in result]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--min-rows', type=int, default=1000,
+                        help='ignore tables with fewer live rows')
+    parser.add_argument('--json', action='store_true', help='print a JSON report')
+    args = parser.parse_args()
+
+    engine = create_engine(DATABASE_URL)
+    with engine.connect() as connection:
+        report = {
+            "unindexedForeignKeys": unindexed_foreign_keys(connection),
+            "seqScanTables": seq_scan_tables(connection, args.min_rows),
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("Foreign keys without an index:")
+    for fk in report["unindexedForeignKeys"]:
+        print(f'  {fk["table"]} ({", ".join(fk["columns"])}) -- {fk["constraint"]}')
+    if not report["unindexedForeignKeys"]:
+        print("  none")
+
+    print(f"Tables read mostly by sequential scans (>= {args.min_rows} rows):")
+    for table in report["seqScanTables"]:
+        print(f'  {table["table"]}: seq_scan={table["seqScan"]} '
+              f'seq_tup_read={table["seqTupRead"]} idx_scan={table["idxScan"]} '
+              f'rows={table["liveRows"]}')
+    if not report["seqScanTables"]:
+        print("  none")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from api.v1.router import router as api_router
+from api.internal.router import router as internal_router
 from api.v1.groups.model import GroupDB
 from api.v1.students.model import StudentDB
 from api.v1.grades.model import GradeDB
+from api.v1.exams import allocation
+from core.config import METRICS_ENABLED, SQL_TRACE
+from core import database
+from core.database import engine, async_engine
+from core.metrics import setup_metrics
+from core.replicas import WriteLSNMiddleware, replicas
+from core.sql_trace import setup_sql_trace
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with database.lifespan(app), replicas.lifespan(app), allocation.lifespan(app):
+        yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(api_router, prefix='/api/v1')
+app.include_router(internal_router, prefix='/internal', include_in_schema=False)
+
+if replicas.replicas:
+    app.add_middleware(WriteLSNMiddleware)
+
+if METRICS_ENABLED:
+    setup_metrics(app, {"sync": engine, "async": async_engine.sync_engine})
+
+if SQL_TRACE:
+    setup_sql_trace(app, [engine, async_engine.sync_engine])
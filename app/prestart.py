@@ -0,0 +1,175 @@
+"""Prepare the DB before the app starts: wait for it and migrate it if needed.
+
+The DB is probed with exponential backoff. Alembic runs only when the
+schema is behind head, under an advisory lock, so of many replicas
+starting at once one migrates and the others wait and skip.
+
+Usage: python prestart.py [--timeout S] [--no-migrate]
+"""
+import argparse
+import ast
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Set
+import psycopg2
+from core.config import DATABASE_URL
+
+ALEMBIC_INI = "alembic.ini"
+VERSIONS_DIR = os.path.join(os.path.dirname(__file__), "db", "migrations", "versions")
+# pg_advisory_lock key of the migrations
+MIGRATION_LOCK_ID = 4_711_017
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Print how long a startup phase took."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        print(f"startup: {name} took {time.perf_counter() - start:.3f} s", flush=True)
+
+
+def wait_for_db(timeout: float, first_delay: float = 0.05, max_delay: float = 2.0):
+    """Connect to the DB, retrying with exponential backoff.
+
+    Args:
+        timeout (float): seconds to give up after
+        first_delay (float, optional): first pause. Defaults to 0.05.
+        max_delay (float, optional): longest pause. Defaults to 2.0.
+
+    Returns:
+        connection: psycopg2 connection in autocommit mode
+    """
+    deadline = time.monotonic() + timeout
+    delay = first_delay
+    while True:
+        try:
+            conn = psycopg2.connect(DATABASE_URL, connect_timeout=max(1, int(max_delay)))
+            conn.autocommit = True
+            return conn
+        except psycopg2.OperationalError:
+            if time.monotonic() + delay > deadline:
+                raise
+            # jitter keeps restarting replicas from probing in lockstep
+            time.sleep(random.uniform(delay / 2, delay))
+            delay = min(delay * 2, max_delay)
+
+
+def current_revision(conn) -> Optional[str]:
+    """Get the revision the DB is migrated to; None for a new DB."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('alembic_version') IS NOT NULL")
+        if not cursor.fetchone()[0]:
+            return None
+        cursor.execute("SELECT version_num FROM alembic_version")
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+
+def head_revisions() -> Set[str]:
+    """Get the head revisions of the migration scripts.
+
+    The revision IDs are read from the scripts with ast: importing alembic
+    and the scripts would take most of a restart that has nothing to do.
+
+    Returns:
+        Set[str]: revisions no other script builds on
+    """
+    revisions: Set[str] = set()
+    parents: Set[str] = set()
+    for name in os.listdir(VERSIONS_DIR):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(VERSIONS_DIR, name)) as file:
+            module = ast.parse(file.read())
+        for node in module.body:
+            if not (isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name)):
+                continue
+            if node.targets[0].id == "revision":
+                revisions.add(ast.literal_eval(node.value))
+            elif node.targets[0].id == "down_revision":
+                value = ast.literal_eval(node.value)
+                if value is not None:
+                    parents.update((value,) if isinstance(value, str) else value)
+    return revisions - parents
+
+
+def lock_migrations(conn, max_delay: float = 1.0) -> None:
+    """Take the migration lock, polling for it.
+
+    A session blocked in pg_advisory_lock() runs a statement the whole time,
+    and CREATE INDEX CONCURRENTLY of the replica that migrates would wait
+    for it to finish: a deadlock the server doesn't detect.
+
+    Args:
+        conn: psycopg2 connection in autocommit mode
+        max_delay (float, optional): longest pause between tries. Defaults to 1.0.
+    """
+    delay = 0.05
+    while True:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+            if cursor.fetchone()[0]:
+                return
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+
+def migrate(conn) -> bool:
+    """Upgrade the DB to head unless it is there already.
+
+    Args:
+        conn: psycopg2 connection in autocommit mode
+
+    Returns:
+        bool: whether migrations were run
+    """
+    heads = head_revisions()
+    # with several heads leave the decision to alembic
+    at_head = lambda: len(heads) == 1 and current_revision(conn) in heads  # noqa: E731
+    if at_head():
+        return False
+
+    lock_migrations(conn)
+    try:
+        # another replica may have migrated while we waited for the lock
+        if at_head():
+            return False
+        from alembic import command
+        from alembic.config import Config
+
+        command.upgrade(Config(ALEMBIC_INI), "head")
+        return True
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--timeout', type=float, default=60, help='seconds to wait for the DB')
+    parser.add_argument('--no-migrate', dest='migrate', action='store_false',
+                        help='only wait for the DB')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with phase("wait for db"):
+        try:
+            conn = wait_for_db(args.timeout)
+        except psycopg2.OperationalError as error:
+            sys.exit(f"Couldn't connect to the DB in {args.timeout:.0f} s: {error}")
+    try:
+        if args.migrate:
+            with phase("migrations"):
+                print("startup: migrated to head" if migrate(conn) else "startup: schema is at head")
+    finally:
+        conn.close()
+    print(f"startup: DB ready in {time.perf_counter() - start:.3f} s", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Test databases cloned from template databases.
+
+Building the schema takes most of the time of a test run, so it is built
+once into a template database that is kept between runs and rebuilt only
+when the SQL files change. Every test session (every pytest-xdist worker)
+gets its own copy made with CREATE DATABASE ... TEMPLATE.
+"""
+import hashlib
+import os
+from contextlib import contextmanager
+from typing import Iterator
+import psycopg2
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+from core.config import DB_HOST, DB_USER, DB_PASS
+from db.scripts import QUERIES_DIR, read_script, read_statements
+
+MAINTENANCE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:5432/postgres"
+# Schema migrations that have to run statement by statement in autocommit mode
+CONCURRENT_SCHEMA_FILES = ("create_indexes.sql", "create_grades_unique.sql",
+                           "create_unique_constraints.sql")
+# Later migrations that run in one transaction each, before the seed data
+DERIVED_SCHEMA_FILES = ("create_course_rosters.sql", "create_grade_summaries.sql", "create_bookings.sql",
+                        "create_timetable.sql")
+SEED_FILE = "fill_db.sql"
+# Serializes template builds and clones between xdist workers
+TEMPLATE_LOCK_ID = 4_711_016
+
+
+def database_url(name: str, driver: str = "postgresql") -> str:
+    return f"{driver}://{DB_USER}:{DB_PASS}@{DB_HOST}:5432/{name}"
+
+
+def worker_database(name: str) -> str:
+    """Get the name of the copy of a test database for this xdist worker.
+
+    Args:
+        name (str): base name
+
+    Returns:
+        str: e.g. test_api_db_gw0, or test_api_db_main without xdist
+    """
+    return f"{name}_{os.getenv('PYTEST_XDIST_WORKER', 'main')}"
+
+
+def apply_migrations(url: str, seed: bool) -> None:
+    """Create tables in a test DB.
+
+    Args:
+        url (str): DB URL
+        seed (bool): also fill the tables with fill_db.sql
+    """
+    engine = create_engine(url, poolclass=NullPool)
+    with engine.begin() as connection:
+        connection.execute(text(read_script("create_tables.sql")))
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for name in CONCURRENT_SCHEMA_FILES:
+            for sql in read_statements(name):
+                connection.execute(text(sql))
+    with engine.begin() as connection:
+        for name in DERIVED_SCHEMA_FILES:
+            connection.execute(text(read_script(name)))
+    if seed:
+        with engine.begin() as connection:
+            connection.execute(text(read_script(SEED_FILE)))
+
+
+def schema_fingerprint(seed: bool) -> str:
+    """Hash the SQL files a template is built from."""
+    files = (("create_tables.sql",) + CONCURRENT_SCHEMA_FILES + DERIVED_SCHEMA_FILES
+             + ((SEED_FILE,) if seed else ()))
+    digest = hashlib.sha1()
+    for name in files:
+        with open(os.path.join(QUERIES_DIR, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def ensure_template(cursor, seed: bool) -> str:
+    """Build the template DB unless an up-to-date one exists.
+
+    The fingerprint of the SQL files is kept as the comment of the DB.
+
+    Args:
+        cursor: autocommit cursor of the maintenance DB
+        seed (bool): template with the fill_db.sql data
+
+    Returns:
+        str: template name
+    """
+    template = "test_template_seeded" if seed else "test_template"
+    fingerprint = schema_fingerprint(seed)
+    cursor.execute("SELECT shobj_description(oid, 'pg_database') FROM pg_database WHERE datname = %s",
+                   (template,))
+    row = cursor.fetchone()
+    if row is not None and row[0] == fingerprint:
+        return template
+
+    cursor.execute(f"DROP DATABASE IF EXISTS {template} WITH (FORCE)")
+    cursor.execute(f"CREATE DATABASE {template}")
+    apply_migrations(database_url(template), seed)
+    # the comment goes last: a half-built template is rebuilt next time
+    cursor.execute(f"COMMENT ON DATABASE {template} IS %s", (fingerprint,))
+    return template
+
+
+@contextmanager
+def cloned_database(name: str, seed: bool) -> Iterator[str]:
+    """Create a test DB as a copy of the template and drop it afterwards.
+
+    Args:
+        name (str): DB name, see worker_database()
+        seed (bool): copy the template with the fill_db.sql data
+
+    Yields:
+        str: DB name
+    """
+    conn = psycopg2.connect(MAINTENANCE_URL)
+    conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT pg_advisory_lock(%s)", (TEMPLATE_LOCK_ID,))
+        try:
+            template = ensure_template(cursor, seed)
+            cursor.execute(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)")
+            cursor.execute(f"CREATE DATABASE {name} TEMPLATE {template}")
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (TEMPLATE_LOCK_ID,))
+
+        yield name
+
+        cursor.execute(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)")
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,68 @@
+import asyncio
+import random
+from api.v1.exams.allocation import SLOT_MINUTES, process_pool, shutdown_pool, solve, solve_session
+
+
+def test_local_search_moves_blocking_exam() -> None:
+    """An exam moves the exam that blocks a classroom elsewhere; the rest get a reason."""
+    rooms = [(1, 100), (2, 200)]
+    # exam 1 takes the smaller classroom; exam 2 overlaps it and a lesson in
+    # the larger one, which exam 1 doesn't
+    exams = [(1, 0, 40, (1,)), (2, 30, 90, (2,))]
+    assigned, unassigned = solve(exams, rooms, {2: [100]})
+    assert assigned == {1: 2, 2: 1}
+    assert unassigned == {}
+
+    exams = [(1, 0, 40, (1,)), (2, 0, 150, (2,)), (3, 10, 300, (3,)), (4, 30, 10, (1,)), (5, 40, 90, (5,))]
+    assigned, unassigned = solve(exams, rooms, {})
+    assert assigned == {1: 1, 2: 2}
+    assert unassigned == {3: "capacity", 4: "group", 5: "classroom"}
+
+
+def test_unplaced_exam_keeps_groups_free() -> None:
+    """An exam that gets no classroom doesn't take the time of its groups."""
+    rooms = [(1, 100), (2, 200)]
+    # exam 1 only fits the larger classroom, which has a lesson; exam 2 of
+    # the same group overlaps it and fits the smaller one
+    exams = [(1, 0, 150, (1,)), (2, 30, 40, (1,))]
+    assigned, unassigned = solve(exams, rooms, {2: [0]})
+    assert assigned == {2: 1}
+    assert unassigned == {1: "group"}
+
+    assigned, unassigned = solve([(1, 0, 150, (1,)), (2, 30, 40, (2,))], rooms, {2: [0]})
+    assert assigned == {2: 1}
+    assert unassigned == {1: "classroom"}
+
+
+def test_session_plan_is_valid_and_parallel_matches() -> None:
+    """No classroom or group is double-booked and the pool gives the same plan."""
+    rng = random.Random(7)
+    rooms = sorted(((n, rng.choice((20, 40, 60, 120))) for n in range(1, 41)), key=lambda room: (room[1], room[0]))
+    exams = [(n, day * 1440 + rng.choice((480, 540, 600, 720, 840)), rng.randint(5, 130),
+              (rng.randint(1, 300),))
+             for n, day in enumerate((rng.randrange(14) for _ in range(2000)), 1)]
+    lessons = {room_id: sorted(rng.sample(range(0, 14 * 1440, 30), 20)) for room_id, _ in rooms[:10]}
+
+    plan = asyncio.run(solve_session(exams, rooms, lessons, workers=1))
+    try:
+        assert asyncio.run(solve_session(exams, rooms, lessons, workers=3, parallel_min=100)) == plan
+        # requests share the pool of the process
+        pool = process_pool()
+        assert asyncio.run(solve_session(exams, rooms, lessons, workers=3, parallel_min=100)) == plan
+        assert process_pool() is pool
+    finally:
+        shutdown_pool()
+    assigned, unassigned = plan
+    assert len(assigned) + len(unassigned) == len(exams)
+    capacity = dict(rooms)
+    booked = {}
+    for exam_id, start, size, groups in exams:
+        if exam_id not in assigned:
+            continue
+        room_id = assigned[exam_id]
+        assert size <= capacity[room_id]
+        keys = [("room", room_id)] + [("group", group) for group in groups]
+        for key in keys:
+            assert all(abs(start - other) >= SLOT_MINUTES for other in booked.get(key, ()))
+            booked.setdefault(key, []).append(start)
+        assert all(abs(start - lesson) >= SLOT_MINUTES for lesson in lessons.get(room_id, ()))
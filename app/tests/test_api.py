@@ -1,103 +1,139 @@
-import psycopg2
+import asyncio
+import csv
+import json
+import logging
+import httpx
 import pytest
-from typing import Generator
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, Session
-from core.config import DB_HOST, DB_USER, DB_PASS
+from typing import Generator, List
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from starlette.requests import Request
+from starlette.types import ASGIApp
 from main import app
-from core.database import get_db
+from core import database
+from core.config import DB_POOL_SIZE, DB_POOL_WARMUP
+from core.database import AsyncWriteSession, get_async_db
+from core.cache import get_cache, MemoryCache
+from core.replicas import LSN_HEADER, Replica, ReplicaRouter, WriteLSNMiddleware, get_read_db, parse_lsn
+from core.metrics import UNMATCHED, instrument_engine, registry
+from core import sql_trace
+from core.sql_trace import QueryTrace, SQLTraceMiddleware, count_queries
 from api.v1.teachers.model import TeacherDB
 from api.v1.students.model import StudentDB
+from api.v1.grades import router as grades_router
 from api.v1.grades.model import GradeDB
-from api.v1.courses.model import CourseDB
+from api.v1.courses.model import CourseDB, CourseRosterDB
 from api.v1.groups.model import GroupDB
+from tests.databases import cloned_database, database_url, worker_database
 
 
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:5432/postgres"
-TEST_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:5432/test_api_db"
+TEST_DATABASE = worker_database("test_api_db")
+# In fallback mode the asyncpg dialect also works outside of the event loop,
+# so the tests and the app share one connection and one transaction per test.
+engine = create_engine(
+    database_url(TEST_DATABASE, "postgresql+asyncpg") + "?async_fallback=true", poolclass=NullPool)
+async_engine = AsyncEngine(engine)
+instrument_engine(engine, "async")
+# Every statement of a traced request counts as slow, to exercise the log.
+sql_trace.instrument_engine(engine, slow_query_ms=0)
+# Statements of the savepoints that keep the requests inside the test transaction
+SAVEPOINT_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
 
-engine = create_engine(TEST_DATABASE_URL)
-TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+loop = asyncio.new_event_loop()
 
 
-def get_test_db() -> Generator:
-    try:
-        db = TestSessionLocal()
-        yield db
-    finally:
-        db.close()
+class ASGIClient:
+    """Synchronous client that serves requests on the event loop of the tests.
 
+    TestClient runs the app on a loop of its own thread, and an asyncpg
+    connection can only be used on the loop it was opened on.
+    """
 
-# override the get_db function for the app
-app.dependency_overrides[get_db] = get_test_db
-client = TestClient(app)
+    def __init__(self, app: ASGIApp) -> None:
+        self.client = httpx.AsyncClient(app=app, base_url="http://testserver", follow_redirects=True)
 
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        return loop.run_until_complete(self.client.request(method, url, **kwargs))
 
-def apply_migrations(database_url: str) -> None:
-    """Create tables in the test DB.
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("DELETE", url, **kwargs)
 
-    Args:
-        database_url (str): Test base URL
-    """
-    engine = create_engine(database_url)
-    with open('db/queries/create_tables.sql') as f:
-        with engine.begin() as connection:
-            connection.execute(text(f.read()))
-    with open('db/queries/fill_db.sql') as f:
-        with engine.begin() as connection:
-            connection.execute(text(f.read()))
+
+test_cache = MemoryCache()
+
+app.dependency_overrides[get_cache] = lambda: test_cache
+client = ASGIClient(app)
+trace_client = ASGIClient(SQLTraceMiddleware(app, repeated_threshold=2))
 
 
 @pytest.fixture(scope="session", autouse=True)
 def create_db() -> Generator:
     """The function creates and deletes a test data base."""
-    conn = psycopg2.connect(DATABASE_URL)
-    conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
-    cursor = conn.cursor()
-
-    cursor.execute("DROP DATABASE IF EXISTS test_api_db;")
-    cursor.execute("CREATE DATABASE test_api_db;")
-    cursor.close()
-    conn.close()
-
-    apply_migrations(TEST_DATABASE_URL)
-
-    yield
-
-    conn = psycopg2.connect(DATABASE_URL)
-    conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
-    cursor = conn.cursor()
-    cursor.execute(f"""
-        SELECT 
-            pg_terminate_backend(pg_stat_activity.pid)
-        FROM 
-            pg_stat_activity
-        WHERE 
-            pg_stat_activity.datname = 'test_api_db'
-            AND pid <> pg_backend_pid();
-    """)
-    cursor.execute("DROP DATABASE IF EXISTS test_api_db;")
-    cursor.close()
-    conn.close()
-
-
-@pytest.fixture(scope="session")
-def db() -> Generator:
-    """The function makes session for tests."""
-    engine = create_engine(TEST_DATABASE_URL)
+    with cloned_database(TEST_DATABASE, seed=True):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def connection() -> Generator:
+    """Run the test and its requests in one transaction that is rolled back.
+
+    Sessions join the transaction through savepoints, so commits and
+    rollbacks of the app work as usual.
+    """
+    # set as the current loop for the fallback mode of the driver
+    asyncio.set_event_loop(loop)
     connection = engine.connect()
     transaction = connection.begin()
-    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    async_connection = AsyncConnection(async_engine, connection)
+
+    async def get_test_async_db(request: Request):
+        async with AsyncWriteSession(async_connection, autoflush=False, expire_on_commit=False,
+                                     join_transaction_mode="create_savepoint", info={"request": request}) as db:
+            yield db
 
+    app.dependency_overrides[get_async_db] = get_test_async_db
+    app.dependency_overrides[get_read_db] = get_test_async_db
     try:
-        yield session
+        yield connection
     finally:
-        session.close()
+        del app.dependency_overrides[get_async_db]
+        del app.dependency_overrides[get_read_db]
         transaction.rollback()
         connection.close()
 
 
+@pytest.fixture(autouse=True)
+def clear_cache() -> None:
+    """Tests change the DB behind the API's back, so every test starts with an empty cache."""
+    loop.run_until_complete(test_cache.clear())
+
+
+@pytest.fixture
+def db(connection) -> Generator:
+    """The function makes session for tests."""
+    session = Session(bind=connection, autoflush=False, join_transaction_mode="create_savepoint")
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def app_statements(statements: List[str]) -> List[str]:
+    return [sql for sql in statements if not sql.startswith(SAVEPOINT_STATEMENTS)]
+
+
 @pytest.fixture
 def new_student():
     return {
@@ -229,6 +265,14 @@ def test_update_student(db, new_student) -> None:
     assert db_student is not None
     assert db_student.email == 'newemail@example.com'
 
+    # the student keeps their own email
+    new_student['lastName'] = 'Renamed'
+    response = client.put(
+        f"api/v1/students/{existing_student.id}", json=new_student)
+    assert response.status_code == 200
+    assert response.json()['lastName'] == 'Renamed'
+    assert response.json()['email'] == 'newemail@example.com'
+
     # test update with exist email
     exist_student2 = StudentDB(firstName="Test2", lastName="Student2",
                                email="test.student2@example.com", groupId=1)
@@ -239,6 +283,14 @@ def test_update_student(db, new_student) -> None:
     response = client.put(
         f"api/v1/students/{existing_student.id}", json=new_student)
     assert response.status_code == 409
+    assert response.json()['detail'] == "Student with this email already exists"
+
+    # test update with a group that doesn't exist
+    new_student['email'] = 'newemail@example.com'
+    new_student['groupId'] = 999
+    response = client.put(
+        f"api/v1/students/{existing_student.id}", json=new_student)
+    assert response.status_code == 400
 
     # test update not available student
     response = client.put("api/v1/students/99", json=new_student)
@@ -371,6 +423,45 @@ def test_get_students_on_course(db) -> None:
     db.commit()
 
 
+def test_course_roster_follows_writes(db) -> None:
+    """The roster table follows student and group changes and is paginated."""
+    course = CourseDB(name="Roster course", teacherId=1)
+    other_course = CourseDB(name="Other roster course", teacherId=1)
+    db.add_all([course, other_course])
+    db.commit()
+    group = GroupDB(name="Roster group", departmentId=1, courseId=course.id)
+    db.add(group)
+    db.commit()
+    students = [StudentDB(firstName=f"Roster{i}", lastName="Student", groupId=group.id,
+                          email=f"roster{i}.student@example.com") for i in range(3)]
+    db.add_all(students)
+    db.commit()
+    ids = sorted(student.id for student in students)
+
+    response = client.get(f"api/v1/courses/{course.id}/students", params={"limit": 2})
+    assert [student["id"] for student in response.json()] == ids[:2]
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"api/v1/courses/{course.id}/students", params={"limit": 2, "cursor": cursor})
+    assert [student["id"] for student in response.json()] == ids[2:]
+    assert "X-Next-Cursor" not in response.headers
+
+    def roster(course_id):
+        return db.query(CourseRosterDB).filter_by(courseId=course_id).order_by(CourseRosterDB.id).all()
+
+    db.query(StudentDB).filter_by(id=ids[0]).update({"lastName": "Renamed"})
+    db.commit()
+    assert roster(course.id)[0].lastName == "Renamed"
+
+    group.courseId = other_course.id
+    db.commit()
+    assert roster(course.id) == []
+    assert [row.id for row in roster(other_course.id)] == ids
+
+    db.query(StudentDB).filter_by(id=ids[0]).delete()
+    db.commit()
+    assert [row.id for row in roster(other_course.id)] == ids[1:]
+
+
 def test_create_grade(db) -> None:
     """Test creating a new grade."""
     course = CourseDB(name="Test course", teacherId=1)
@@ -445,6 +536,611 @@ def test_update_grade(db) -> None:
     assert db_grade.studentId == 2
     assert db_grade.courseId == 2
 
+    # test moving the grade onto a student and course that already have one
+    other_grade = GradeDB(grade=50, studentId=2, courseId=3)
+    db.add(other_grade)
+    db.commit()
+    response = client.put(f"api/v1/grades/{existing_grade.id}", json=dict(
+        grade=21, studentId=2, courseId=3))
+    assert response.status_code == 409
+    db.delete(other_grade)
+    db.commit()
+
     # test update not available grade
     response = client.put("api/v1/grades/9999", json=new_grade)
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+
+def test_get_pool_stats() -> None:
+    """Test the internal pool statistics endpoint."""
+    response = client.get("internal/pool")
+    assert response.status_code == 200
+    data = response.json()
+
+    for name in ("sync", "async"):
+        stats = data[name]
+        assert "status" in stats
+        assert stats["checkedOut"] >= 0
+        assert stats["overflow"] <= 0
+        assert stats["waitSeconds"]["buckets"]["+Inf"] == stats["waitSeconds"]["count"]
+
+
+def test_lifespan() -> None:
+    """Workers open their pool on startup and close it on shutdown."""
+    async def serve() -> None:
+        async with database.lifespan(app):
+            assert database.async_engine.pool.checkedin() == min(DB_POOL_WARMUP, DB_POOL_SIZE)
+        assert database.async_engine.pool.checkedin() == 0
+
+    loop.run_until_complete(serve())
+
+
+def test_get_teachers_pagination(db) -> None:
+    """Test walking the teachers list page by page."""
+    response = client.get("api/v1/teachers/", params={"limit": 1})
+    assert response.status_code == 200
+    teachers = response.json()
+    assert len(teachers) == 1
+
+    seen = [teacher["id"] for teacher in teachers]
+    while "X-Next-Cursor" in response.headers:
+        response = client.get("api/v1/teachers/", params={
+            "limit": 1, "cursor": response.headers["X-Next-Cursor"]})
+        assert response.status_code == 200
+        seen.extend(teacher["id"] for teacher in response.json())
+
+    all_ids = [teacher.id for teacher in db.query(TeacherDB).order_by(TeacherDB.id)]
+    assert seen == all_ids
+
+    response = client.get("api/v1/teachers/", params={"facultyId": 2})
+    assert response.status_code == 200
+    assert all(teacher["facultyId"] == 2 for teacher in response.json())
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get("api/v1/teachers/", params={"cursor": "garbage"})
+    assert response.status_code == 400
+
+
+def test_get_lists(db) -> None:
+    """Test the students, courses and grades list endpoints."""
+    response = client.get("api/v1/students/", params={"groupId": 2})
+    assert response.status_code == 200
+    assert len(response.json()) > 0
+    assert all(student["groupId"] == 2 for student in response.json())
+
+    response = client.get("api/v1/courses/", params={"teacherId": 1})
+    assert response.status_code == 200
+    assert len(response.json()) > 0
+    assert all(course["teacherId"] == 1 for course in response.json())
+
+    response = client.get("api/v1/grades/", params={"courseId": 2, "limit": 1})
+    assert response.status_code == 200
+    grades = response.json()
+    assert len(grades) == 1
+    assert grades[0]["courseId"] == 2
+
+
+def test_import_students(db) -> None:
+    """Test bulk import of students from JSON, CSV and NDJSON."""
+    rows = [
+        {"firstName": "Bulk1", "lastName": "Student", "email": "bulk1@example.com", "groupId": 2},
+        {"firstName": "Bulk2", "lastName": "Student", "email": "bulk1@example.com", "groupId": 2},
+        {"firstName": "Bulk3", "lastName": "Student", "email": "student2@example.com", "groupId": 2},
+        {"firstName": "Bulk4", "lastName": "Student", "email": "bulk4@example.com", "groupId": 9999},
+        {"firstName": "Bulk5", "lastName": "Student", "email": "not-an-email", "groupId": 2},
+    ]
+    response = client.post("api/v1/students/import", json=rows)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 1
+    assert data["failed"] == 4
+    results = data["results"]
+    assert [result["row"] for result in results] == [1, 2, 3, 4, 5]
+    assert results[0]["id"] is not None and results[0]["error"] is None
+    assert "Duplicate" in results[1]["error"]
+    assert "already exists" in results[2]["error"]
+    assert results[3]["error"] == "Invalid groupid."
+    assert "email" in results[4]["error"]
+
+    csv_body = ('firstName,lastName,email,groupId\r\n"Multi\r\n\r\nline ""quoted""",Student,multi@example.com,2\r\n'
+                "Csv,Student,csv@example.com,2\nCsv,Student,bulk1@example.com,2\n")
+    response = client.post("api/v1/students/import", content=csv_body,
+                           headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 2
+    assert [result["row"] for result in data["results"]] == [1, 2, 3]
+    assert "already exists" in data["results"][2]["error"]
+    multiline = client.get(f"api/v1/students/{data['results'][0]['id']}").json()
+    assert multiline["firstName"] == 'Multi\n\nline "quoted"'
+
+    # a stray quote in an unquoted field is part of the value and ends nothing
+    csv_body = ('firstName,lastName,email,groupId\nAnn,O"Neil,oneil@example.com,2\n'
+                "Stray1,Student,stray1@example.com,2\nStray2,Student,stray2@example.com,2\n"
+                "Stray3,Student,stray3@example.com,2\n")
+    response = client.post("api/v1/students/import", content=csv_body,
+                           headers={"Content-Type": "text/csv"})
+    data = response.json()
+    assert (data["created"], data["failed"]) == (4, 0)
+    assert client.get(f"api/v1/students/{data['results'][0]['id']}").json()["lastName"] == 'O"Neil'
+
+    ndjson_body = '{"firstName": "Nd", "lastName": "Student", "email": "nd@example.com", "groupId": 2}\nnot json\n'
+    response = client.post("api/v1/students/import", content=ndjson_body,
+                           headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 1
+    assert data["failed"] == 1
+
+    response = client.post("api/v1/students/import", content="x",
+                           headers={"Content-Type": "text/plain"})
+    assert response.status_code == 415
+
+    imported = db.query(StudentDB).filter(
+        StudentDB.email.in_(["bulk1@example.com", "csv@example.com", "multi@example.com", "nd@example.com",
+                             "oneil@example.com", "stray1@example.com", "stray2@example.com",
+                             "stray3@example.com"])).all()
+    assert len(imported) == 8
+    for student in imported:
+        db.delete(student)
+    db.commit()
+
+
+def test_upsert_grades(db) -> None:
+    """Test bulk create and update of grades."""
+    course = CourseDB(name="Bulk grades course", teacherId=1)
+    db.add(course)
+    db.commit()
+    db.refresh(course)
+
+    existing_grade = GradeDB(grade=3, studentId=2, courseId=course.id)
+    db.add(existing_grade)
+    db.commit()
+    db.refresh(existing_grade)
+
+    rows = [
+        {"grade": 4, "studentId": 2, "courseId": course.id},
+        {"grade": 5, "studentId": 2, "courseId": 1},
+        {"grade": 5, "studentId": 2, "courseId": course.id},
+        {"grade": 5, "studentId": 99999, "courseId": course.id},
+        {"grade": "five", "studentId": 2, "courseId": 3},
+    ]
+    response = client.post("api/v1/grades/bulk", json=rows)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 1
+    assert data["updated"] == 1
+    assert data["failed"] == 3
+    results = data["results"]
+    assert results[0]["id"] == existing_grade.id
+    assert results[1]["id"] is not None
+    assert "Duplicate" in results[2]["error"]
+    assert results[3]["error"] == "Invalid student id or course id."
+    assert "grade" in results[4]["error"]
+
+    db.refresh(existing_grade)
+    assert existing_grade.grade == 4
+
+    db.query(GradeDB).filter_by(id=results[1]["id"]).delete()
+    db.delete(existing_grade)
+    db.delete(course)
+    db.commit()
+
+
+
+def test_upsert_grades_race(monkeypatch) -> None:
+    """A constraint error raised by the upsert itself is a 409, not a 500."""
+    async def failing_upsert(db, rows, courses=None):
+        raise IntegrityError("INSERT INTO \"Grades\"", {}, Exception("fk_Grades_studentId"))
+
+    monkeypatch.setattr(grades_router, "upsert_grades", failing_upsert)
+    response = client.post("api/v1/grades/bulk", json=[{"grade": 5, "studentId": 1, "courseId": 1}])
+    assert response.status_code == 409
+
+
+def test_transcript(db, new_student) -> None:
+    """Grade writes keep the summary behind the transcript and GPA up to date."""
+    response = client.post("api/v1/students/", json=new_student)
+    student_id = response.json()["id"]
+    empty = client.get(f"api/v1/students/{student_id}/gpa").json()
+    assert empty == {"studentId": student_id, "gradeCount": 0, "mean": None, "credits": 0, "gpa": None}
+
+    major = CourseDB(name="Major course", teacherId=1, credits=3)
+    minor = CourseDB(name="Minor course", teacherId=1)
+    db.add_all([major, minor])
+    db.commit()
+
+    response = client.post("api/v1/grades/", json={"grade": 75, "studentId": student_id, "courseId": major.id})
+    grade_id = response.json()["id"]
+    client.post("api/v1/grades/bulk", json=[{"grade": 95, "studentId": student_id, "courseId": minor.id}])
+    client.put(f"api/v1/grades/{grade_id}", json={"grade": 85, "studentId": student_id, "courseId": major.id})
+
+    data = client.get(f"api/v1/students/{student_id}/transcript").json()
+    # points 3 for 85 and 4 for 95, weighted by 3 and 1 credits
+    assert (data["gradeCount"], data["mean"], data["credits"], data["gpa"]) == (2, 90.0, 4, 3.25)
+    assert [(row["courseName"], row["credits"], row["grade"]) for row in data["grades"]] == [
+        ("Major course", 3, 85), ("Minor course", 1, 95)]
+
+    major.credits = 1
+    db.commit()
+    assert client.get(f"api/v1/students/{student_id}/gpa").json()["gpa"] == 3.5
+
+    db.query(GradeDB).filter_by(courseId=minor.id).delete()
+    db.commit()
+    summary = client.get(f"api/v1/students/{student_id}/gpa").json()
+    assert (summary["gradeCount"], summary["mean"], summary["gpa"]) == (1, 85.0, 3.0)
+
+    assert client.get("api/v1/students/99999/transcript").status_code == 404
+    assert client.get("api/v1/students/99999/gpa").status_code == 404
+
+
+def test_course_statistics(db) -> None:
+    """Course statistics are cached until the next grade write on the course."""
+    course = CourseDB(name="Statistics course", teacherId=1)
+    db.add(course)
+    db.commit()
+    assert client.get(f"api/v1/courses/{course.id}/statistics").json()["count"] == 0
+    assert client.get("api/v1/courses/99999/statistics").status_code == 404
+
+    rows = [{"grade": grade, "studentId": student_id, "courseId": course.id}
+            for grade, student_id in ((70, 1), (90, 2))]
+    client.post("api/v1/grades/bulk", json=rows)
+    data = client.get(f"api/v1/courses/{course.id}/statistics").json()
+    assert (data["count"], data["mean"], data["median"], data["min"], data["max"]) == (2, 80.0, 80.0, 70, 90)
+    assert data["percentiles"]["p25"] == 75.0
+    assert [bucket["count"] for bucket in data["histogram"]] == [0] * 7 + [1, 0, 1]
+    assert [(row["studentId"], row["rank"]) for row in data["ranking"]] == [(2, 1), (1, 2)]
+    everything = client.get("api/v1/courses/statistics").json()
+    assert next(row for row in everything if row["courseId"] == course.id)["mean"] == 80.0
+
+    # a change behind the API's back is not seen until a grade write evicts the entry
+    db.query(GradeDB).filter_by(courseId=course.id, studentId=1).update({"grade": 50})
+    db.commit()
+    assert client.get(f"api/v1/courses/{course.id}/statistics").json()["mean"] == 80.0
+    student = StudentDB(firstName="Top", lastName="Student", email="top.student@example.com", groupId=1)
+    db.add(student)
+    db.commit()
+    response = client.post("api/v1/grades/", json={"grade": 100, "studentId": student.id, "courseId": course.id})
+    assert response.status_code == 200
+    data = client.get(f"api/v1/courses/{course.id}/statistics").json()
+    assert (data["count"], data["mean"]) == (3, 80.0)
+    everything = client.get("api/v1/courses/statistics").json()
+    assert next(row for row in everything if row["courseId"] == course.id)["count"] == 3
+
+
+def test_bookings() -> None:
+    """Lessons and exams can't double-book a classroom or a course."""
+    lesson = {"date": "2023-01-01", "time": "09:00:00", "courseId": 3, "classroomId": 3}
+    response = client.post("api/v1/schedules/", json=lesson)
+    assert response.status_code == 200
+    schedule_id = response.json()["id"]
+    assert response.json()["time"] == "09:00:00"
+
+    # classroom 1 has a lesson at 08:00 for 90 minutes
+    exam = {"date": "2023-01-01", "time": "09:20:00", "courseId": 2, "classroomId": 1}
+    response = client.post("api/v1/exams/", json=exam)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "The classroom is booked at this time"
+    exam.update(time="09:30:00")
+    assert client.post("api/v1/exams/", json=exam).status_code == 200
+    response = client.post("api/v1/exams/", json={**exam, "classroomId": 2, "time": "10:00:00"})
+    assert response.json()["detail"] == "The course has a lesson or an exam at this time"
+
+    response = client.get("api/v1/schedules/", params={"classroomId": 3})
+    assert [row["id"] for row in response.json()][-1] == schedule_id
+
+    timetable = [
+        {"date": "2023-01-02", "time": "08:00:00", "courseId": 1, "classroomId": 3},
+        {"date": "2023-01-02", "time": "15:00:00", "courseId": 1, "classroomId": 4},
+        {"date": "2023-01-02", "time": "16:00:00", "courseId": 1, "classroomId": 5},
+        {"date": "2023-01-02", "time": "late", "courseId": 1, "classroomId": 5},
+    ]
+    response = client.post("api/v1/schedules/validate", json=timetable)
+    assert response.status_code == 200
+    report = response.json()
+    assert report["rows"] == 4
+    assert [row["row"] for row in report["invalid"]] == [4]
+    conflicts = [(c["row"], c["reason"], c["otherRow"], c["otherKind"]) for c in report["conflicts"]]
+    # the 09:00 lesson of course 3 in classroom 3 from fill_db.sql
+    assert conflicts == [(1, "classroom", None, "schedule"), (3, "course", 2, None)]
+
+
+
+def test_timetable(db) -> None:
+    """The timetable filters lessons and exams and follows course changes."""
+    window = {"dateFrom": "2023-06-01", "dateTo": "2023-06-07"}
+    response = client.get("api/v1/timetable/", params=window)
+    assert response.status_code == 200
+    assert [(e["kind"], e["courseName"], e["classroomNumber"], e["buildingId"]) for e in response.json()] == [
+        ("exam", "Курс 1", 101, 1), ("exam", "Курс 2", 202, 2)]
+    assert response.json()[0]["time"] == "10:00:00"
+    for name, value in (("buildingId", 2), ("classroomId", 2), ("teacherId", 2), ("groupId", 2)):
+        entries = client.get("api/v1/timetable/", params={**window, name: value}).json()
+        assert [e["courseId"] for e in entries] == [2]
+    assert client.get("api/v1/timetable/", params={**window, "kind": "schedule"}).json() == []
+
+    course = CourseDB(name="Timetable course", teacherId=1)
+    db.add(course)
+    db.commit()
+    lesson = {"date": "2024-03-04", "time": "12:00:00", "courseId": course.id, "classroomId": 3}
+    assert client.post("api/v1/schedules/", json=lesson).status_code == 200
+    db.query(CourseDB).filter_by(id=course.id).update({"teacherId": 3, "name": "Renamed course"})
+    db.commit()
+    entries = client.get("api/v1/timetable/", params={"dateFrom": "2024-03-04", "dateTo": "2024-03-10",
+                                                       "teacherId": 3}).json()
+    assert [(e["courseName"], e["classroomNumber"]) for e in entries] == [("Renamed course", 303)]
+
+    for date_from, date_to in (("2023-06-07", "2023-06-01"), ("2023-06-01", "2023-07-02")):
+        response = client.get("api/v1/timetable/", params={"dateFrom": date_from, "dateTo": date_to})
+        assert response.status_code == 400
+    # 31 days counting both ends
+    response = client.get("api/v1/timetable/", params={"dateFrom": "2023-06-01", "dateTo": "2023-07-01"})
+    assert response.status_code == 200
+
+
+def test_exam_allocation() -> None:
+    """Every exam of the session gets a classroom that holds its students."""
+    response = client.get("api/v1/exams/allocation", params={"dateFrom": "2023-06-01", "dateTo": "2023-06-30"})
+    assert response.status_code == 200
+    result = response.json()
+    assert result["exams"] == 2 and result["unassigned"] == []
+    # one student each: the smallest classroom (202, capacity 40) is free both days
+    assert [(row["examId"], row["classroomId"], row["students"]) for row in result["plan"]] == [(1, 2, 1), (2, 2, 1)]
+    for date_from, date_to in (("2023-06-30", "2023-06-01"), ("2023-06-01", "2023-08-02")):
+        response = client.get("api/v1/exams/allocation", params={"dateFrom": date_from, "dateTo": date_to})
+        assert response.status_code == 400
+    response = client.get("api/v1/exams/allocation", params={"dateFrom": "2023-06-01", "dateTo": "2023-08-01"})
+    assert response.status_code == 200
+
+
+def test_cache_invalidation(db, new_student) -> None:
+    """Test that student writes evict the cached student, course rosters and grade statistics."""
+    course = CourseDB(name="Cached course", teacherId=1)
+    other_course = CourseDB(name="Other cached course", teacherId=1)
+    db.add_all([course, other_course])
+    db.commit()
+    group = GroupDB(name="Cached group", departmentId=1, courseId=course.id)
+    other_group = GroupDB(name="Other cached group", departmentId=1, courseId=other_course.id)
+    db.add_all([group, other_group])
+    db.commit()
+
+    new_student["groupId"] = group.id
+    response = client.post("api/v1/students/", json=new_student)
+    assert response.status_code == 200
+    student_id = response.json()["id"]
+
+    assert len(client.get(f"api/v1/courses/{course.id}/students").json()) == 1
+    assert client.get(f"api/v1/students/{student_id}").json()["groupId"] == group.id
+
+    # a change behind the API's back is not seen until the entry is evicted
+    db.query(StudentDB).filter_by(id=student_id).update({"firstName": "Changed"})
+    db.commit()
+    assert client.get(f"api/v1/students/{student_id}").json()["firstName"] == "Test"
+
+    new_student["groupId"] = other_group.id
+    response = client.put(f"api/v1/students/{student_id}", json=new_student)
+    assert response.status_code == 200
+
+    assert client.get(f"api/v1/students/{student_id}").json()["groupId"] == other_group.id
+    assert client.get(f"api/v1/courses/{course.id}/students").status_code == 404
+    assert len(client.get(f"api/v1/courses/{other_course.id}/students").json()) == 1
+
+    response = client.post("api/v1/grades/", json={"grade": 90, "studentId": student_id, "courseId": course.id})
+    assert response.status_code == 200
+    assert client.get(f"api/v1/courses/{course.id}/statistics").json()["count"] == 1
+
+    response = client.delete(f"api/v1/students/{student_id}")
+    assert response.status_code == 200
+    assert client.get(f"api/v1/students/{student_id}").status_code == 404
+    assert client.get(f"api/v1/courses/{other_course.id}/students").status_code == 404
+    # the grades went with the student
+    assert client.get(f"api/v1/courses/{course.id}/statistics").json()["count"] == 0
+
+    db.delete(group)
+    db.delete(other_group)
+    db.delete(course)
+    db.delete(other_course)
+    db.commit()
+
+
+def test_conditional_requests(db, new_student) -> None:
+    """Test ETag/If-None-Match on GET and If-Match on PUT."""
+    response = client.post("api/v1/students/", json=new_student)
+    student_id = response.json()["id"]
+
+    response = client.get(f"api/v1/students/{student_id}")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = client.get(f"api/v1/students/{student_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    response = client.get(f"api/v1/students/{student_id}", headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+
+    response = client.get("api/v1/teachers/")
+    response = client.get("api/v1/teachers/", headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+
+    new_student["email"] = "if.match@example.com"
+    response = client.put(f"api/v1/students/{student_id}", json=new_student,
+                          headers={"If-Match": etag})
+    assert response.status_code == 200
+    new_etag = response.headers["ETag"]
+    assert new_etag != etag
+    assert client.get(f"api/v1/students/{student_id}").headers["ETag"] == new_etag
+
+    # the first client still holds the old ETag
+    new_student["email"] = "lost.update@example.com"
+    response = client.put(f"api/v1/students/{student_id}", json=new_student,
+                          headers={"If-Match": etag})
+    assert response.status_code == 412
+    assert db.query(StudentDB).filter_by(id=student_id).first().email == "if.match@example.com"
+
+    grade = db.query(GradeDB).filter_by(studentId=2, courseId=2).first()
+    response = client.get(f"api/v1/grades/{grade.id}")
+    assert response.status_code == 200
+    grade_etag = response.headers["ETag"]
+    grade_data = dict(grade=grade.grade, studentId=2, courseId=2)
+    response = client.put(f"api/v1/grades/{grade.id}", json=grade_data, headers={"If-Match": '"stale"'})
+    assert response.status_code == 412
+    response = client.put(f"api/v1/grades/{grade.id}", json=grade_data, headers={"If-Match": grade_etag})
+    assert response.status_code == 200
+
+    db.query(StudentDB).filter_by(id=student_id).delete()
+    db.commit()
+
+
+def test_export(db) -> None:
+    """Test the streaming NDJSON and CSV exports."""
+    response = client.get("api/v1/students/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert "ETag" not in response.headers
+    students = [json.loads(line) for line in response.text.splitlines()]
+    assert len(students) == db.query(StudentDB).count()
+    assert [student["id"] for student in students] == sorted(student["id"] for student in students)
+    first = db.query(StudentDB).order_by(StudentDB.id).first()
+    assert students[0] == dict(id=first.id, firstName=first.firstName, lastName=first.lastName,
+                               email=first.email, groupId=first.groupId)
+
+    response = client.get("api/v1/grades/export", params={"format": "csv", "courseId": 2})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="grades.csv"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(response.text.splitlines()))
+    assert len(rows) == db.query(GradeDB).filter_by(courseId=2).count()
+    assert all(row["courseId"] == "2" for row in rows)
+
+    response = client.get("api/v1/teachers/export", params={"facultyId": 1})
+    assert response.status_code == 200
+    teachers = [json.loads(line) for line in response.text.splitlines()]
+    assert len(teachers) == db.query(TeacherDB).filter_by(facultyId=1).count()
+
+    response = client.get("api/v1/teachers/export", params={"format": "xml"})
+    assert response.status_code == 422
+
+
+def test_metrics(db) -> None:
+    """Test request and DB metrics and the /metrics endpoint."""
+    student = db.query(StudentDB).first()
+    route = "/api/v1/students/{student_id}"
+    labels = {"method": "GET", "route": route, "status": "200"}
+    requests_before = registry.get_sample_value("http_requests_total", labels) or 0
+    queries_before = registry.get_sample_value("http_request_db_queries_sum", {"route": route}) or 0
+
+    assert client.get(f"api/v1/students/{student.id}").status_code == 200
+    assert registry.get_sample_value("http_requests_total", labels) == requests_before + 1
+    assert registry.get_sample_value("http_request_db_queries_sum", {"route": route}) > queries_before
+    assert registry.get_sample_value("http_requests_in_flight") == 0
+
+    # paths that match no route share one label
+    assert client.get(f"api/v1/no/such/{student.id}").status_code == 404
+    assert registry.get_sample_value(
+        "http_requests_total", {"method": "GET", "route": UNMATCHED, "status": "404"}) >= 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert f'route="{route}"' in response.text
+    assert "http_request_duration_seconds_bucket" in response.text
+    assert 'db_query_duration_seconds_count{engine="async"}' in response.text
+    assert 'db_pool_checked_out{engine="sync"}' in response.text
+
+
+def test_query_budgets(db, new_student) -> None:
+    """Hot endpoints stay within their number of statements."""
+    student = db.query(StudentDB).first()
+    course = db.get(GroupDB, student.groupId).courseId
+    budgets = {
+        f"api/v1/students/{student.id}": 1,
+        "api/v1/students/": 1,
+        "api/v1/teachers/": 1,
+        "api/v1/grades/": 1,
+        f"api/v1/courses/{course}/students": 1,
+        f"api/v1/students/{student.id}/transcript": 1,
+        f"api/v1/students/{student.id}/gpa": 1,
+    }
+    for path, budget in budgets.items():
+        with count_queries(engine) as statements:
+            assert client.get(path).status_code == 200
+        queries = app_statements(statements)
+        assert len(queries) <= budget, (path, queries)
+
+    with count_queries(engine) as statements:
+        response = client.post("api/v1/students/", json=new_student)
+    queries = app_statements(statements)
+    assert response.status_code == 200
+    assert len(queries) <= 2, queries
+    student_id = response.json()["id"]
+
+    # answered from the cache
+    with count_queries(engine) as statements:
+        client.get(f"api/v1/students/{student_id}")
+        client.get(f"api/v1/students/{student_id}")
+    assert len(app_statements(statements)) == 1
+
+    with count_queries(engine) as statements:
+        assert client.put(f"api/v1/students/{student_id}", json=new_student).status_code == 200
+    queries = app_statements(statements)
+    assert len(queries) <= 2, queries
+
+
+def test_sql_trace(db, caplog) -> None:
+    """Test the Server-Timing header and the slow query log."""
+    student = db.query(StudentDB).first()
+    with caplog.at_level(logging.WARNING, logger="core.sql_trace"):
+        response = trace_client.get(f"api/v1/students/{student.id}")
+    assert response.status_code == 200
+    assert 'db;dur=' in response.headers["Server-Timing"]
+    # the SELECT and the SAVEPOINT of the test transaction
+    assert 'desc="2 queries"' in response.headers["Server-Timing"]
+    slow = [record.getMessage() for record in caplog.records
+            if "Slow query" in record.getMessage() and "SAVEPOINT" not in record.getMessage()]
+    assert len(slow) == 1
+    assert 'FROM "Students"' in slow[0]
+    assert "Index Scan" in slow[0] or "Seq Scan" in slow[0]
+
+    # the untraced client is not affected
+    assert "Server-Timing" not in client.get(f"api/v1/students/{student.id}").headers
+
+
+def test_repeated_statements() -> None:
+    """Statements run repeatedly in one request are N+1 suspects."""
+    trace = QueryTrace()
+    for statement in ["SELECT 1", "SELECT 2", "SELECT 2", "SELECT 2"]:
+        trace.statements[statement] += 1
+    assert trace.repeated(3) == [("SELECT 2", 3)]
+    assert trace.repeated(4) == []
+
+
+def test_write_lsn(db, new_student) -> None:
+    """Writes return the WAL position that reads have to wait for."""
+    router = ReplicaRouter([])
+    lsn_client = ASGIClient(WriteLSNMiddleware(app, router))
+
+    # read on the request's own connection, after the write
+    with count_queries(engine) as statements:
+        response = lsn_client.post("api/v1/students/", json=new_student)
+    assert response.status_code == 200
+    queries = app_statements(statements)
+    assert queries[0].startswith('INSERT INTO "Students"') and "pg_current_wal_lsn" in queries[1]
+    lsn = parse_lsn(response.headers[LSN_HEADER])
+    assert lsn > 0
+    assert router.last_write_lsn == lsn
+    assert response.cookies["last_write_lsn"] == response.headers[LSN_HEADER]
+
+    response = lsn_client.get(f"api/v1/students/{response.json()['id']}")
+    assert LSN_HEADER not in response.headers
+    assert lsn_client.post("api/v1/students/", json=new_student).status_code == 409
+    assert router.last_write_lsn == lsn
+
+
+def test_replica_check() -> None:
+    """A server that isn't in recovery gets no reads."""
+    replica = Replica("primary", async_engine)
+    replica.healthy = True
+    loop.run_until_complete(replica.check(max_lag=5, timeout=5))
+    assert not replica.healthy
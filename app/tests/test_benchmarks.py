@@ -0,0 +1,58 @@
+import asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from benchmarks import micro
+from benchmarks.report import compare, make_report, percentile, summarize
+from tests.databases import cloned_database, database_url, worker_database
+
+
+def test_percentile() -> None:
+    samples = [float(n) for n in range(1, 101)]
+    assert percentile(samples, 50) == 50.5
+    assert percentile(samples, 99) == 99.01
+    assert percentile([7.0], 95) == 7.0
+
+
+def test_summarize() -> None:
+    result = summarize([4.0, 1.0, 3.0, 2.0], elapsed_s=2.0, errors=1)
+    assert result["count"] == 4
+    assert result["errors"] == 1
+    assert result["p50Ms"] == 2.5
+    assert result["throughput"] == 2.0
+
+
+def test_compare() -> None:
+    """A tracked result fails the comparison when it regresses beyond the threshold."""
+    baseline = make_report("load", {}, {
+        "GET /students/": summarize([10.0] * 100, elapsed_s=1.0),
+        "GET /teachers/": summarize([0.1] * 100, elapsed_s=1.0),
+    })
+    current = make_report("load", {}, {
+        "GET /students/": summarize([10.5] * 100, elapsed_s=1.0),
+        "GET /teachers/": summarize([0.5] * 100, elapsed_s=1.0),
+    })
+    # +5% and a sub-millisecond change are within the limits
+    assert compare(baseline, current, threshold=0.1) == []
+
+    current["results"]["GET /students/"] = summarize([12.0] * 100, elapsed_s=1.0)
+    assert compare(baseline, current, threshold=0.1) == ["GET /students/: p95Ms 10.00 -> 12.00"]
+    assert compare(baseline, current, threshold=0.1, track=["GET /teachers/"]) == []
+
+    current["results"]["GET /students/"] = summarize([10.0] * 50, elapsed_s=1.0)
+    assert compare(baseline, current, threshold=0.1) == [
+        "GET /students/: throughput 100.0 -> 50.0 ops/s"]
+
+    del current["results"]["GET /teachers/"]
+    assert "GET /teachers/: missing from the current report" in compare(baseline, current, threshold=0.1)
+
+
+def test_query_benchmarks_run(monkeypatch) -> None:
+    """Every query benchmark runs against a seeded DB."""
+    name = worker_database("test_benchmarks_db")
+    with cloned_database(name, seed=True):
+        engine = create_async_engine(database_url(name, "postgresql+asyncpg"), poolclass=NullPool)
+        monkeypatch.setattr(micro, "AsyncSessionLocal", async_sessionmaker(engine, expire_on_commit=False))
+        monkeypatch.setattr(micro, "async_engine", engine)
+        results = asyncio.run(micro.run(iterations=1, rows=10, use_db=True, only="query."))
+    assert "query.roster.rows" in results
+    assert all(result["count"] == 1 and result["errors"] == 0 for result in results.values())
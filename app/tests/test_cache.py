@@ -0,0 +1,96 @@
+import asyncio
+import fnmatch
+import os
+import subprocess
+import sys
+from core.cache import MemoryCache, RedisCache
+
+
+class FakeRedis:
+    """Local stand-in for redis.asyncio.Redis."""
+
+    def __init__(self) -> None:
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, px=None):
+        self.data[key] = value.encode()
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def scan_iter(self, match="*"):
+        for key in list(self.data):
+            if fnmatch.fnmatch(key, match):
+                yield key
+
+
+def test_memory_cache_lru() -> None:
+    """Testing that the least recently used entry is evicted first."""
+    async def run():
+        cache = MemoryCache(max_entries=2, ttl=60)
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        assert await cache.get("a") == 1
+        await cache.set("c", 3)
+        assert await cache.get("b") is None
+        assert await cache.get("a") == 1
+        assert await cache.get("c") == 3
+
+        await cache.delete("a", "missing")
+        assert await cache.get("a") is None
+
+    asyncio.run(run())
+
+
+def test_memory_cache_ttl() -> None:
+    """Testing that expired entries are not returned."""
+    async def run():
+        cache = MemoryCache(max_entries=10, ttl=60)
+        await cache.set("a", 1, ttl=-1)
+        await cache.set("b", 2)
+        assert await cache.get("a") is None
+        assert await cache.get("b") == 2
+
+    asyncio.run(run())
+
+
+def test_redis_cache() -> None:
+    """Testing the Redis backend against a local stand-in."""
+    async def run():
+        client = FakeRedis()
+        cache = RedisCache(client, prefix="test:")
+        await cache.set("students:1", {"id": 1, "email": "a@example.com"})
+        assert "test:students:1" in client.data
+        assert await cache.get("students:1") == {"id": 1, "email": "a@example.com"}
+
+        await cache.delete("students:1")
+        assert await cache.get("students:1") is None
+
+        await cache.set("a", [1])
+        await cache.set("b", [2])
+        client.data["other"] = b"1"
+        await cache.clear()
+        assert list(client.data) == ["other"]
+
+    asyncio.run(run())
+
+
+def test_gunicorn_cache_backend() -> None:
+    """Several gunicorn workers don't get per-worker memory caches."""
+    def load(**env):
+        code = "import runpy; print(runpy.run_path('gunicorn.conf.py')['CACHE_BACKEND'])"
+        base = {key: value for key, value in os.environ.items() if key != "CACHE_BACKEND"}
+        return subprocess.run([sys.executable, "-c", code], env={**base, **env}, capture_output=True, text=True)
+
+    assert load(WEB_CONCURRENCY="1").stdout.strip() == "memory"
+    assert load(WEB_CONCURRENCY="2").stdout.strip() == "none"
+    # docker-compose passes unset variables as empty strings
+    assert load(WEB_CONCURRENCY="2", CACHE_BACKEND="").stdout.strip() == "none"
+    assert load(WEB_CONCURRENCY="1", CACHE_BACKEND="").stdout.strip() == "memory"
+    assert load(WEB_CONCURRENCY="2", CACHE_BACKEND="redis").stdout.strip() == "redis"
+    result = load(WEB_CONCURRENCY="2", CACHE_BACKEND="memory")
+    assert result.returncode != 0 and "CACHE_BACKEND=redis" in result.stderr
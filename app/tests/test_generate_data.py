@@ -0,0 +1,41 @@
+from generate_data import LEVELS, TABLES, Sizes, generate_chunk
+
+SIZES = Sizes(scale=0.01, years=2)
+
+
+def all_rows(name: str, seed: int = 1) -> list:
+    table = TABLES[name]
+    return [row for start in range(0, table.units(SIZES), table.chunk)
+            for row in generate_chunk(table, SIZES, seed, start)]
+
+
+def test_all_tables_generated() -> None:
+    """Every table gets rows with IDs from 1 to its count."""
+    assert len(TABLES) == 15
+    assert sum(len(level) for level in LEVELS) == 15
+    for name in TABLES:
+        ids = [row[0] for row in all_rows(name)]
+        assert ids == list(range(1, len(ids) + 1)), name
+
+
+def test_deterministic() -> None:
+    """The same seed gives the same rows, another seed other rows."""
+    assert all_rows("Grades") == all_rows("Grades")
+    assert all_rows("Students", seed=1) != all_rows("Students", seed=2)
+
+
+def test_constraints() -> None:
+    """Generated rows satisfy the unique constraints and don't double-book classrooms."""
+    emails = [row[3] for row in all_rows("Students")]
+    assert len(emails) == len(set(emails))
+    pairs = [(row[2], row[3]) for row in all_rows("Grades")]
+    assert len(pairs) == len(set(pairs))
+    courses = [(row[1], row[2]) for row in all_rows("Courses")]
+    assert len(courses) == len(set(courses))
+    bookings = [(row[1], row[2], row[4]) for row in all_rows("Schedules") + all_rows("Exams")]
+    assert len(bookings) == len(set(bookings))
+    lessons = [(row[1], row[2], row[3]) for row in all_rows("Schedules") + all_rows("Exams")]
+    assert len(lessons) == len(set(lessons))
+
+    teachers = SIZES.teachers
+    assert all(1 <= row[2] <= teachers for row in all_rows("Courses"))
@@ -1,8 +1,6 @@
-import psycopg2
 import pytest
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
-from core.config import DB_HOST, DB_USER, DB_PASS
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
 from datetime import date, time
 from typing import Generator
 from api.v1.buildings.model import BuildingDB
@@ -20,63 +18,27 @@ from api.v1.schedules.model import ScheduleDB
 from api.v1.exams.model import ExamDB
 from api.v1.grades.model import GradeDB
 from api.v1.assignments.model import AssignmentDB
+from index_advisor import unindexed_foreign_keys
+from tests.databases import cloned_database, database_url, worker_database
 
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:5432/postgres"
-TEST_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:5432/test_models_db"
+TEST_DATABASE_URL = database_url(worker_database("test_models_db"))
 
-
-def apply_migrations(database_url: str) -> None:
-    """Create tables in the test DB.
-
-    Args:
-        database_url (str): Test base URL
-    """
-    engine = create_engine(database_url)
-    with open('db/queries/create_tables.sql') as f:
-        with engine.begin() as connection:
-            connection.execute(text(f.read()))
+engine = create_engine(TEST_DATABASE_URL)
 
 
 @pytest.fixture(scope="session", autouse=True)
 def create_db() -> Generator:
     """The function creates and deletes a test data base."""
-    conn = psycopg2.connect(DATABASE_URL)
-    conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
-    cursor = conn.cursor()
-
-    cursor.execute("DROP DATABASE IF EXISTS test_models_db;")
-    cursor.execute("CREATE DATABASE test_models_db;")
-    cursor.close()
-    conn.close()
-
-    apply_migrations(TEST_DATABASE_URL)
-
-    yield
-
-    conn = psycopg2.connect(DATABASE_URL)
-    conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
-    cursor = conn.cursor()
-    cursor.execute(f"""
-        SELECT 
-            pg_terminate_backend(pg_stat_activity.pid)
-        FROM 
-            pg_stat_activity
-        WHERE 
-            pg_stat_activity.datname = 'test_models_db'
-            AND pid <> pg_backend_pid();
-    """)
-    cursor.execute("DROP DATABASE IF EXISTS test_models_db;")
-    cursor.close()
-    conn.close()
-
-
-@pytest.fixture(scope="session")
+    with cloned_database(worker_database("test_models_db"), seed=False):
+        yield
+
+
+@pytest.fixture
 def db() -> Generator:
-    """The function makes session for tests."""
-    engine = create_engine(TEST_DATABASE_URL)
+    """The function makes a session whose changes are rolled back after the test."""
     connection = engine.connect()
     transaction = connection.begin()
-    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    session = Session(bind=connection, autoflush=False, join_transaction_mode="create_savepoint")
 
     try:
         yield session
@@ -483,7 +445,7 @@ def test_create_grade(db) -> None:
     db.add(new_group)
     db.flush()
 
-    new_student = StudentDB(firstName="Test", lastName="Student", email="test.student@example.com", groupId=new_group.id)
+    new_student = StudentDB(firstName="Test", lastName="Student", email="grade.student@example.com", groupId=new_group.id)
     db.add(new_student)
     db.flush()
 
@@ -536,3 +498,9 @@ def test_create_assignment(db) -> None:
     assert db_assignment.dateAssigned == date.today()
     assert db_assignment.dueDate == date.today()
     assert db_assignment.courseId == new_course.id
+
+
+def test_foreign_keys_indexed() -> None:
+    """Every foreign key has to be covered by an index."""
+    with engine.connect() as connection:
+        assert unindexed_foreign_keys(connection) == []
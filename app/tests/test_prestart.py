@@ -0,0 +1,92 @@
+import psycopg2
+import pytest
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+import prestart
+from db.scripts import read_statements
+from tests.databases import cloned_database, database_url, worker_database
+
+
+def test_head_revisions() -> None:
+    """The heads read from the scripts are the heads alembic sees."""
+    script = ScriptDirectory.from_config(Config(prestart.ALEMBIC_INI))
+    assert prestart.head_revisions() == set(script.get_heads())
+
+
+def test_migrate_skips_current_db(monkeypatch) -> None:
+    """A DB at head is left alone."""
+    name = worker_database("test_prestart_db")
+    with cloned_database(name, seed=False):
+        monkeypatch.setattr(prestart, "DATABASE_URL", database_url(name))
+        conn = prestart.wait_for_db(timeout=5)
+        try:
+            assert prestart.current_revision(conn) is None
+            (head,) = prestart.head_revisions()
+            with conn.cursor() as cursor:
+                cursor.execute("CREATE TABLE alembic_version (version_num varchar(32) PRIMARY KEY)")
+                cursor.execute("INSERT INTO alembic_version VALUES (%s)", (head,))
+            assert prestart.current_revision(conn) == head
+            assert prestart.migrate(conn) is False
+        finally:
+            conn.close()
+
+
+def test_wait_for_db_gives_up(monkeypatch) -> None:
+    """Probing stops at the timeout."""
+    monkeypatch.setattr(prestart, "DATABASE_URL", database_url("no_such_db"))
+    with pytest.raises(psycopg2.OperationalError):
+        prestart.wait_for_db(timeout=0.3, first_delay=0.05, max_delay=0.1)
+
+
+def test_grades_unique_migration_reruns() -> None:
+    """The grades unique migration recovers from an INVALID index and can run twice."""
+    name = worker_database("test_grades_unique_db")
+    with cloned_database(name, seed=True):
+        conn = psycopg2.connect(database_url(name))
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('ALTER TABLE "Grades" DROP CONSTRAINT "uq_Grades_studentId_courseId"')
+                cursor.execute('INSERT INTO "Grades" (grade, "studentId", "courseId") VALUES (70, 1, 1)')
+                # a duplicate during the build leaves the index INVALID
+                with pytest.raises(psycopg2.IntegrityError):
+                    cursor.execute('CREATE UNIQUE INDEX CONCURRENTLY "uq_Grades_studentId_courseId" '
+                                   'ON "Grades" ("studentId", "courseId")')
+                for _ in range(2):
+                    for sql in read_statements("create_grades_unique.sql"):
+                        cursor.execute(sql)
+                cursor.execute("SELECT indisvalid FROM pg_index "
+                               "WHERE indexrelid = '\"uq_Grades_studentId_courseId\"'::regclass")
+                assert cursor.fetchone() == (True,)
+                cursor.execute('SELECT grade FROM "Grades" WHERE "studentId" = 1 AND "courseId" = 1')
+                assert cursor.fetchall() == [(70,)]
+        finally:
+            conn.close()
+
+
+def test_unique_constraints_migration_reruns() -> None:
+    """The students/courses unique migration recovers from an INVALID index and can run twice."""
+    name = worker_database("test_unique_constraints_db")
+    with cloned_database(name, seed=True):
+        conn = psycopg2.connect(database_url(name))
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('ALTER TABLE "Students" DROP CONSTRAINT "uq_Students_email"')
+                cursor.execute('INSERT INTO "Students" ("firstName", email) VALUES (%s, %s)',
+                               ("Copy", "student1@example.com"))
+                # a duplicate during the build leaves the index INVALID
+                with pytest.raises(psycopg2.IntegrityError):
+                    cursor.execute('CREATE UNIQUE INDEX CONCURRENTLY "uq_Students_email" ON "Students" (email)')
+                cursor.execute('DELETE FROM "Students" WHERE "firstName" = %s', ("Copy",))
+                for _ in range(2):
+                    for sql in read_statements("create_unique_constraints.sql"):
+                        cursor.execute(sql)
+                cursor.execute("SELECT indisvalid FROM pg_index WHERE indexrelid IN "
+                               "('\"uq_Students_email\"'::regclass, '\"uq_Courses_name_teacherId\"'::regclass)")
+                assert cursor.fetchall() == [(True,), (True,)]
+                cursor.execute("SELECT conname FROM pg_constraint WHERE conname IN "
+                               "('uq_Students_email', 'uq_Courses_name_teacherId') ORDER BY conname")
+                assert cursor.fetchall() == [("uq_Courses_name_teacherId",), ("uq_Students_email",)]
+        finally:
+            conn.close()
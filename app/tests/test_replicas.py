@@ -0,0 +1,52 @@
+from sqlalchemy.ext.asyncio import create_async_engine
+from core import replicas as replicas_module
+from core.replicas import Replica, ReplicaRouter, fresh_for_cache, parse_lsn
+
+
+class FakeSession:
+    def __init__(self, replay_lsn) -> None:
+        self.info = {"replayLsn": replay_lsn}
+
+
+def make_replica(name: str, healthy: bool = True, replay_lsn: int = 0) -> Replica:
+    replica = Replica(name, create_async_engine(f"postgresql+asyncpg://user:pass@{name}/db"))
+    replica.healthy = healthy
+    replica.replay_lsn = replay_lsn
+    return replica
+
+
+def test_parse_lsn() -> None:
+    assert parse_lsn("0/0") == 0
+    assert parse_lsn("16/B374D848") == (0x16 << 32) + 0xB374D848
+    assert parse_lsn("1/0") > parse_lsn("0/FFFFFFFF")
+    for value in (None, "", "garbage", "1/x"):
+        assert parse_lsn(value) is None
+
+
+def test_round_robin() -> None:
+    """Reads go to healthy replicas in turn."""
+    a, b, down = make_replica("a"), make_replica("b"), make_replica("down", healthy=False)
+    router = ReplicaRouter([a, down, b])
+    chosen = [router.choose().name for _ in range(6)]
+    assert "down" not in chosen
+    assert chosen.count("a") == chosen.count("b") == 3
+    assert ReplicaRouter([]).choose() is None
+    assert ReplicaRouter([down]).choose() is None
+
+
+def test_read_your_writes() -> None:
+    """A reader that sent a write LSN is served by replicas that replayed it, else the primary."""
+    behind, ahead = make_replica("behind", replay_lsn=100), make_replica("ahead", replay_lsn=200)
+    router = ReplicaRouter([behind, ahead])
+    assert {router.choose(150).name for _ in range(4)} == {"ahead"}
+    assert router.choose(300) is None
+
+
+def test_fresh_for_cache(monkeypatch) -> None:
+    """Replicas behind the writes of the process don't fill the cache."""
+    router = ReplicaRouter([])
+    router.last_write_lsn = 200
+    monkeypatch.setattr(replicas_module, "replicas", router)
+    assert fresh_for_cache(FakeSession(None))
+    assert fresh_for_cache(FakeSession(200))
+    assert not fresh_for_cache(FakeSession(100))
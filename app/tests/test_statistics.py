@@ -0,0 +1,22 @@
+import numpy as np
+from api.v1.courses.statistics import PERCENTILES, ranking, segment_statistics
+
+
+def test_segment_statistics_match_numpy() -> None:
+    """Statistics of concatenated courses equal those computed course by course."""
+    rng = np.random.default_rng(1)
+    courses = [np.sort(rng.integers(0, 101, size)) for size in (1, 2, 7, 250)]
+    stats = segment_statistics(np.concatenate(courses), np.array([len(c) for c in courses]))
+    for i, grades in enumerate(courses):
+        assert stats["mean"][i] == np.mean(grades)
+        assert np.isclose(stats["std"][i], np.std(grades))
+        assert np.allclose(stats["percentiles"][i], np.percentile(grades, PERCENTILES))
+        assert (stats["min"][i], stats["max"][i]) == (grades.min(), grades.max())
+        histogram, _ = np.histogram(grades, bins=np.arange(0, 101, 10))
+        assert stats["histogram"][i].tolist() == histogram.tolist()
+
+
+def test_ranking_ties() -> None:
+    """Equal grades share a rank and the next rank is skipped."""
+    result = ranking(np.array([60, 80, 80, 95]), np.array([4, 2, 3, 1]))
+    assert [(row["studentId"], row["rank"]) for row in result] == [(1, 1), (3, 2), (2, 2), (4, 4)]
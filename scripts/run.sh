@@ -1,13 +1,14 @@
 #!/bin/sh
 set -e
 
-# wait for db
-python wait_for_db.py
+# wait for the db and apply migrations unless it is at head already
+python prestart.py
 
 echo "Starting the application."
 
-# apply migrations
-alembic upgrade head
-
-# run the app
+# run the app: gunicorn with WEB_CONCURRENCY uvicorn workers in production,
+# a single uvicorn process otherwise
+if [ "$SERVER_MODE" = "production" ]; then
+  exec gunicorn -c gunicorn.conf.py main:app
+fi
 exec uvicorn main:app --host 0.0.0.0 --port 8000
\ No newline at end of file